@@ -1,12 +1,23 @@
+import time
+_import_start = time.perf_counter()
+
 import logging
 from flask import Flask
 from config import get_config
-from models import db
+from config.secret_store import get_secret_store
+from models import db, init_replica_routing
+import migrations
+import settlement
+import jobs
+from storage import init_storage
 from routes import register_blueprints
-import firebase_admin
-from firebase_admin import credentials, initialize_app
-import boto3
-import json
+from routes.utils import init_caches
+from routes.changes import init_change_log
+from clients import configure_boto3, configure_firebase
+from startup import StartupReport
+from pool_metrics import init_pool_metrics
+
+_import_seconds = time.perf_counter() - _import_start
 
 def setup_logging(app):
     log_level = app.config["LOG_LEVEL"]
@@ -32,43 +43,61 @@ def setup_logging(app):
     app.logger.addHandler(console_handler)
     app.logger.addHandler(file_handler)
 
-def get_parameter(parameter_name):
-    ssm = boto3.client('ssm', region_name='us-east-1')
-    response = ssm.get_parameter(Name=parameter_name, WithDecryption=True)
-    return response['Parameter']['Value']
-
-def create_app():
-    app = Flask(__name__)
+def create_app(config_overrides=None):
+    report = StartupReport()
+    report.record('imports', _import_seconds)
 
-    app.config.from_object(get_config())
-    
-    setup_logging(app)
+    with report.phase('config'):
+        app = Flask(__name__)
+        app.config.from_object(get_config())
+        if config_overrides:
+            app.config.update(config_overrides)
+        setup_logging(app)
+        configure_boto3(
+            max_pool_connections=app.config.get('AWS_MAX_POOL_CONNECTIONS', 10),
+            connect_timeout=app.config.get('AWS_CONNECT_TIMEOUT', 5),
+            read_timeout=app.config.get('AWS_READ_TIMEOUT', 10),
+            max_attempts=app.config.get('AWS_MAX_ATTEMPTS', 5),
+            retry_mode=app.config.get('AWS_RETRY_MODE', 'adaptive'),
+        )
 
-    firebase_key = get_parameter('firebaseKey')
-    firebase_key_dict = json.loads(firebase_key)
+    # firebase_admin itself is imported and initialized on the first token verification
+    with report.phase('firebase'):
+        secrets = get_secret_store(app.config)
+        firebase_key = secrets.get('firebaseKey', required=app.config.get('FIREBASE_REQUIRED', True))
+        if firebase_key:
+            configure_firebase(firebase_key)
+        else:
+            app.logger.warning("firebaseKey is not configured; Firebase app not initialized.")
 
-    try:
-        firebase_admin.get_app()
-        app.logger.info("Firebase app already initialized.")
-    except ValueError:
-        cred = credentials.Certificate(firebase_key_dict)
-        initialize_app(cred)
-        app.logger.info("Firebase app initialized.")
+    with report.phase('db'):
+        init_pool_metrics(app)
+        db.init_app(app)
+        init_replica_routing(app)
+        migrations.init_app(app)
+        settlement.init_app(app)
+        jobs.init_app(app)
 
-    db.init_app(app)
+        # Only the single schema_version row is read on boot; tables are created and altered by migrations
+        with app.app_context():
+            try:
+                migrations.ensure_schema(app)
+            except migrations.MigrationError:
+                raise
+            except Exception as e:
+                app.logger.error("Error checking database schema: %s", e)
 
-    register_blueprints(app)
+    with report.phase('blueprints'):
+        register_blueprints(app)
+        init_caches(app)
+        init_change_log(app)
+        init_storage(app)
 
     # TODO: Figure out how to make CORS work globally
     #CORS(app, resources={r"/*": {"origins": "*"}})
 
-    with app.app_context():
-        try:
-            app.logger.info("Creating database tables")
-            db.create_all()  # Ensure all tables are created
-            app.logger.info("Database tables created")
-        except Exception as e:
-            app.logger.error("Error creating database tables: %s", e)
+    app.extensions['startup_report'] = report
+    report.log(app.logger)
 
     return app
 
@@ -0,0 +1,107 @@
+"""Settle-up benchmark: net balances and transfers for a large trip.
+
+Seeds a throwaway SQLite database with one trip, --guests guests and --expenses expenses (each
+split between a random handful of guests), then times the SQL aggregation in
+settlement.net_balances, the trip_balances ledger read that settle-up actually serves from, the
+greedy minimal_transfers pass, and for comparison the row-by-row computation clients used to do
+over the get-expenses payload.
+
+    cd my_app
+    python -m benchmarks.bench_settle_up --expenses 10000 --guests 100 --runs 5
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import insert
+
+def seed(db, models, guests, expenses, rng):
+    User, Trip, TripGuest, TripExpense, TripExpenseShare = models
+    user_ids = [f"user_{i}" for i in range(guests)]
+    db.session.execute(insert(User), [
+        {"id": user_id, "phone_number": f"+1{i:010d}", "first_name": "Bench", "last_name": str(i)}
+        for i, user_id in enumerate(user_ids)
+    ])
+    db.session.add(Trip(id=1, name="Bench", token="bench", host_id=user_ids[0],
+                        start_date=datetime(2024, 1, 1), end_date=datetime(2024, 1, 10)))
+    db.session.execute(insert(TripGuest), [
+        {"trip_id": 1, "guest_id": user_id, "is_host": i == 0, "rsvp_status": "YES"}
+        for i, user_id in enumerate(user_ids)
+    ])
+    now = datetime(2024, 1, 2)
+    expense_rows, share_rows = [], []
+    for expense_id in range(1, expenses + 1):
+        involved = rng.sample(user_ids, rng.randint(2, min(8, guests)))
+        share = round(rng.uniform(1, 200), 2)
+        expense_rows.append({"id": expense_id, "trip_id": 1, "user_id": rng.choice(user_ids), "title": "Bench",
+                             "amount": share * len(involved), "settled": False, "created_at": now, "updated_at": now})
+        share_rows.extend({"expense_id": expense_id, "user_id": user_id, "amount": share, "trip_id": 1} for user_id in involved)
+    db.session.execute(insert(TripExpense), expense_rows)
+    db.session.execute(insert(TripExpenseShare), share_rows)
+    db.session.commit()
+    return len(share_rows)
+
+def row_by_row_balances(db, TripExpense, TripExpenseShare):
+    balances = defaultdict(float)
+    for expense in TripExpense.query.filter_by(trip_id=1, settled=False).all():
+        for share in TripExpenseShare.query.filter_by(expense_id=expense.id).all():
+            balances[expense.user_id] += share.amount
+            balances[share.user_id] -= share.amount
+    return balances
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--expenses', type=int, default=10000)
+    parser.add_argument('--guests', type=int, default=100)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--skip-row-by-row', action='store_true', help="skip the slow per-expense baseline")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    os.environ.setdefault('FLASK_ENV', 'testing')
+    from app import create_app
+    from models import db, User, Trip, TripGuest, TripExpense, TripExpenseShare
+    from settlement import net_balances, ledger_balances, rebuild_balances, minimal_transfers
+
+    with tempfile.TemporaryDirectory() as tmp:
+        app = create_app({'SQLALCHEMY_DATABASE_URI': f"sqlite:///{os.path.join(tmp, 'settle_up.db')}"})
+        with app.app_context():
+            db.create_all()
+            shares = seed(db, (User, Trip, TripGuest, TripExpense, TripExpenseShare), args.guests, args.expenses,
+                          random.Random(args.seed))
+
+            balances, aggregate_ms = timed(lambda: net_balances(1), args.runs)
+            transfers, transfers_ms = timed(lambda: minimal_transfers(balances), args.runs)
+            rebuild_balances(1)
+            _, ledger_ms = timed(lambda: ledger_balances(1), args.runs)
+            summary = {
+                'expenses': args.expenses,
+                'shares': shares,
+                'guests': args.guests,
+                'runs': args.runs,
+                'sql_aggregation_ms': aggregate_ms,
+                'minimal_transfers_ms': transfers_ms,
+                'ledger_lookup_ms': ledger_ms,
+                'transfers': len(transfers),
+            }
+            if not args.skip_row_by_row:
+                _, summary['row_by_row_ms'] = timed(lambda: row_by_row_balances(db, TripExpense, TripExpenseShare), 1)
+            db.engine.dispose()
+
+    print(json.dumps(summary, indent=2))
+
+if __name__ == '__main__':
+    main()
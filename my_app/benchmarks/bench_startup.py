@@ -0,0 +1,72 @@
+"""Cold-start benchmark: time from interpreter start to the first served request.
+
+Each run happens in a fresh interpreter so import costs are included. Results are printed
+as JSON and optionally appended to a JSONL file, tagged with the current git revision, so
+time-to-first-request can be tracked across releases.
+
+    cd my_app
+    python -m benchmarks.bench_startup --runs 5 --output startup_history.jsonl
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = """
+import json, time
+start = time.perf_counter()
+from app import create_app
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().post('/users/validate-user', json={'phone_number': '+10000000000'})
+first_request = time.perf_counter()
+print(json.dumps({
+    'create_app_ms': (created - start) * 1000,
+    'time_to_first_request_ms': (first_request - start) * 1000,
+    'first_request_status': response.status_code,
+    'startup_report': app.extensions['startup_report'].as_dict(),
+}))
+"""
+
+def run_once(env):
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', CHILD], env=env, capture_output=True, text=True, check=True)
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result['process_wall_ms'] = (time.perf_counter() - start) * 1000
+    return result
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'describe', '--always', '--dirty'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--env', default='testing', help="FLASK_ENV for the child processes")
+    parser.add_argument('--output', help="append the summary to this JSONL file")
+    args = parser.parse_args()
+
+    env = {**os.environ, 'FLASK_ENV': args.env}
+    runs = [run_once(env) for _ in range(args.runs)]
+    phases = runs[0]['startup_report']['phases_ms'].keys()
+    summary = {
+        'revision': git_revision(),
+        'timestamp': time.time(),
+        'runs': args.runs,
+        'time_to_first_request_ms': statistics.median(r['time_to_first_request_ms'] for r in runs),
+        'create_app_ms': statistics.median(r['create_app_ms'] for r in runs),
+        'process_wall_ms': statistics.median(r['process_wall_ms'] for r in runs),
+        'phases_ms': {p: statistics.median(r['startup_report']['phases_ms'][p] for r in runs) for p in phases},
+    }
+    print(json.dumps(summary, indent=2))
+    if args.output:
+        with open(args.output, 'a') as f:
+            f.write(json.dumps(summary) + '\n')
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+"""Throughput of each gunicorn worker class against the registered blueprints.
+
+Starts gunicorn with gunicorn.conf.py once per worker class (FLASK_ENV=production pointed at a
+throwaway SQLite file) and drives it with concurrent keep-alive clients. Without --token only
+unauthenticated routes are exercised; pass a real Firebase ID token to include the authenticated
+GET endpoints.
+
+    cd my_app
+    python -m benchmarks.bench_workers --classes sync gthread gevent --concurrency 32 --seconds 10
+"""
+import argparse
+import http.client
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+PUBLIC_REQUESTS = [
+    ('POST', '/users/validate-user', {'phone_number': '+10000000000'}),
+]
+AUTHENTICATED_REQUESTS = [
+    ('GET', '/trips/get-user-trips', None),
+    ('GET', '/trips/get-todos?trip_id={trip_id}', None),
+    ('GET', '/trip_guests/get-trip-guests?trip_id={trip_id}', None),
+    ('GET', '/expenses/get-expenses?trip_id={trip_id}', None),
+    ('GET', '/trip_locations/get-locations?trip_id={trip_id}', None),
+    ('GET', '/trip_itinerary/get-itinerary?trip_id={trip_id}', None),
+]
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def wait_until_up(port, deadline):
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.2).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError("gunicorn did not start")
+
+def client_loop(port, requests, headers, stop_at, latencies, errors):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+    i = 0
+    while time.time() < stop_at:
+        method, path, body = requests[i % len(requests)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request(method, path, body=json.dumps(body) if body else None, headers=headers)
+            conn.getresponse().read()
+            latencies.append(time.perf_counter() - start)
+        except (OSError, http.client.HTTPException):
+            errors.append(1)
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+
+def run_worker_class(worker_class, args, db_dir):
+    port = free_port()
+    env = {
+        **os.environ,
+        'FLASK_ENV': 'production',
+        'DB_URL': args.db_url or f"sqlite:///{os.path.join(db_dir, 'bench.db')}",
+        'SECRET_SOURCES': 'env',
+        'FIREBASE_KEY': os.environ.get('FIREBASE_KEY', '{}'),
+        'STORAGE_BACKEND': 'local',
+        'STORAGE_LOCAL_ROOT': os.path.join(db_dir, 'storage'),
+        'STORAGE_SIGNING_KEY': 'bench-storage-signing-key',
+        'GUNICORN_BIND': f"127.0.0.1:{port}",
+        'GUNICORN_WORKER_CLASS': worker_class,
+        'GUNICORN_WORKERS': str(args.workers),
+    }
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', 'app:create_app()'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        wait_until_up(port, time.time() + 30)
+        requests = list(PUBLIC_REQUESTS)
+        headers = {'Content-Type': 'application/json'}
+        if args.token:
+            headers['Authorization'] = f"Bearer {args.token}"
+            requests += [(m, p.format(trip_id=args.trip_id), b) for m, p, b in AUTHENTICATED_REQUESTS]
+
+        latencies, errors = [], []
+        stop_at = time.time() + args.seconds
+        clients = [
+            threading.Thread(target=client_loop, args=(port, requests, headers, stop_at, latencies, errors))
+            for _ in range(args.concurrency)
+        ]
+        for t in clients:
+            t.start()
+        for t in clients:
+            t.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies.sort()
+    return {
+        'worker_class': worker_class,
+        'requests': len(latencies),
+        'errors': len(errors),
+        'rps': round(len(latencies) / args.seconds, 1),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        'p99_ms': round(latencies[int(len(latencies) * 0.99) - 1] * 1000, 2) if latencies else None,
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--classes', nargs='+', default=['sync', 'gthread', 'gevent'])
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--db-url', help="defaults to a temporary SQLite file")
+    parser.add_argument('--token', help="Firebase ID token for the authenticated endpoints")
+    parser.add_argument('--trip-id', default='1')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as db_dir:
+        for worker_class in args.classes:
+            if worker_class == 'gevent':
+                try:
+                    import gevent  # noqa: F401
+                except ImportError:
+                    print(json.dumps({'worker_class': 'gevent', 'skipped': 'gevent is not installed'}))
+                    continue
+            print(json.dumps(run_worker_class(worker_class, args, db_dir)))
+
+if __name__ == '__main__':
+    main()
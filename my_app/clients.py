@@ -0,0 +1,96 @@
+import json
+import os
+import threading
+
+# boto3 and firebase_admin each take a few hundred milliseconds to import, so they are only
+# loaded the first time a client is asked for instead of when the app module is imported.
+
+_lock = threading.Lock()
+_boto3_session = None
+_boto3_clients = {}
+_boto3_settings = {
+    'max_pool_connections': 10,
+    'connect_timeout': 5,
+    'read_timeout': 10,
+    'max_attempts': 5,
+    'retry_mode': 'adaptive',
+}
+_firebase_credentials = None
+_firebase_initialized = False
+
+def configure_boto3(**settings):
+    """Sets the botocore options new clients are built with; see get_boto3_client for the names."""
+    global _boto3_clients
+    with _lock:
+        _boto3_settings.update(settings)
+        _boto3_clients = {}
+
+def get_boto3_client(service_name, region_name='us-east-1', **overrides):
+    """The process's shared client for a service and region, built on first use.
+
+    Clients are thread-safe, so every thread (or greenlet) uses the same one and its connection pool.
+    Keyword arguments override the configured max_pool_connections, connect_timeout, read_timeout,
+    max_attempts (counting the first try) and retry_mode for this client.
+    """
+    key = (service_name, region_name, tuple(sorted(overrides.items())))
+    client = _boto3_clients.get(key)
+    if client is None:
+        with _lock:
+            client = _boto3_clients.get(key)
+            if client is None:
+                from botocore.config import Config
+                settings = {**_boto3_settings, **overrides}
+                config = Config(
+                    max_pool_connections=settings['max_pool_connections'],
+                    connect_timeout=settings['connect_timeout'],
+                    read_timeout=settings['read_timeout'],
+                    retries={'total_max_attempts': settings['max_attempts'], 'mode': settings['retry_mode']},
+                )
+                client = _get_boto3_session().client(service_name, region_name=region_name, config=config)
+                _boto3_clients[key] = client
+    return client
+
+def _get_boto3_session():
+    # boto3's default session isn't safe to build clients from concurrently; this one is only used under _lock
+    global _boto3_session
+    if _boto3_session is None:
+        import boto3
+        _boto3_session = boto3.session.Session()
+    return _boto3_session
+
+def _reset_after_fork():
+    # a forked child must not share the parent's sockets, or a lock some other thread held at fork time
+    global _lock, _boto3_session, _boto3_clients
+    _lock = threading.Lock()
+    _boto3_session = None
+    _boto3_clients = {}
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+def preload_modules():
+    # Import (but don't instantiate) the SDKs so a preloading gunicorn master shares their pages with
+    # every worker. Clients themselves hold sockets and must still be created after fork.
+    import boto3
+    import botocore.exceptions
+    import firebase_admin.auth
+
+def configure_firebase(credentials_json):
+    global _firebase_credentials, _firebase_initialized
+    _firebase_credentials = json.loads(credentials_json) if credentials_json else None
+    _firebase_initialized = False
+
+def firebase_auth():
+    global _firebase_initialized
+    from firebase_admin import auth
+
+    if not _firebase_initialized and _firebase_credentials is not None:
+        with _lock:
+            if not _firebase_initialized:
+                import firebase_admin
+                from firebase_admin import credentials
+                try:
+                    firebase_admin.get_app()
+                except ValueError:
+                    firebase_admin.initialize_app(credentials.Certificate(_firebase_credentials))
+                _firebase_initialized = True
+    return auth
@@ -1,3 +1,4 @@
+import os
 import logging
 
 class DevConfig:
@@ -7,4 +8,55 @@ class DevConfig:
     HOST = "localhost"
     PORT = 5555
     LOG_LEVEL = logging.DEBUG
-    LOG_FILE = "app.log"
\ No newline at end of file
+    LOG_FILE = "app.log"
+    TOKEN_CACHE_ENABLED = True
+    TOKEN_CACHE_SIZE = 1000
+    TOKEN_CACHE_MAX_TTL = 300
+    TOKEN_CHECK_REVOKED = False
+    TOKEN_REVOCATION_CHECK_SECONDS = 30
+    MEMBERSHIP_CACHE_ENABLED = True
+    MEMBERSHIP_CACHE_SIZE = 1000
+    MEMBERSHIP_CACHE_TTL = 30
+    PAGE_SIZE_DEFAULT = 50
+    PAGE_SIZE_MAX = 200
+    CHANGE_LOG_RETAIN = 500
+    ITINERARY_VIRTUAL_DAYS = True
+    PUBSUB_BACKEND = 'local'
+    PUBSUB_POLL_INTERVAL = 1.0
+    STREAM_MAX_CONNECTIONS = 4
+    STREAM_HEARTBEAT_SECONDS = 15
+    STREAM_MAX_SECONDS = 300
+    STREAM_RETRY_MS = 3000
+    BATCH_MAX_REQUESTS = 20
+    BATCH_MAX_PARALLEL = 4
+    JOB_POLL_INTERVAL = 5
+    JOB_LEASE_SECONDS = 300
+    JOB_MAX_ATTEMPTS = 8
+    JOB_RETRY_BACKOFF = 30
+    S3_DELETE_RETRIES = 3
+    S3_DELETE_BACKOFF = 0.5
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 's3')
+    STORAGE_BUCKET = os.getenv('S3_BUCKET_NAME')
+    STORAGE_LOCAL_ROOT = os.path.join('instance', 'storage')
+    STORAGE_SIGNING_KEY = 'dev-storage-signing-key'
+    AWS_MAX_POOL_CONNECTIONS = 10
+    AWS_CONNECT_TIMEOUT = 5
+    AWS_READ_TIMEOUT = 10
+    AWS_MAX_ATTEMPTS = 5
+    AWS_RETRY_MODE = 'adaptive'
+    DOWNLOAD_URL_EXPIRES = 300
+    DOWNLOAD_URL_REFRESH_SECONDS = 60
+    DOWNLOAD_URL_CACHE_SIZE = 1000
+    MULTIPART_PART_SIZE = 8 * 1024 * 1024
+    MULTIPART_URL_EXPIRES = 3600
+    SECRET_SOURCES = ('env', 'file', 'ssm')
+    SECRETS_DIR = 'secrets'
+    SECRETS_CACHE_FILE = os.path.expanduser('~/.cache/our-trip/secrets.json')
+    SECRETS_CACHE_TTL = 24 * 3600
+    AWS_REGION = 'us-east-1'
+    FIREBASE_REQUIRED = True
+    SCHEMA_AUTO_MIGRATE = True
+    DB_POOL_METRICS_ENABLED = True
+    DB_POOL_WAIT_WARN_MS = 100
+    METRICS_ENABLED = True
+    METRICS_TOKEN = None
@@ -5,7 +5,129 @@ class ProdConfig:
     DEBUG = True
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     SQLALCHEMY_DATABASE_URI = os.getenv('DB_URL')
+    # pool_size should cover the gunicorn threads per worker; pool_recycle stays below the RDS/proxy
+    # idle timeout and pre_ping replaces connections that died while checked in
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'true').lower() == 'true',
+    }
+    # GET handlers read from the replicas round-robin; users who just wrote are pinned to the
+    # primary for REPLICA_STICKY_SECONDS so they see their own changes
+    SQLALCHEMY_READ_REPLICA_URLS = [url for url in os.getenv('DB_REPLICA_URLS', '').split(',') if url]
+    REPLICA_STICKY_SECONDS = int(os.getenv('REPLICA_STICKY_SECONDS', 5))
+    REPLICA_HEALTH_CHECK_INTERVAL = int(os.getenv('REPLICA_HEALTH_CHECK_INTERVAL', 10))
+    DB_POOL_METRICS_ENABLED = os.getenv('DB_POOL_METRICS_ENABLED', 'true').lower() == 'true'
+    DB_POOL_WAIT_WARN_MS = float(os.getenv('DB_POOL_WAIT_WARN_MS', 100))
+    # /internal/metrics is only served when METRICS_TOKEN is set, and requires it in the X-Metrics-Token header
+    METRICS_ENABLED = os.getenv('METRICS_TOKEN') is not None
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
     PORT=5555
     HOST="0.0.0.0"
     LOG_LEVEL = logging.WARNING
-    LOG_FILE = "app.log"
\ No newline at end of file
+    LOG_FILE = "app.log"
+    # Verified Firebase ID tokens are cached per process so repeat requests skip RS256 verification.
+    # TOKEN_CACHE_ENABLED=false is the kill switch; TOKEN_CACHE_MAX_TTL caps how long a revoked token
+    # can keep being served from cache. With TOKEN_CHECK_REVOKED, a cached token is re-checked against
+    # Firebase after TOKEN_REVOCATION_CHECK_SECONDS instead (0 re-checks on every request).
+    TOKEN_CACHE_ENABLED = os.getenv('TOKEN_CACHE_ENABLED', 'true').lower() == 'true'
+    TOKEN_CACHE_SIZE = int(os.getenv('TOKEN_CACHE_SIZE', 10000))
+    TOKEN_CACHE_MAX_TTL = int(os.getenv('TOKEN_CACHE_MAX_TTL', 300))
+    TOKEN_CHECK_REVOKED = os.getenv('TOKEN_CHECK_REVOKED', 'false').lower() == 'true'
+    TOKEN_REVOCATION_CHECK_SECONDS = int(os.getenv('TOKEN_REVOCATION_CHECK_SECONDS', 30))
+    # Trip membership answers are cached per process. Writes invalidate the local worker's entries,
+    # so MEMBERSHIP_CACHE_TTL bounds how stale another worker can be after a guest change.
+    MEMBERSHIP_CACHE_ENABLED = os.getenv('MEMBERSHIP_CACHE_ENABLED', 'true').lower() == 'true'
+    MEMBERSHIP_CACHE_SIZE = int(os.getenv('MEMBERSHIP_CACHE_SIZE', 10000))
+    MEMBERSHIP_CACHE_TTL = int(os.getenv('MEMBERSHIP_CACHE_TTL', 30))
+    # List endpoints page only when the client sends limit or cursor; PAGE_SIZE_MAX caps the limit.
+    PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 50))
+    PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 200))
+    # `flask changes compact` keeps this many of each trip's most recent changes; older ones are
+    # replaced by a snapshot.
+    CHANGE_LOG_RETAIN = int(os.getenv('CHANGE_LOG_RETAIN', 500))
+    # Empty itinerary days are synthesized from the trip's dates and only stored once edited; set to
+    # false to insert a row per day when the trip is created.
+    ITINERARY_VIRTUAL_DAYS = os.getenv('ITINERARY_VIRTUAL_DAYS', 'true').lower() == 'true'
+    # Secrets are looked up in order: FIREBASE_KEY-style environment variables, files in SECRETS_DIR,
+    # then SSM. SSM values are cached in a 0600 file so worker restarts don't block on the network.
+    SECRET_SOURCES = tuple(os.getenv('SECRET_SOURCES', 'env,file,ssm').split(','))
+    SECRETS_DIR = os.getenv('SECRETS_DIR', '/run/secrets')
+    SECRETS_CACHE_FILE = os.getenv('SECRETS_CACHE_FILE', '/tmp/our-trip/secrets.json')
+    SECRETS_CACHE_TTL = int(os.getenv('SECRETS_CACHE_TTL', 3600))
+    SSM_TIMEOUT = int(os.getenv('SSM_TIMEOUT', 3))
+    AWS_REGION = os.getenv('AWS_REGION', 'us-east-1')
+    FIREBASE_REQUIRED = True
+    # With preload_app the master applies pending migrations once before forking; set to false to
+    # require an explicit `flask migrate upgrade` as a deploy step instead.
+    SCHEMA_AUTO_MIGRATE = os.getenv('SCHEMA_AUTO_MIGRATE', 'true').lower() == 'true'
+    # Read by gunicorn.conf.py. GUNICORN_WORKERS=0 derives the worker count from the CPUs available to
+    # the container. KEEPALIVE is longer than the load balancer's 60s idle timeout so it closes first.
+    GUNICORN_BIND = os.getenv('GUNICORN_BIND', f"{HOST}:{PORT}")
+    GUNICORN_WORKER_CLASS = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+    GUNICORN_WORKERS = int(os.getenv('GUNICORN_WORKERS', 0))
+    GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', 8))
+    GUNICORN_WORKER_CONNECTIONS = int(os.getenv('GUNICORN_WORKER_CONNECTIONS', 1000))
+    GUNICORN_PRELOAD_APP = os.getenv('GUNICORN_PRELOAD_APP', 'true').lower() == 'true'
+    GUNICORN_PRELOAD_SDKS = os.getenv('GUNICORN_PRELOAD_SDKS', 'true').lower() == 'true'
+    GUNICORN_MAX_REQUESTS = int(os.getenv('GUNICORN_MAX_REQUESTS', 5000))
+    GUNICORN_MAX_REQUESTS_JITTER = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 500))
+    GUNICORN_KEEPALIVE = int(os.getenv('GUNICORN_KEEPALIVE', 75))
+    GUNICORN_TIMEOUT = int(os.getenv('GUNICORN_TIMEOUT', 30))
+    GUNICORN_GRACEFUL_TIMEOUT = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+    # /trips/stream fans out through an in-process pubsub. The 'changelog' backend hears other workers'
+    # commits by polling the trips' change-log seqs once per PUBSUB_POLL_INTERVAL per worker.
+    PUBSUB_BACKEND = os.getenv('PUBSUB_BACKEND', 'changelog')
+    PUBSUB_POLL_INTERVAL = float(os.getenv('PUBSUB_POLL_INTERVAL', 1.0))
+    # Open streams per worker. A stream is a parked greenlet under gevent but a whole thread under
+    # gthread, where all but one thread may hold one so the worker can still answer other requests;
+    # sync workers can't spare one at all, so the default follows the worker class.
+    STREAM_MAX_CONNECTIONS = int(os.getenv('STREAM_MAX_CONNECTIONS', {
+        'gevent': GUNICORN_WORKER_CONNECTIONS // 2,
+        'gthread': max(GUNICORN_THREADS - 1, 1),
+    }.get(GUNICORN_WORKER_CLASS, 0)))
+    STREAM_HEARTBEAT_SECONDS = int(os.getenv('STREAM_HEARTBEAT_SECONDS', 15))
+    STREAM_MAX_SECONDS = int(os.getenv('STREAM_MAX_SECONDS', 300))
+    STREAM_RETRY_MS = int(os.getenv('STREAM_RETRY_MS', 3000))
+    # /batch runs at most BATCH_MAX_REQUESTS sub-requests, and with "parallel" up to BATCH_MAX_PARALLEL
+    # consecutive reads at once, each on its own pooled connection.
+    BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+    BATCH_MAX_PARALLEL = int(os.getenv('BATCH_MAX_PARALLEL', 4))
+    # `flask jobs work` polls the jobs table every JOB_POLL_INTERVAL seconds. A claimed job runs again if
+    # it isn't finished within JOB_LEASE_SECONDS; failures back off from JOB_RETRY_BACKOFF seconds,
+    # doubling, for up to JOB_MAX_ATTEMPTS attempts.
+    JOB_POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', 5))
+    JOB_LEASE_SECONDS = int(os.getenv('JOB_LEASE_SECONDS', 300))
+    JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', 8))
+    JOB_RETRY_BACKOFF = int(os.getenv('JOB_RETRY_BACKOFF', 30))
+    # retries within one job for keys DeleteObjects reports as failed
+    S3_DELETE_RETRIES = int(os.getenv('S3_DELETE_RETRIES', 3))
+    S3_DELETE_BACKOFF = float(os.getenv('S3_DELETE_BACKOFF', 0.5))
+    # Uploaded documents go to the S3_BUCKET_NAME bucket. STORAGE_BACKEND=local keeps them under
+    # STORAGE_LOCAL_ROOT instead and serves them from /storage with URLs signed by STORAGE_SIGNING_KEY,
+    # which every worker must share; that's meant for benchmarks and running without AWS.
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 's3')
+    STORAGE_BUCKET = os.getenv('S3_BUCKET_NAME')
+    STORAGE_LOCAL_ROOT = os.getenv('STORAGE_LOCAL_ROOT', '/tmp/our-trip/storage')
+    STORAGE_SIGNING_KEY = os.getenv('STORAGE_SIGNING_KEY')
+    # boto3 clients are shared by every thread (or greenlet) in a worker, so their pool should cover the
+    # requests that can call AWS at once. Adaptive retries also rate-limit the client while AWS throttles.
+    AWS_MAX_POOL_CONNECTIONS = int(os.getenv('AWS_MAX_POOL_CONNECTIONS', {
+        'gevent': 50,
+        'gthread': GUNICORN_THREADS,
+    }.get(GUNICORN_WORKER_CLASS, 10)))
+    AWS_CONNECT_TIMEOUT = int(os.getenv('AWS_CONNECT_TIMEOUT', 5))
+    AWS_READ_TIMEOUT = int(os.getenv('AWS_READ_TIMEOUT', 10))
+    AWS_MAX_ATTEMPTS = int(os.getenv('AWS_MAX_ATTEMPTS', 5))
+    AWS_RETRY_MODE = os.getenv('AWS_RETRY_MODE', 'adaptive')
+    # /uploads/download-urls signs URLs valid for DOWNLOAD_URL_EXPIRES seconds and hands the same URL out
+    # again until DOWNLOAD_URL_REFRESH_SECONDS before it expires.
+    DOWNLOAD_URL_EXPIRES = int(os.getenv('DOWNLOAD_URL_EXPIRES', 300))
+    DOWNLOAD_URL_REFRESH_SECONDS = int(os.getenv('DOWNLOAD_URL_REFRESH_SECONDS', 60))
+    DOWNLOAD_URL_CACHE_SIZE = int(os.getenv('DOWNLOAD_URL_CACHE_SIZE', 10000))
+    # multipart uploads: bytes per part (S3 needs at least 5 MiB for all but the last) and how long each
+    # presigned part URL stays valid
+    MULTIPART_PART_SIZE = int(os.getenv('MULTIPART_PART_SIZE', 8 * 1024 * 1024))
+    MULTIPART_URL_EXPIRES = int(os.getenv('MULTIPART_URL_EXPIRES', 3600))
@@ -0,0 +1,180 @@
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+class SecretNotFoundError(KeyError):
+    pass
+
+def env_var_name(name):
+    # firebaseKey -> FIREBASE_KEY
+    return re.sub(r'(?<!^)(?=[A-Z])', '_', name).upper()
+
+class EnvSecretSource:
+    name = 'env'
+    remote = False
+
+    def get(self, secret_name):
+        return os.environ.get(env_var_name(secret_name))
+
+class FileSecretSource:
+    name = 'file'
+    remote = False
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get(self, secret_name):
+        if not self.directory:
+            return None
+        path = os.path.join(self.directory, secret_name)
+        if not os.path.isfile(path):
+            return None
+        with open(path) as f:
+            return f.read().strip()
+
+class SSMSecretSource:
+    name = 'ssm'
+    remote = True
+
+    def __init__(self, region_name, timeout=3):
+        self.region_name = region_name
+        self.timeout = timeout
+
+    def get(self, secret_name):
+        # imported here so processes that never reach SSM don't pay for loading boto3
+        from clients import get_boto3_client
+
+        # secrets are read while booting, so fail fast rather than retrying like request-time clients
+        ssm = get_boto3_client('ssm', self.region_name, connect_timeout=self.timeout, read_timeout=self.timeout,
+                               max_attempts=3, retry_mode='standard')
+        response = ssm.get_parameter(Name=secret_name, WithDecryption=True)
+        return response['Parameter']['Value']
+
+class DiskSecretCache:
+    """JSON file of secrets fetched from remote sources, readable only by the owning user."""
+
+    def __init__(self, path, ttl):
+        self.path = path
+        self.ttl = ttl
+
+    def _read(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return {}
+        if st.st_mode & 0o077:
+            logger.warning("Ignoring secrets cache %s: permissions are broader than 0600", self.path)
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable secrets cache %s: %s", self.path, e)
+            return {}
+
+    def get(self, secret_name, allow_stale=False):
+        entry = self._read().get(secret_name)
+        if not entry:
+            return None
+        if not allow_stale and time.time() - entry['fetched_at'] > self.ttl:
+            return None
+        return entry['value']
+
+    def put(self, secret_name, value):
+        entries = self._read()
+        entries[secret_name] = {'value': value, 'fetched_at': time.time()}
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        # write to a 0600 temp file and rename so readers never see a partial or world-readable file
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.secrets-')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.chmod(tmp_path, 0o600)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+
+class SecretStore:
+    """Resolves secrets from an ordered list of sources.
+
+    Values are memoized for the life of the process, so when gunicorn preloads the app the
+    lookup happens once in the master and every forked worker inherits the result. Values
+    from remote sources are also written to a permission-restricted disk cache, which is
+    reused within its TTL and as a stale fallback when the remote source is unreachable.
+    """
+
+    def __init__(self, sources, cache=None):
+        self.sources = sources
+        self.cache = cache
+        self.timings = {}
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def get(self, secret_name, required=True):
+        with self._lock:
+            if secret_name not in self._values:
+                start = time.perf_counter()
+                value, origin = self._resolve(secret_name)
+                elapsed = time.perf_counter() - start
+                self.timings[secret_name] = {'source': origin, 'seconds': elapsed}
+                if value is not None:
+                    logger.info("Loaded secret %s from %s in %.1f ms", secret_name, origin, elapsed * 1000)
+                    self._values[secret_name] = value
+            value = self._values.get(secret_name)
+        if value is None and required:
+            raise SecretNotFoundError(secret_name)
+        return value
+
+    def _resolve(self, secret_name):
+        for source in self.sources:
+            if not source.remote:
+                value = source.get(secret_name)
+                if value is not None:
+                    return value, source.name
+                continue
+
+            if self.cache:
+                value = self.cache.get(secret_name)
+                if value is not None:
+                    return value, f"{source.name}-cache"
+            try:
+                value = source.get(secret_name)
+            except Exception as e:
+                logger.error("Failed to load secret %s from %s: %s", secret_name, source.name, e)
+                stale = self.cache.get(secret_name, allow_stale=True) if self.cache else None
+                if stale is not None:
+                    logger.warning("Using stale cached value for secret %s", secret_name)
+                    return stale, f"{source.name}-stale-cache"
+                continue
+            if value is not None:
+                if self.cache:
+                    try:
+                        self.cache.put(secret_name, value)
+                    except OSError as e:
+                        logger.warning("Could not write secrets cache: %s", e)
+                return value, source.name
+        return None, None
+
+_stores = {}
+
+def get_secret_store(config):
+    sources = tuple(config.get('SECRET_SOURCES', ('env', 'file', 'ssm')))
+    cache_path = config.get('SECRETS_CACHE_FILE')
+    key = (sources, config.get('SECRETS_DIR'), cache_path)
+    if key not in _stores:
+        available = {
+            'env': lambda: EnvSecretSource(),
+            'file': lambda: FileSecretSource(config.get('SECRETS_DIR')),
+            'ssm': lambda: SSMSecretSource(config.get('AWS_REGION', 'us-east-1'), config.get('SSM_TIMEOUT', 3)),
+        }
+        cache = DiskSecretCache(cache_path, config.get('SECRETS_CACHE_TTL', 3600)) if cache_path else None
+        _stores[key] = SecretStore([available[name]() for name in sources], cache)
+    return _stores[key]
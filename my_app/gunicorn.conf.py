@@ -0,0 +1,68 @@
+# Gunicorn settings, driven by the active config class (config/prod.py in the container).
+#   gunicorn -c gunicorn.conf.py "app:create_app()"
+import gc
+import logging
+import os
+from config import get_config
+
+cfg = get_config()
+logger = logging.getLogger('gunicorn.error')
+
+def _setting(name, default):
+    return getattr(cfg, f"GUNICORN_{name}", default)
+
+def _available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+worker_class = _setting('WORKER_CLASS', 'gthread')
+if worker_class == 'gevent':
+    try:
+        # patch before the app (and its locks, sockets and ssl) is imported by preload_app
+        from gevent import monkey
+        monkey.patch_all()
+    except ImportError:
+        logger.warning("gevent is not installed, falling back to gthread workers")
+        worker_class = 'gthread'
+
+bind = _setting('BIND', f"{getattr(cfg, 'HOST', '0.0.0.0')}:{getattr(cfg, 'PORT', 5555)}")
+# sync workers only serve one request at a time; gthread and gevent get concurrency inside the worker
+workers = _setting('WORKERS', 0) or (_available_cpus() * 2 + 1 if worker_class == 'sync' else _available_cpus() + 1)
+threads = _setting('THREADS', 8) if worker_class == 'gthread' else 1
+worker_connections = _setting('WORKER_CONNECTIONS', 1000)
+preload_app = _setting('PRELOAD_APP', True)
+max_requests = _setting('MAX_REQUESTS', 5000)
+max_requests_jitter = _setting('MAX_REQUESTS_JITTER', 500)
+keepalive = _setting('KEEPALIVE', 75)
+timeout = _setting('TIMEOUT', 30)
+graceful_timeout = _setting('GRACEFUL_TIMEOUT', 30)
+
+if preload_app:
+    # the config is read before the app is preloaded; hold off collections until gc.freeze() so the
+    # master's heap isn't fragmented (and its pages un-shared) while the app is built
+    gc.disable()
+
+def when_ready(server):
+    if preload_app and _setting('PRELOAD_SDKS', True):
+        from clients import preload_modules
+        preload_modules()
+    if preload_app:
+        # move everything allocated so far into the permanent generation so workers' collections
+        # never write to the shared pages
+        gc.freeze()
+        gc.enable()
+    logger.info("Gunicorn ready: %s x %s workers, threads=%s, preload=%s", workers, worker_class, threads, preload_app)
+
+def post_fork(server, worker):
+    if preload_app:
+        # connections opened by the master (schema check) must not be shared with the children
+        from models import db
+        app = server.app.wsgi()
+        with app.app_context():
+            engines = list(db.engines.values())
+            if 'replica_router' in app.extensions:
+                engines += app.extensions['replica_router'].engines.values()
+            for engine in engines:
+                engine.dispose(close=False)
@@ -0,0 +1,95 @@
+import json
+import time
+from datetime import datetime, timedelta
+import click
+from flask import current_app as app
+from flask.cli import AppGroup
+from sqlalchemy import select, update
+from models import db, Job
+
+# A durable queue in the jobs table. enqueue() adds the job to the caller's transaction, so it's
+# stored exactly when the request's own writes are. `flask jobs work` runs due jobs one at a time:
+# a failed job is retried with exponential backoff until it has used JOB_MAX_ATTEMPTS, and a
+# worker that dies mid-job leaves it to run again once its lease expires. Handlers must therefore
+# be safe to run more than once.
+
+jobs_cli = AppGroup('jobs', help="Run and inspect background jobs.")
+HANDLERS = {}
+
+def handler(kind):
+    """Registers the decorated function to run jobs of this kind. It's called with the job's payload."""
+    def register(fn):
+        HANDLERS[kind] = fn
+        return fn
+    return register
+
+def enqueue(kind, payload):
+    now = datetime.now()
+    job = Job(kind=kind, payload=json.dumps(payload), attempts=0, run_at=now, created_at=now)
+    db.session.add(job)
+    return job
+
+def claim(lease):
+    """Takes the next due job for `lease` seconds and commits, or returns None when nothing is due."""
+    now = datetime.now()
+    job = db.session.execute(
+        select(Job)
+        .where(Job.failed_at.is_(None), Job.run_at <= now)
+        .order_by(Job.run_at, Job.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar()
+    if job is None:
+        db.session.rollback()
+        return None
+    job.run_at = now + timedelta(seconds=lease)
+    job.attempts += 1
+    db.session.commit()
+    return job
+
+def run_next():
+    """Runs the next due job. Returns False when there was none."""
+    job = claim(app.config.get('JOB_LEASE_SECONDS', 300))
+    if job is None:
+        return False
+
+    try:
+        HANDLERS[job.kind](json.loads(job.payload))
+    except Exception as e:
+        db.session.rollback()
+        app.logger.warning("Job %s (%s) failed on attempt %s: %s", job.id, job.kind, job.attempts, e)
+        job.last_error = str(e)[:1000]
+        if job.attempts >= app.config.get('JOB_MAX_ATTEMPTS', 8):
+            job.failed_at = datetime.now()
+            app.logger.error("Job %s (%s) gave up after %s attempts", job.id, job.kind, job.attempts)
+        else:
+            job.run_at = datetime.now() + timedelta(seconds=app.config.get('JOB_RETRY_BACKOFF', 30) * 2 ** (job.attempts - 1))
+    else:
+        db.session.delete(job)
+    db.session.commit()
+    return True
+
+@jobs_cli.command('work')
+@click.option('--once', is_flag=True, help="Run the jobs that are due, then exit.")
+def work_command(once):
+    interval = app.config.get('JOB_POLL_INTERVAL', 5)
+    while True:
+        ran = 0
+        while run_next():
+            ran += 1
+        if once:
+            click.echo(f"Ran {ran} job(s).")
+            return
+        time.sleep(interval)
+
+@jobs_cli.command('retry')
+def retry_command():
+    """Queues every failed job to run again."""
+    retried = db.session.execute(
+        update(Job).where(Job.failed_at.is_not(None)).values(failed_at=None, attempts=0, run_at=datetime.now())
+    ).rowcount
+    db.session.commit()
+    click.echo(f"Requeued {retried} job(s).")
+
+def init_app(app):
+    app.cli.add_command(jobs_cli)
@@ -0,0 +1,85 @@
+import time
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from sqlalchemy import select, text
+from sqlalchemy.exc import DBAPIError
+from models import db, SchemaVersion
+from .ops import MigrationError
+from .versions import MIGRATIONS
+
+HEAD = MIGRATIONS[-1].version
+
+migrate_cli = AppGroup('migrate', help="Database schema migrations.")
+
+def current_version(conn):
+    try:
+        return conn.execute(select(SchemaVersion.version).where(SchemaVersion.id == 1)).scalar() or 0
+    except DBAPIError:
+        # the version table doesn't exist yet
+        conn.rollback()
+        return 0
+
+def upgrade(engine, logger, target=HEAD):
+    with engine.connect() as conn:
+        # serialize concurrent upgrades (e.g. several containers booting at once) on MySQL
+        locked = conn.dialect.name == 'mysql'
+        if locked:
+            conn.execute(text("SELECT GET_LOCK('our_trip_schema_migration', 60)"))
+        try:
+            version = current_version(conn)
+            for migration in MIGRATIONS:
+                if version < migration.version <= target:
+                    logger.info("Applying migration %s: %s", migration.version, migration.description)
+                    migration.upgrade(conn)
+                    version = migration.version
+                    _set_version(conn, version)
+                    conn.commit()
+            return version
+        finally:
+            if locked:
+                conn.execute(text("SELECT RELEASE_LOCK('our_trip_schema_migration')"))
+
+def _set_version(conn, version):
+    SchemaVersion.__table__.create(bind=conn, checkfirst=True)
+    updated = conn.execute(
+        SchemaVersion.__table__.update().where(SchemaVersion.id == 1).values(version=version)
+    ).rowcount
+    if not updated:
+        conn.execute(SchemaVersion.__table__.insert().values(id=1, version=version))
+
+def ensure_schema(app):
+    """Boot-time check. Reads the single version row and only migrates when it's behind HEAD.
+
+    Raises MigrationError, which stops the app from starting, if the schema is behind and
+    SCHEMA_AUTO_MIGRATE is off or a migration can't be applied.
+    """
+    start = time.perf_counter()
+    with db.engine.connect() as conn:
+        version = current_version(conn)
+
+    if version == HEAD:
+        app.logger.info("Database schema at version %s (checked in %.1f ms)", version, (time.perf_counter() - start) * 1000)
+    elif version > HEAD:
+        app.logger.warning("Database schema version %s is newer than this release's %s", version, HEAD)
+    elif app.config.get('SCHEMA_AUTO_MIGRATE', False):
+        version = upgrade(db.engine, app.logger)
+        app.logger.info("Database schema migrated to version %s", version)
+    else:
+        # the models expect tables and columns the database doesn't have yet
+        raise MigrationError(f"Database schema at version {version}, expected {HEAD}. Run `flask migrate upgrade`.")
+    return version
+
+@migrate_cli.command('upgrade')
+@click.option('--target', type=int, default=HEAD, help="Version to upgrade to.")
+def upgrade_command(target):
+    version = upgrade(db.engine, current_app.logger, target)
+    click.echo(f"Database schema at version {version}.")
+
+@migrate_cli.command('current')
+def current_command():
+    with db.engine.connect() as conn:
+        click.echo(f"Database schema at version {current_version(conn)} (head is {HEAD}).")
+
+def init_app(app):
+    app.cli.add_command(migrate_cli)
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, select
+
+# Each migration declares the tables and indexes it creates as they were when it was written, in its
+# own MetaData, rather than using the models. The models move on; a migration has to keep producing
+# the same schema, so that a fresh database migrated to HEAD matches one upgraded step by step.
+
+class MigrationError(Exception):
+    pass
+
+def reference_tables(metadata):
+    """Bare trips and users tables, so a migration's foreign keys to them resolve. They aren't created."""
+    Table('users', metadata, Column('id', String(36), primary_key=True))
+    Table('trips', metadata, Column('id', Integer, primary_key=True))
+
+def create_tables(conn, *tables):
+    for table in tables:
+        table.create(bind=conn, checkfirst=True)
+
+def create_index(conn, index):
+    index.create(bind=conn, checkfirst=True)
+
+def check_unique(conn, column, limit=20):
+    """Raises MigrationError listing the column's duplicated values, before a unique index on it is created."""
+    duplicates = conn.execute(
+        select(column, func.count()).where(column.is_not(None)).group_by(column).having(func.count() > 1).limit(limit)
+    ).all()
+    if duplicates:
+        listed = ", ".join(f"{value!r} ({count} rows)" for value, count in duplicates)
+        raise MigrationError(
+            f"{column.table.name}.{column.name} must be unique but has duplicate values: {listed}. "
+            "Resolve them and run `flask migrate upgrade` again."
+        )
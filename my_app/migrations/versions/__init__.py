@@ -0,0 +1,19 @@
+from . import m0001_baseline
+from . import m0002_lookup_indexes
+from . import m0003_hot_lookup_indexes
+from . import m0004_trip_balances
+from . import m0005_pagination_indexes
+from . import m0006_trip_collection_versions
+from . import m0007_trip_change_log
+from . import m0008_jobs
+
+MIGRATIONS = [
+    m0001_baseline,
+    m0002_lookup_indexes,
+    m0003_hot_lookup_indexes,
+    m0004_trip_balances,
+    m0005_pagination_indexes,
+    m0006_trip_collection_versions,
+    m0007_trip_change_log,
+    m0008_jobs,
+]
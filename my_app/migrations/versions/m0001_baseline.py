@@ -0,0 +1,126 @@
+from sqlalchemy import (TIMESTAMP, Boolean, Column, DateTime, Enum, Float, ForeignKey, Integer, MetaData, String, Table,
+                        UniqueConstraint, func)
+from migrations.ops import create_tables
+
+version = 1
+description = "Baseline schema for the tables previously created by db.create_all"
+
+metadata = MetaData()
+
+users = Table(
+    'users', metadata,
+    Column('id', String(36), primary_key=True),
+    Column('phone_number', String(20), nullable=False),
+    Column('first_name', String(45), nullable=False),
+    Column('last_name', String(45), nullable=False),
+    Column('created_at', DateTime(timezone=True), nullable=False, server_default=func.now()),
+    UniqueConstraint('phone_number'),
+)
+
+trips = Table(
+    'trips', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('token', String(200), nullable=False),
+    Column('name', String(100), nullable=False),
+    Column('description', String(200), nullable=True),
+    Column('host_id', String(20), ForeignKey('users.id'), nullable=False),
+    Column('start_date', DateTime, nullable=False),
+    Column('end_date', DateTime, nullable=False),
+    Column('created_at', DateTime(timezone=True), nullable=False, server_default=func.now()),
+)
+
+trip_guests = Table(
+    'trip_guests', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('trip_id', Integer, ForeignKey('trips.id'), nullable=False, index=True),
+    Column('guest_id', String(20), ForeignKey('users.id'), nullable=False, index=True),
+    Column('is_host', Boolean, nullable=False),
+    Column('rsvp_status', Enum('INVITED', 'YES', 'NO', 'MAYBE', name='rsvpstatus'), nullable=False),
+    UniqueConstraint('trip_id', 'guest_id'),
+)
+
+user_uploads = Table(
+    'user_uploads', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('upload_user_id', String(20), ForeignKey('users.id'), nullable=False, index=True),
+    Column('document_category', Enum('TRAVEL', 'ACCOMMODATION', name='documentcategory'), nullable=False),
+    Column('trip_id', Integer, ForeignKey('trips.id'), nullable=False, index=True),
+    Column('file_name', String(255), nullable=False),
+    Column('s3_url', String(512), nullable=False),
+    Column('upload_timestamp', TIMESTAMP(6), nullable=False, server_default=func.now()),
+)
+
+trip_todos = Table(
+    'trip_todos', metadata,
+    Column('id', String(45), primary_key=True),
+    Column('trip_id', Integer, ForeignKey('trips.id'), nullable=False, index=True),
+    Column('text', String(500), nullable=False),
+    Column('checked', Boolean, nullable=False),
+    Column('last_updated_at', DateTime, nullable=False),
+)
+
+trip_expenses = Table(
+    'trip_expenses', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('trip_id', Integer, ForeignKey('trips.id'), nullable=False, index=True),
+    Column('user_id', String(20), ForeignKey('users.id'), nullable=False, index=True),
+    Column('title', String(200), nullable=False),
+    Column('amount', Float, nullable=False),
+    Column('settled', Boolean, nullable=False),
+    Column('created_at', DateTime, nullable=False),
+    Column('updated_at', DateTime, nullable=False),
+)
+
+trip_expense_shares = Table(
+    'trip_expense_shares', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('expense_id', Integer, ForeignKey('trip_expenses.id'), nullable=False, index=True),
+    Column('user_id', String(20), ForeignKey('users.id'), nullable=False, index=True),
+    Column('amount', Float, nullable=False),
+    Column('trip_id', Integer, ForeignKey('trips.id'), nullable=False, index=True),
+)
+
+location_categories = Table(
+    'location_categories', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('trip_id', Integer, ForeignKey('trips.id'), nullable=False, index=True),
+    Column('name', String(50), nullable=False),
+    UniqueConstraint('trip_id', 'name'),
+)
+
+trip_locations = Table(
+    'trip_locations', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('place_id', String(200), nullable=False),
+    Column('trip_id', Integer, ForeignKey('trips.id'), nullable=False, index=True),
+    Column('user_id', String(20), ForeignKey('users.id'), nullable=False, index=True),
+    Column('name', String(200), nullable=False),
+    Column('latitude', Float, nullable=False),
+    Column('longitude', Float, nullable=False),
+    Column('category_id', Integer, ForeignKey('location_categories.id'), nullable=True),
+    UniqueConstraint('place_id', 'trip_id'),
+)
+
+itinerary_entries = Table(
+    'itinerary_entries', metadata,
+    Column('id', String(45), primary_key=True),
+    Column('trip_id', Integer, ForeignKey('trips.id'), nullable=False, index=True),
+    Column('date', DateTime, nullable=False),
+    Column('description', String(500), nullable=False),
+)
+
+def upgrade(conn):
+    # checkfirst makes this a no-op against databases that were created before migrations existed
+    create_tables(
+        conn,
+        users,
+        trips,
+        trip_guests,
+        user_uploads,
+        trip_todos,
+        trip_expenses,
+        trip_expense_shares,
+        location_categories,
+        trip_locations,
+        itinerary_entries,
+    )
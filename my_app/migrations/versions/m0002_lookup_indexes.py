@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Index, Integer, MetaData, String, Table
+from migrations.ops import create_index
+
+version = 2
+description = "Indexes for expense share and upload lookups"
+
+metadata = MetaData()
+
+trip_expense_shares = Table(
+    'trip_expense_shares', metadata,
+    Column('expense_id', Integer),
+    Column('user_id', String(20)),
+)
+user_uploads = Table(
+    'user_uploads', metadata,
+    Column('trip_id', Integer),
+    Column('file_name', String(255)),
+)
+
+def upgrade(conn):
+    create_index(conn, Index('ix_trip_expense_shares_expense_user', trip_expense_shares.c.expense_id, trip_expense_shares.c.user_id))
+    create_index(conn, Index('ix_user_uploads_trip_file_name', user_uploads.c.trip_id, user_uploads.c.file_name))
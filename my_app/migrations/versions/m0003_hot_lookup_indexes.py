@@ -0,0 +1,35 @@
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, MetaData, String, Table
+from migrations.ops import check_unique, create_index
+
+version = 3
+description = "Unique and composite indexes for invite, upload, itinerary, location and trip list lookups"
+
+metadata = MetaData()
+
+trips = Table('trips', metadata, Column('token', String(200)))
+user_uploads = Table(
+    'user_uploads', metadata,
+    Column('s3_url', String(512)),
+    Column('trip_id', Integer),
+    Column('document_category', Enum('TRAVEL', 'ACCOMMODATION', name='documentcategory')),
+)
+itinerary_entries = Table('itinerary_entries', metadata, Column('trip_id', Integer), Column('date', DateTime))
+trip_locations = Table('trip_locations', metadata, Column('trip_id', Integer), Column('category_id', Integer))
+trip_guests = Table(
+    'trip_guests', metadata,
+    Column('guest_id', String(20)),
+    Column('trip_id', Integer),
+    Column('rsvp_status', Enum('INVITED', 'YES', 'NO', 'MAYBE', name='rsvpstatus')),
+)
+
+def upgrade(conn):
+    # which of two trips sharing an invite token, or two uploads sharing a key, should win is for a
+    # person to decide, so stop before creating any index and list them
+    check_unique(conn, trips.c.token)
+    check_unique(conn, user_uploads.c.s3_url)
+    create_index(conn, Index('ix_trips_token', trips.c.token, unique=True))
+    create_index(conn, Index('ix_user_uploads_s3_url', user_uploads.c.s3_url, unique=True))
+    create_index(conn, Index('ix_user_uploads_trip_category', user_uploads.c.trip_id, user_uploads.c.document_category))
+    create_index(conn, Index('ix_itinerary_entries_trip_date', itinerary_entries.c.trip_id, itinerary_entries.c.date))
+    create_index(conn, Index('ix_trip_locations_trip_category', trip_locations.c.trip_id, trip_locations.c.category_id))
+    create_index(conn, Index('ix_trip_guests_guest_trip_rsvp', trip_guests.c.guest_id, trip_guests.c.trip_id, trip_guests.c.rsvp_status))
@@ -0,0 +1,52 @@
+from sqlalchemy import (BigInteger, Boolean, Column, Float, ForeignKey, Integer, MetaData, String, Table, case, cast, func,
+                        insert, select, union_all)
+from migrations.ops import create_tables, reference_tables
+
+version = 4
+description = "trip_balances ledger, backfilled from the existing expense rows"
+
+metadata = MetaData()
+reference_tables(metadata)
+
+trip_balances = Table(
+    'trip_balances', metadata,
+    Column('trip_id', Integer, ForeignKey('trips.id'), primary_key=True),
+    Column('user_id', String(20), ForeignKey('users.id'), primary_key=True),
+    Column('balance_cents', BigInteger, nullable=False, default=0),
+)
+trip_expenses = Table(
+    'trip_expenses', metadata,
+    Column('id', Integer, primary_key=True),
+    Column('trip_id', Integer),
+    Column('user_id', String(20)),
+    Column('settled', Boolean),
+)
+trip_expense_shares = Table(
+    'trip_expense_shares', metadata,
+    Column('expense_id', Integer),
+    Column('user_id', String(20)),
+    Column('amount', Float),
+)
+
+def share_cents(amount, dialect_name):
+    # rounds half away from zero, as the ledger did when this migration was written
+    shifted = func.abs(amount) * 100 + 0.5
+    cents = func.floor(shifted) if dialect_name == 'mysql' else cast(shifted, Integer)
+    return case((amount < 0, -cents), else_=cents)
+
+def upgrade(conn):
+    create_tables(conn, trip_balances)
+    conn.execute(trip_balances.delete())
+
+    cents = share_cents(trip_expense_shares.c.amount, conn.dialect.name)
+    shares = trip_expenses.join(trip_expense_shares, trip_expense_shares.c.expense_id == trip_expenses.c.id)
+    unsettled = trip_expenses.c.settled.is_(False)
+    movements = union_all(
+        select(trip_expenses.c.trip_id, trip_expenses.c.user_id, cents.label('cents')).select_from(shares).where(unsettled),
+        select(trip_expenses.c.trip_id, trip_expense_shares.c.user_id, (-cents).label('cents')).select_from(shares).where(unsettled),
+    ).subquery()
+    balances = (
+        select(movements.c.trip_id, movements.c.user_id, func.sum(movements.c.cents))
+        .group_by(movements.c.trip_id, movements.c.user_id)
+    )
+    conn.execute(insert(trip_balances).from_select(['trip_id', 'user_id', 'balance_cents'], balances))
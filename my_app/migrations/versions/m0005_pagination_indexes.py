@@ -0,0 +1,14 @@
+from sqlalchemy import Column, DateTime, Index, Integer, MetaData, String, Table
+from migrations.ops import create_index
+
+version = 5
+description = "Indexes matching the keyset pagination order of get-expenses and get-todos"
+
+metadata = MetaData()
+
+trip_expenses = Table('trip_expenses', metadata, Column('trip_id', Integer), Column('created_at', DateTime), Column('id', Integer))
+trip_todos = Table('trip_todos', metadata, Column('trip_id', Integer), Column('id', String(45)))
+
+def upgrade(conn):
+    create_index(conn, Index('ix_trip_expenses_trip_created_id', trip_expenses.c.trip_id, trip_expenses.c.created_at, trip_expenses.c.id))
+    create_index(conn, Index('ix_trip_todos_trip_id_id', trip_todos.c.trip_id, trip_todos.c.id))
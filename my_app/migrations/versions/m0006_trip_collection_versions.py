@@ -0,0 +1,18 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer, MetaData, String, Table
+from migrations.ops import create_tables, reference_tables
+
+version = 6
+description = "Per-trip collection version counters behind the list endpoints' ETags"
+
+metadata = MetaData()
+reference_tables(metadata)
+
+trip_collection_versions = Table(
+    'trip_collection_versions', metadata,
+    Column('trip_id', Integer, ForeignKey('trips.id'), primary_key=True),
+    Column('collection', String(20), primary_key=True),
+    Column('version', BigInteger, nullable=False, default=0),
+)
+
+def upgrade(conn):
+    create_tables(conn, trip_collection_versions)
@@ -0,0 +1,29 @@
+from sqlalchemy import BigInteger, Column, DateTime, ForeignKey, Integer, MetaData, String, Table, Text
+from sqlalchemy.dialects import mysql
+from migrations.ops import create_tables, reference_tables
+
+version = 7
+description = "Per-trip change log and compaction snapshots behind /trips/changes"
+
+metadata = MetaData()
+reference_tables(metadata)
+
+trip_changes = Table(
+    'trip_changes', metadata,
+    Column('trip_id', Integer, ForeignKey('trips.id'), primary_key=True),
+    Column('seq', BigInteger, primary_key=True, autoincrement=False),
+    Column('collection', String(20), nullable=False),
+    Column('entity_id', String(255), nullable=False),
+    Column('op', String(10), nullable=False),
+)
+trip_snapshots = Table(
+    'trip_snapshots', metadata,
+    Column('trip_id', Integer, ForeignKey('trips.id'), primary_key=True),
+    Column('seq', BigInteger, nullable=False),
+    Column('compacted_through', BigInteger, nullable=False),
+    Column('data', Text().with_variant(mysql.LONGTEXT(), 'mysql'), nullable=False),
+    Column('created_at', DateTime, nullable=False),
+)
+
+def upgrade(conn):
+    create_tables(conn, trip_changes, trip_snapshots)
@@ -0,0 +1,23 @@
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, Text
+from sqlalchemy.dialects import mysql
+from migrations.ops import create_tables
+
+version = 8
+description = "Durable background job queue"
+
+metadata = MetaData()
+
+jobs = Table(
+    'jobs', metadata,
+    Column('id', Integer, primary_key=True, autoincrement=True),
+    Column('kind', String(50), nullable=False),
+    Column('payload', Text().with_variant(mysql.LONGTEXT(), 'mysql'), nullable=False),
+    Column('attempts', Integer, nullable=False, default=0),
+    Column('run_at', DateTime, nullable=False, index=True),
+    Column('last_error', String(1000), nullable=True),
+    Column('failed_at', DateTime, nullable=True),
+    Column('created_at', DateTime, nullable=False),
+)
+
+def upgrade(conn):
+    create_tables(conn, jobs)
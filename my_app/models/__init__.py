@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
+from .routing import RoutingSession, init_replica_routing
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 from .user import User
 from .trip import Trip
@@ -11,4 +12,11 @@ from .trip_expense import TripExpense
 from .trip_expense_share import TripExpenseShare
 from .trip_location import TripLocation
 from .location_category import LocationCategory
-from .itinerary_entry import ItineraryEntry
\ No newline at end of file
+from .itinerary_entry import ItineraryEntry
+from .trip_balance import TripBalance
+from .trip_collection_version import TripCollectionVersion
+from .trip_change import TripChange
+from .trip_snapshot import TripSnapshot
+from .job import Job
+from .upsert import upsert_add
+from .schema_version import SchemaVersion
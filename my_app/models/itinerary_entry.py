@@ -11,3 +11,5 @@ class ItineraryEntry(db.Model):
     trip_id: Mapped[int] = mapped_column(Integer, ForeignKey('trips.id'), nullable=False, index=True)
     date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     description: Mapped[str] = mapped_column(String(500), nullable=False)
+
+    __table_args__ = (db.Index('ix_itinerary_entries_trip_date', 'trip_id', 'date'),)
@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import DateTime, Integer, String, Text
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Mapped, mapped_column
+from models import db
+
+class Job(db.Model):
+    __tablename__ = 'jobs'
+
+    # background work queued in the same transaction as the request that needs it; see jobs.py. A
+    # worker claims a job by pushing run_at past its lease, so a job whose worker died runs again.
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)
+    # a trip's delete job lists every key it stored, which can outgrow MySQL's 64 KB TEXT
+    payload: Mapped[str] = mapped_column(Text().with_variant(mysql.LONGTEXT(), 'mysql'), nullable=False)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    run_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    last_error: Mapped[str] = mapped_column(String(1000), nullable=True)
+    # set once the job has used up its attempts; failed jobs stay for inspection and `flask jobs retry`
+    failed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<Job(id={self.id}, kind='{self.kind}', attempts={self.attempts})>"
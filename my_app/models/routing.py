@@ -0,0 +1,124 @@
+import itertools
+import threading
+import time
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from cache import TTLCache
+
+READ_METHODS = ('GET', 'HEAD')
+STICKY_COOKIE = 'read_primary_until'
+
+class ReplicaRouter:
+    """Round-robin choice between healthy read replica binds, with read-your-writes stickiness."""
+
+    def __init__(self, engines, health_check_interval=10, sticky_seconds=5):
+        self.engines = engines
+        self.health_check_interval = health_check_interval
+        self.sticky_seconds = sticky_seconds
+        self.sticky_users = TTLCache(maxsize=100000, ttl=sticky_seconds)
+        self._cycle = itertools.cycle(list(engines))
+        self._health = {}
+        self._lock = threading.Lock()
+
+    def choose(self):
+        for _ in range(len(self.engines)):
+            with self._lock:
+                key = next(self._cycle)
+            if self.is_healthy(key, self.engines[key]):
+                return self.engines[key]
+        return None
+
+    def is_healthy(self, key, engine):
+        healthy, checked_at = self._health.get(key, (True, 0.0))
+        now = time.monotonic()
+        if now - checked_at < self.health_check_interval:
+            return healthy
+        try:
+            with engine.connect() as conn:
+                conn.exec_driver_sql("SELECT 1")
+            healthy = True
+        except Exception as e:
+            current_app.logger.warning("Read replica %s failed its health check: %s", key, e)
+            healthy = False
+        self._health[key] = (healthy, now)
+        return healthy
+
+    def mark_written(self, user_id):
+        self.sticky_users.set(user_id, True)
+
+    def is_sticky(self, user_id):
+        if user_id is not None and self.sticky_users.get(user_id):
+            return True
+        # the cookie carries stickiness across workers and hosts
+        try:
+            return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
+
+class RoutingSession(Session):
+    """Sends reads made while handling GET requests to a read replica.
+
+    Anything that writes (a flush, or an INSERT/UPDATE/DELETE statement) and every read
+    outside of a GET request uses the primary, as does every read for a user who wrote
+    within the last REPLICA_STICKY_SECONDS.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and self._use_replica(clause):
+            # pick once per request so all of a handler's reads see the same replica
+            if '_replica_engine' not in g:
+                g._replica_engine = current_app.extensions['replica_router'].choose()
+            if g._replica_engine is not None:
+                return g._replica_engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+    def _use_replica(self, clause):
+        if not has_request_context() or request.method not in READ_METHODS:
+            return False
+        router = current_app.extensions.get('replica_router')
+        if router is None or self._flushing or self.new or self.dirty or self.deleted:
+            return False
+        if clause is not None and clause.is_dml:
+            return False
+        return not router.is_sticky(g.get('user_id'))
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _record_write(session, flush_context):
+    if has_request_context():
+        g._db_wrote = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _record_statement_write(orm_execute_state):
+    # bulk query.delete()/update() and Core insert/update/delete statements write without flushing
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        _record_write(orm_execute_state.session, None)
+
+def init_replica_routing(app):
+    urls = app.config.get('SQLALCHEMY_READ_REPLICA_URLS') or []
+    if not urls:
+        return None
+
+    # replicas share the primary's pool settings but not its instrumented pool class
+    options = {k: v for k, v in app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}).items() if k != 'poolclass'}
+    engines = {f"replica_{i}": create_engine(url, **options) for i, url in enumerate(urls)}
+    router = ReplicaRouter(
+        engines,
+        health_check_interval=app.config.get('REPLICA_HEALTH_CHECK_INTERVAL', 10),
+        sticky_seconds=app.config.get('REPLICA_STICKY_SECONDS', 5)
+    )
+    app.extensions['replica_router'] = router
+
+    @app.after_request
+    def pin_writer_to_primary(response):
+        if g.get('_db_wrote'):
+            user_id = g.get('user_id')
+            if user_id is not None:
+                router.mark_written(user_id)
+            response.set_cookie(
+                STICKY_COOKIE, str(time.time() + router.sticky_seconds),
+                max_age=router.sticky_seconds, httponly=True, samesite='Lax'
+            )
+        return response
+
+    return router
@@ -0,0 +1,15 @@
+from datetime import datetime
+from sqlalchemy import DateTime, Integer, func
+from sqlalchemy.orm import Mapped, mapped_column
+from models import db
+
+class SchemaVersion(db.Model):
+    __tablename__ = 'schema_version'
+
+    # single row table, id is always 1
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    version: Mapped[int] = mapped_column(Integer, nullable=False)
+    applied_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, server_default=func.now())
+
+    def __repr__(self):
+        return f"<SchemaVersion(version={self.version}, applied_at='{self.applied_at}')>"
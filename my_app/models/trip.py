@@ -17,5 +17,8 @@ class Trip(db.Model):
         DateTime(timezone=True), server_default=func.now()
     )
 
+    # accept_invite looks trips up by token
+    __table_args__ = (db.Index('ix_trips_token', 'token', unique=True),)
+
     def __repr__(self):
         return f"<Trip(id={self.id}, name='{self.name}', host='{self.host_id}', start_date='{self.start_date}', end_date='{self.end_date}')>"
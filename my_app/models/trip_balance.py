@@ -0,0 +1,14 @@
+from sqlalchemy import BigInteger, String, Integer, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from models import db
+
+class TripBalance(db.Model):
+    __tablename__ = 'trip_balances'
+
+    # running net balance per guest, kept in step with the expense rows by the expense routes
+    trip_id: Mapped[int] = mapped_column(Integer, ForeignKey('trips.id'), primary_key=True)
+    user_id: Mapped[str] = mapped_column(String(20), ForeignKey('users.id'), primary_key=True)
+    balance_cents: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TripBalance(trip_id={self.trip_id}, user_id='{self.user_id}', balance_cents={self.balance_cents})>"
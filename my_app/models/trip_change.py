@@ -0,0 +1,16 @@
+from sqlalchemy import BigInteger, String, Integer, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from models import db
+
+class TripChange(db.Model):
+    __tablename__ = 'trip_changes'
+
+    # one row per created, updated or deleted entity, numbered by a per-trip sequence; see routes/changes.py
+    trip_id: Mapped[int] = mapped_column(Integer, ForeignKey('trips.id'), primary_key=True)
+    seq: Mapped[int] = mapped_column(BigInteger, primary_key=True, autoincrement=False)
+    collection: Mapped[str] = mapped_column(String(20), nullable=False)
+    entity_id: Mapped[str] = mapped_column(String(255), nullable=False)
+    op: Mapped[str] = mapped_column(String(10), nullable=False)
+
+    def __repr__(self):
+        return f"<TripChange(trip_id={self.trip_id}, seq={self.seq}, collection='{self.collection}', entity_id='{self.entity_id}', op='{self.op}')>"
@@ -0,0 +1,15 @@
+from sqlalchemy import BigInteger, String, Integer, ForeignKey
+from sqlalchemy.orm import Mapped, mapped_column
+from models import db
+
+class TripCollectionVersion(db.Model):
+    __tablename__ = 'trip_collection_versions'
+
+    # one row per trip and polled collection, see routes/versioning.py
+
+    trip_id: Mapped[int] = mapped_column(Integer, ForeignKey('trips.id'), primary_key=True)
+    collection: Mapped[str] = mapped_column(String(20), primary_key=True)
+    version: Mapped[int] = mapped_column(BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<TripCollectionVersion(trip_id={self.trip_id}, collection='{self.collection}', version={self.version})>"
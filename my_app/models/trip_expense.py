@@ -15,7 +15,9 @@ class TripExpense(db.Model):
     settled: Mapped[bool] = mapped_column(Boolean, nullable=False)
     created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
-    
+
+    # get-expenses pages through a trip's expenses by (created_at, id)
+    __table_args__ = (db.Index('ix_trip_expenses_trip_created_id', 'trip_id', 'created_at', 'id'),)
 
     def __repr__(self):
         return f"<TripExpense(id={self.id}, trip_id={self.trip_id}, payer_id='{self.payer_id}', description='{self.description}')>"
\ No newline at end of file
@@ -12,5 +12,8 @@ class TripExpenseShare(db.Model):
     amount: Mapped[float] = mapped_column(Float, nullable=False)
     trip_id: Mapped[int] = mapped_column(Integer, ForeignKey('trips.id'), nullable=False, index=True)
 
+    # update_expense looks shares up by (expense_id, user_id)
+    __table_args__ = (db.Index('ix_trip_expense_shares_expense_user', 'expense_id', 'user_id'),)
+
     def __repr__(self):
         return f"<TripExpenseShare(id={self.id}, expense_id={self.expense_id}, user_id='{self.user_id}', amount={self.amount})>"
\ No newline at end of file
@@ -20,6 +20,8 @@ class TripGuest(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('trip_id', 'guest_id'),
+        # get-user-trips starts from the guest side
+        db.Index('ix_trip_guests_guest_trip_rsvp', 'guest_id', 'trip_id', 'rsvp_status'),
     )
 
     def __repr__(self):
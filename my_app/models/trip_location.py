@@ -17,4 +17,7 @@ class TripLocation(db.Model):
     category_id: Mapped[int] = mapped_column(Integer, ForeignKey('location_categories.id'), nullable=True)  # Nullable category reference
 
     # unique constraint on place_id and trip_id
-    __table_args__ = (db.UniqueConstraint('place_id', 'trip_id'),)
\ No newline at end of file
+    __table_args__ = (
+        db.UniqueConstraint('place_id', 'trip_id'),
+        db.Index('ix_trip_locations_trip_category', 'trip_id', 'category_id'),
+    )
\ No newline at end of file
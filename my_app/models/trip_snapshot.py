@@ -0,0 +1,19 @@
+from datetime import datetime
+from sqlalchemy import BigInteger, DateTime, Integer, ForeignKey, Text
+from sqlalchemy.dialects import mysql
+from sqlalchemy.orm import Mapped, mapped_column
+from models import db
+
+class TripSnapshot(db.Model):
+    __tablename__ = 'trip_snapshots'
+
+    # full trip state as of `seq`, written when the change log is compacted. Changes up to and including
+    # compacted_through have been deleted, so clients further behind than that start from the snapshot.
+    trip_id: Mapped[int] = mapped_column(Integer, ForeignKey('trips.id'), primary_key=True)
+    seq: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    compacted_through: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    data: Mapped[str] = mapped_column(Text().with_variant(mysql.LONGTEXT(), 'mysql'), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<TripSnapshot(trip_id={self.trip_id}, seq={self.seq}, compacted_through={self.compacted_through})>"
@@ -12,5 +12,8 @@ class TripTodo(db.Model):
     checked: Mapped[bool] = mapped_column(Boolean, nullable=False)
     last_updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
 
+    # get-todos pages through a trip's todos by id
+    __table_args__ = (db.Index('ix_trip_todos_trip_id_id', 'trip_id', 'id'),)
+
     def __repr__(self):
         return f"<TripTodo(id={self.id}, trip_id={self.trip_id}, text='{self.text}', checked={self.checked}, last_updated_at='{self.last_updated_at}')>"
\ No newline at end of file
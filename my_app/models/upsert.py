@@ -0,0 +1,19 @@
+from sqlalchemy.dialects import mysql, sqlite
+
+def upsert_add(session, model, rows, column):
+    """Inserts rows, or adds each row's `column` value onto the existing row with the same primary key.
+
+    One statement however many rows, using ON DUPLICATE KEY UPDATE on MySQL and ON CONFLICT on SQLite.
+    """
+    if not rows:
+        return
+    if session.get_bind().dialect.name == 'mysql':
+        stmt = mysql.insert(model).values(rows)
+        stmt = stmt.on_duplicate_key_update({column: getattr(model, column) + stmt.inserted[column]})
+    else:
+        stmt = sqlite.insert(model).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[c.name for c in model.__table__.primary_key],
+            set_={column: getattr(model, column) + stmt.excluded[column]}
+        )
+    session.execute(stmt)
@@ -18,5 +18,13 @@ class UserUpload(db.Model):
     s3_url: Mapped[str] = mapped_column(String(512), nullable=False)
     upload_timestamp: Mapped[TIMESTAMP] = mapped_column(TIMESTAMP(6), nullable=False, server_default=func.now())
 
+    # delete_trip_uploads looks uploads up by (trip_id, file_name), save_upload_metadata by s3_url and
+    # retrieve-trip-uploads by (trip_id, document_category)
+    __table_args__ = (
+        db.Index('ix_user_uploads_trip_file_name', 'trip_id', 'file_name'),
+        db.Index('ix_user_uploads_s3_url', 's3_url', unique=True),
+        db.Index('ix_user_uploads_trip_category', 'trip_id', 'document_category'),
+    )
+
     def __repr__(self):
         return f"<UserUpload(id={self.id}, upload_user_id='{self.upload_user_id}', document_category='{self.document_category}', trip_id={self.trip_id}, file_name='{self.file_name}', s3_url='{self.s3_url}', upload_timestamp='{self.upload_timestamp}')>"
\ No newline at end of file
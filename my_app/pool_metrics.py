@@ -0,0 +1,129 @@
+import bisect
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+class Histogram:
+    """Fixed-bucket latency histogram in milliseconds."""
+
+    BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(self.BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def as_dict(self):
+        labels = [f"le_{b}" for b in self.BUCKETS_MS] + ["inf"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+class PoolMetrics:
+    def __init__(self, logger, warn_wait_ms):
+        self.logger = logger
+        self.warn_wait_ms = warn_wait_ms
+        self.wait = Histogram()
+        self.connect = Histogram()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.invalidations = 0
+        self.pool = None
+        self._lock = threading.Lock()
+
+    def observe_wait(self, ms):
+        with self._lock:
+            self.wait.observe(ms)
+        if ms >= self.warn_wait_ms:
+            self.logger.warning(
+                "Waited %.1f ms for a database connection (checked out: %s, overflow: %s)",
+                ms, self.pool.checkedout(), self.pool.overflow()
+            )
+
+    def observe_timeout(self, ms):
+        with self._lock:
+            self.timeouts += 1
+        self.logger.warning(
+            "Timed out after %.1f ms waiting for a database connection (pool size: %s, overflow: %s)",
+            ms, self.pool.size(), self.pool.overflow()
+        )
+
+    def observe_connect(self, ms):
+        with self._lock:
+            self.connect.observe(ms)
+
+    def snapshot(self):
+        pool = self.pool
+        with self._lock:
+            return {
+                "size": pool.size() if pool else None,
+                "checked_out": pool.checkedout() if pool else None,
+                "checked_in": pool.checkedin() if pool else None,
+                "overflow": pool.overflow() if pool else None,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "invalidations": self.invalidations,
+                "wait": self.wait.as_dict(),
+                "connect": self.connect.as_dict(),
+            }
+
+class InstrumentedQueuePool(QueuePool):
+    # set on the per-app subclass built by init_pool_metrics; Pool.recreate() (used by
+    # engine.dispose()) keeps the class, so metrics survive pool resets after fork
+    metrics = None
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics.pool = self
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.metrics.observe_timeout((time.perf_counter() - start) * 1000)
+            raise
+        self.metrics.observe_wait((time.perf_counter() - start) * 1000)
+        return conn
+
+    def _create_connection(self):
+        start = time.perf_counter()
+        conn = super()._create_connection()
+        self.metrics.observe_connect((time.perf_counter() - start) * 1000)
+        return conn
+
+def init_pool_metrics(app):
+    """Swaps in an instrumented QueuePool; must run before db.init_app builds the engine."""
+    uri = app.config.get('SQLALCHEMY_DATABASE_URI') or ''
+    if not app.config.get('DB_POOL_METRICS_ENABLED', False) or uri in ('sqlite://', 'sqlite:///:memory:'):
+        return None
+
+    metrics = PoolMetrics(app.logger, app.config.get('DB_POOL_WAIT_WARN_MS', 100))
+    pool_class = type('InstrumentedQueuePool', (InstrumentedQueuePool,), {'metrics': metrics})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+        'poolclass': pool_class,
+    }
+    app.extensions['pool_metrics'] = metrics
+
+    @event.listens_for(pool_class, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        metrics.checkouts += 1
+
+    @event.listens_for(pool_class, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.invalidations += 1
+
+    return metrics
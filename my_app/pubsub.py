@@ -0,0 +1,129 @@
+import threading
+import time
+from collections import defaultdict, deque
+
+class Subscription:
+    """One subscriber's queue of messages for a channel. get() blocks (cooperatively under gevent)."""
+
+    def __init__(self, pubsub, channel, maxlen=100):
+        self.pubsub = pubsub
+        self.channel = channel
+        self._messages = deque(maxlen=maxlen)
+        self._cond = threading.Condition()
+        self.closed = False
+
+    def put(self, message):
+        with self._cond:
+            self._messages.append(message)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Returns the next message, or None once timeout seconds pass without one."""
+        with self._cond:
+            if not self._messages:
+                self._cond.wait(timeout)
+            return self._messages.popleft() if self._messages else None
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.pubsub.unsubscribe(self)
+
+class PubSub:
+    """In-process fan-out: every subscription to a channel receives every message published to it.
+
+    A backend carries messages between worker processes. It's told about every local publish and
+    calls deliver() for messages that originate elsewhere. Without one, only this process hears them.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def subscribe(self, channel):
+        subscription = Subscription(self, channel)
+        with self._lock:
+            self._subscribers[channel].add(subscription)
+        if self.backend:
+            self.backend.start(self)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def publish(self, channel, message):
+        if self.backend:
+            self.backend.publish(channel, message)
+        self.deliver(channel, message)
+
+    def deliver(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            subscription.put(message)
+
+    def channels(self):
+        with self._lock:
+            return list(self._subscribers)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'channels': len(self._subscribers),
+                'subscriptions': sum(len(subscribers) for subscribers in self._subscribers.values()),
+            }
+
+class PollingBackend:
+    """Cross-worker delivery through a value other workers already write, with no extra infrastructure.
+
+    A daemon thread (a greenlet under gevent) calls poll(channels) -> {channel: message} for the
+    channels this process has subscribers on, every `interval` seconds, and delivers each message that
+    differs from the last one seen. That's one poll per worker however many clients are listening.
+    The thread starts with the first subscription, so it never runs in a preloading gunicorn master.
+    """
+
+    def __init__(self, poll, interval=1.0, logger=None):
+        self.poll = poll
+        self.interval = interval
+        self.logger = logger
+        self._last = {}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def start(self, pubsub):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, args=(pubsub,), name='pubsub-poll', daemon=True)
+                    self._thread.start()
+
+    def publish(self, channel, message):
+        # the local subscribers already have it; don't deliver it again when the poll catches up
+        self._last[channel] = message
+
+    def poll_once(self, pubsub):
+        channels = pubsub.channels()
+        # forget channels nobody here listens to any more, including ones only ever published to
+        for channel in set(self._last) - set(channels):
+            self._last.pop(channel, None)
+        if not channels:
+            return
+        for channel, message in self.poll(channels).items():
+            if self._last.get(channel) != message:
+                self._last[channel] = message
+                pubsub.deliver(channel, message)
+
+    def _run(self, pubsub):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.poll_once(pubsub)
+            except Exception as e:
+                if self.logger:
+                    self.logger.warning("pubsub poll failed: %s", e)
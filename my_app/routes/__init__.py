@@ -5,6 +5,9 @@ from .user_upload_routes import user_uploads_bp
 from .expenses_routes import expenses_bp
 from .location_routes import trip_locations_bp
 from .itienrary_routes import itineraries_bp
+from .metrics_routes import metrics_bp
+from .batch_routes import batch_bp
+from .storage_routes import storage_bp
 
 def register_blueprints(app):
     app.logger.info("Registering blueprints...")
@@ -15,4 +18,7 @@ def register_blueprints(app):
     app.register_blueprint(expenses_bp, url_prefix='/expenses')
     app.register_blueprint(trip_locations_bp, url_prefix='/trip_locations')
     app.register_blueprint(itineraries_bp, url_prefix='/trip_itinerary')
+    app.register_blueprint(metrics_bp, url_prefix='/internal')
+    app.register_blueprint(batch_bp, url_prefix='/batch')
+    app.register_blueprint(storage_bp, url_prefix='/storage')
     app.logger.info("Blueprints registered successfully.")
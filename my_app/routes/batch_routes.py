@@ -0,0 +1,119 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from flask import Blueprint, jsonify, request, g, current_app as app
+from flask_cors import cross_origin
+from werkzeug.exceptions import HTTPException
+from werkzeug.test import EnvironBuilder
+from models import db
+from models.routing import READ_METHODS
+from .utils import token_required
+
+batch_bp = Blueprint('batch', __name__)
+
+# Runs several API calls in one HTTP request. The token is verified once and its membership memo is
+# shared by every sub-request. Sub-requests run one after another share this request's app context,
+# and so its database session and the replica it picked; reads run side by side each get their own
+# app context and session (see run_parallel). Request headers other than these are not forwarded to
+# sub-requests.
+FORWARDED_HEADERS = ('if-none-match',)
+# a batch can't nest, streamed responses never finish, and stored files aren't JSON
+EXCLUDED_ENDPOINTS = {'batch.batch', 'trips.stream_changes', 'storage.object'}
+
+@batch_bp.route('', methods=['POST'])
+@cross_origin()
+@token_required
+def batch(token):
+    app.logger.info("batch")
+    data = request.get_json(silent=True) or {}
+    sub_requests = data.get('requests')
+
+    if not isinstance(sub_requests, list) or not sub_requests:
+        return jsonify({"error": "requests must be a non-empty list."}), 400
+    max_requests = app.config.get('BATCH_MAX_REQUESTS', 20)
+    if len(sub_requests) > max_requests:
+        return jsonify({"error": f"A batch can hold at most {max_requests} requests."}), 400
+    for i, sub in enumerate(sub_requests):
+        if not isinstance(sub, dict) or not str(sub.get('path', '')).startswith('/'):
+            return jsonify({"error": f"Invalid request at index {i}."}), 400
+        sub['method'] = str(sub.get('method', 'GET')).upper()
+
+    authorization = request.headers['Authorization']
+    g._batch_token = (hashlib.sha256(authorization.split(" ")[1].encode()).hexdigest(), token)
+    max_parallel = app.config.get('BATCH_MAX_PARALLEL', 4) if data.get('parallel') else 1
+    try:
+        responses = []
+        i = 0
+        while i < len(sub_requests):
+            # consecutive reads can run side by side; a write waits for everything before it
+            j = i + 1
+            if max_parallel > 1 and sub_requests[i]['method'] in READ_METHODS:
+                while j < len(sub_requests) and sub_requests[j]['method'] in READ_METHODS:
+                    j += 1
+            if j - i > 1:
+                responses.extend(run_parallel(sub_requests[i:j], authorization, max_parallel))
+            else:
+                responses.append(run_sub_request(sub_requests[i], authorization, request.host_url, request.remote_addr))
+            i = j
+    finally:
+        g.pop('_batch_token', None)
+
+    return jsonify({"responses": responses}), 200
+
+def run_sub_request(sub, authorization, base_url, remote_addr):
+    headers = {name: value for name, value in (sub.get('headers') or {}).items() if name.lower() in FORWARDED_HEADERS}
+    headers['Authorization'] = authorization
+    builder = EnvironBuilder(
+        path=sub['path'], base_url=base_url, method=sub['method'], headers=headers,
+        query_string=sub.get('query'), json=sub.get('body') if sub['method'] not in READ_METHODS else None,
+        environ_overrides={'REMOTE_ADDR': remote_addr}
+    )
+    try:
+        environ = builder.get_environ()
+    finally:
+        builder.close()
+
+    try:
+        endpoint, _ = app.url_map.bind_to_environ(environ).match()
+    except HTTPException as e:
+        return batch_result(sub, e.code, {"error": e.description})
+    if endpoint in EXCLUDED_ENDPOINTS:
+        return batch_result(sub, 400, {"error": "This endpoint can't be batched."})
+
+    with app.request_context(environ):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            app.logger.error(f"Error in batched request {sub['method']} {sub['path']}: {e}")
+            db.session.rollback()
+            return batch_result(sub, 500, {"error": "An error occurred while handling the request."})
+        # sequential sub-requests share one session; a route that caught a database error without
+        # rolling back would fail every sub-request after it, and one that added objects and then
+        # returned an error would have them committed by the next write
+        if (response.status_code >= 500 or not db.session.is_active
+                or db.session.new or db.session.dirty or db.session.deleted):
+            db.session.rollback()
+
+    body = response.get_json(silent=True) if response.is_json else (response.get_data(as_text=True) or None)
+    result = batch_result(sub, response.status_code, body)
+    if response.headers.get('ETag'):
+        result["headers"] = {"ETag": response.headers['ETag']}
+    return result
+
+def run_parallel(sub_requests, authorization, max_parallel):
+    # each thread needs its own app context (and so its own session and connection); the verified
+    # token and the membership memo are handed over so they're still only looked up once
+    flask_app = app._get_current_object()
+    shared = {'_batch_token': g._batch_token, '_memberships': g.setdefault('_memberships', {}), 'user_id': g.get('user_id')}
+    base_url, remote_addr = request.host_url, request.remote_addr
+
+    def run(sub):
+        with flask_app.app_context():
+            for name, value in shared.items():
+                setattr(g, name, value)
+            return run_sub_request(sub, authorization, base_url, remote_addr)
+
+    with ThreadPoolExecutor(max_workers=min(max_parallel, len(sub_requests))) as pool:
+        return list(pool.map(run, sub_requests))
+
+def batch_result(sub, status, body):
+    return {"id": sub.get('id'), "status": status, "body": body}
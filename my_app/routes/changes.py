@@ -0,0 +1,258 @@
+import json
+import threading
+import time
+from collections import defaultdict, namedtuple
+from datetime import datetime
+import click
+from flask import current_app as app, has_app_context
+from flask.cli import AppGroup
+from sqlalchemy import delete, event, func, insert, select
+from pubsub import PubSub, PollingBackend
+from models import (db, RoutingSession, Trip, TripGuest, TripTodo, ItineraryEntry, TripLocation, LocationCategory, TripExpense,
+                    UserUpload, TripChange, TripSnapshot, TripCollectionVersion, upsert_add)
+from .serializers import (trip_details, todo_item, itinerary_item, location_item, category_item, upload_item,
+                          guest_items, expense_items)
+from .versioning import ITINERARY, TODOS, LOCATIONS, EXPENSES
+from .itinerary_days import with_virtual_days
+
+# Every write appends one trip_changes row per entity it creates, updates or deletes, numbered by a
+# per-trip sequence, so clients can fetch just what changed since the last seq they saw. The sequence
+# lives in the 'changes' row of trip_collection_versions; the upsert that advances it holds that row's
+# lock until commit, so a trip's changes always commit in seq order. Once the transaction commits,
+# the trip's new seq is published to the change pubsub, which feeds /trips/stream.
+
+TRIP = 'trip'
+GUESTS = 'guests'
+CATEGORIES = 'categories'
+UPLOADS = 'uploads'
+CHANGES = 'changes'
+
+UPSERT = 'upsert'
+DELETE = 'delete'
+
+# version is the list endpoint ETag a change to the collection invalidates, if any
+Collection = namedtuple('Collection', ['model', 'trip_column', 'id_column', 'serialize', 'version'])
+
+def _each(serializer):
+    return lambda rows: [serializer(row) for row in rows]
+
+COLLECTIONS = {
+    # the empty itinerary days are derived from the trip's dates (see itinerary_days.py)
+    TRIP: Collection(Trip, Trip.id, Trip.id, _each(trip_details), ITINERARY),
+    GUESTS: Collection(TripGuest, TripGuest.trip_id, TripGuest.guest_id, guest_items, None),
+    TODOS: Collection(TripTodo, TripTodo.trip_id, TripTodo.id, _each(todo_item), TODOS),
+    ITINERARY: Collection(ItineraryEntry, ItineraryEntry.trip_id, ItineraryEntry.id, _each(itinerary_item), ITINERARY),
+    LOCATIONS: Collection(TripLocation, TripLocation.trip_id, TripLocation.id, _each(location_item), LOCATIONS),
+    CATEGORIES: Collection(LocationCategory, LocationCategory.trip_id, LocationCategory.id, _each(category_item), LOCATIONS),
+    EXPENSES: Collection(TripExpense, TripExpense.trip_id, TripExpense.id, expense_items, EXPENSES),
+    UPLOADS: Collection(UserUpload, UserUpload.trip_id, UserUpload.id, _each(upload_item), None),
+}
+
+changes_cli = AppGroup('changes', help="Maintain the per-trip change log.")
+
+def record_change(trip_id, collection, entity_id, op=UPSERT):
+    record_changes(trip_id, [(collection, entity_id, op)])
+
+def record_changes(trip_id, changes):
+    """Appends (collection, entity_id, op) changes to the trip's log in the caller's transaction.
+
+    The same upsert that advances the sequence bumps the version behind each affected list endpoint's ETag.
+    """
+    if not changes:
+        return
+    trip_id = int(trip_id)
+    counters = {CHANGES: len(changes)}
+    for collection, _, _ in changes:
+        if COLLECTIONS[collection].version:
+            counters[COLLECTIONS[collection].version] = 1
+    upsert_add(db.session, TripCollectionVersion, [
+        {'trip_id': trip_id, 'collection': collection, 'version': count} for collection, count in counters.items()
+    ], 'version')
+
+    last = current_seq(trip_id)
+    first = last - len(changes) + 1
+    db.session.execute(insert(TripChange), [
+        {'trip_id': trip_id, 'seq': first + i, 'collection': collection, 'entity_id': str(entity_id), 'op': op}
+        for i, (collection, entity_id, op) in enumerate(changes)
+    ])
+    db.session.info.setdefault('trip_seqs', {})[trip_id] = last
+
+def current_seq(trip_id):
+    return db.session.execute(
+        select(TripCollectionVersion.version)
+        .where(TripCollectionVersion.trip_id == trip_id, TripCollectionVersion.collection == CHANGES)
+    ).scalar() or 0
+
+def _typed_id(collection, entity_id):
+    return COLLECTIONS[collection].id_column.type.python_type(entity_id)
+
+def load_entities(trip_id, collection, entity_ids=None):
+    """Returns {entity_id: data} for the trip's rows in a collection, either all of them or just entity_ids."""
+    spec = COLLECTIONS[collection]
+    query = spec.model.query.filter(spec.trip_column == trip_id)
+    if entity_ids is not None:
+        query = query.filter(spec.id_column.in_([_typed_id(collection, entity_id) for entity_id in entity_ids]))
+    rows = query.order_by(spec.id_column).all()
+    return {str(getattr(row, spec.id_column.key)): data for row, data in zip(rows, spec.serialize(rows))}
+
+def build_snapshot(trip_id):
+    snapshot = {collection: list(load_entities(trip_id, collection).values()) for collection in COLLECTIONS if collection != ITINERARY}
+    entries = ItineraryEntry.query.filter_by(trip_id=trip_id).all()
+    snapshot[ITINERARY] = [itinerary_item(entry) for entry in with_virtual_days(db.session.get(Trip, trip_id), entries)]
+    return snapshot
+
+def changes_since(trip_id, since):
+    """The /trips/changes payload: the latest change to every entity touched after seq `since`.
+
+    Upserts carry the entity's current data and deletes are bare tombstones. When compaction has
+    already dropped changes the client hasn't seen, the trip's snapshot is included and the changes
+    start after it.
+    """
+    seq = current_seq(trip_id)
+    response = {"seq": seq, "changes": []}
+    if since >= seq:
+        return response
+
+    snapshot = db.session.get(TripSnapshot, trip_id)
+    if snapshot and since < snapshot.compacted_through:
+        response["snapshot"] = {"seq": snapshot.seq, "collections": json.loads(snapshot.data)}
+        since = snapshot.seq
+
+    rows = db.session.execute(
+        select(TripChange.seq, TripChange.collection, TripChange.entity_id, TripChange.op)
+        .where(TripChange.trip_id == trip_id, TripChange.seq > since, TripChange.seq <= seq)
+        .order_by(TripChange.seq)
+    )
+    # keep only the latest change per entity, ordered by its seq
+    latest = {}
+    for row in rows:
+        latest.pop((row.collection, row.entity_id), None)
+        latest[(row.collection, row.entity_id)] = row
+
+    upserted = defaultdict(list)
+    for row in latest.values():
+        if row.op == UPSERT:
+            upserted[row.collection].append(row.entity_id)
+    data = {collection: load_entities(trip_id, collection, entity_ids) for collection, entity_ids in upserted.items()}
+
+    for row in latest.values():
+        change = {"seq": row.seq, "collection": row.collection, "id": _typed_id(row.collection, row.entity_id), "op": row.op}
+        if row.op == UPSERT:
+            if row.entity_id not in data[row.collection]:
+                # deleted after `seq`; the client picks up the tombstone next time
+                continue
+            change["data"] = data[row.collection][row.entity_id]
+        response["changes"].append(change)
+    return response
+
+def compact_changes(trip_id, retain):
+    """Snapshots the trip and deletes all but its `retain` most recent changes, then commits.
+
+    Returns the number of changes deleted.
+    """
+    seq = current_seq(trip_id)
+    cutoff = seq - retain
+    snapshot = db.session.get(TripSnapshot, trip_id)
+    if cutoff <= 0 or (snapshot and snapshot.compacted_through >= cutoff):
+        return 0
+
+    # the entities are read after seq, so the snapshot can only be newer than seq. Clients replay the
+    # changes after seq on top of it, which leaves them in the same state either way.
+    data = app.json.dumps(build_snapshot(trip_id))
+    if snapshot is None:
+        snapshot = TripSnapshot(trip_id=trip_id)
+        db.session.add(snapshot)
+    snapshot.seq = seq
+    snapshot.compacted_through = cutoff
+    snapshot.data = data
+    snapshot.created_at = datetime.now()
+    deleted = db.session.execute(
+        delete(TripChange).where(TripChange.trip_id == trip_id, TripChange.seq <= cutoff)
+    ).rowcount
+    db.session.commit()
+    return deleted
+
+def stream_events(trip_id, subscription, seq, last_event_id, heartbeat, max_seconds, retry_ms):
+    """Server-sent event frames for one /trips/stream connection.
+
+    Each event is a notification carrying the trip's latest seq; clients fetch the changes themselves
+    from /trips/changes. The first event goes out straight away unless the client's Last-Event-ID is
+    already current. Comment frames keep idle connections open, and the stream ends after max_seconds
+    so the client reconnects (with Last-Event-ID) rather than holding a worker indefinitely.
+    """
+    def event(seq):
+        return f"id: {seq}\nevent: change\ndata: {json.dumps({'trip_id': trip_id, 'seq': seq})}\n\n"
+
+    yield f"retry: {retry_ms}\n\n"
+    if last_event_id is None or seq > last_event_id:
+        yield event(seq)
+    sent = seq if last_event_id is None else max(seq, last_event_id)
+
+    deadline = time.monotonic() + max_seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        seq = subscription.get(timeout=min(heartbeat, remaining))
+        if seq is None:
+            yield ": heartbeat\n\n"
+        elif seq > sent:
+            sent = seq
+            yield event(seq)
+
+def purge_changes(trip_id):
+    TripChange.query.filter_by(trip_id=trip_id).delete()
+    TripSnapshot.query.filter_by(trip_id=trip_id).delete()
+
+@changes_cli.command('compact')
+@click.option('--trip-id', type=int, help="Only compact this trip.")
+@click.option('--retain', type=int, help="Changes to keep per trip. Defaults to CHANGE_LOG_RETAIN.")
+def compact_command(trip_id, retain):
+    if retain is None:
+        retain = app.config.get('CHANGE_LOG_RETAIN', 500)
+    if trip_id is not None:
+        trip_ids = [trip_id]
+    else:
+        trip_ids = db.session.execute(
+            select(TripChange.trip_id).group_by(TripChange.trip_id).having(func.count() > retain)
+        ).scalars().all()
+    deleted = sum(compact_changes(trip_id, retain) for trip_id in trip_ids)
+    click.echo(f"Compacted {len(trip_ids)} trip(s), deleted {deleted} change(s).")
+
+def _publish_committed(session):
+    seqs = session.info.pop('trip_seqs', None)
+    if seqs and has_app_context():
+        pubsub = app.extensions.get('change_pubsub')
+        if pubsub:
+            for trip_id, seq in seqs.items():
+                pubsub.publish(trip_id, seq)
+
+def _discard_uncommitted(session, transaction):
+    # after_commit has already published; anything left belongs to a transaction that never committed
+    if transaction.parent is None:
+        session.info.pop('trip_seqs', None)
+
+def _seq_poller(app):
+    # every worker writes the seq counters, so reading them is how this worker hears about the others' commits
+    def poll(trip_ids):
+        with app.app_context():
+            rows = db.session.execute(
+                select(TripCollectionVersion.trip_id, TripCollectionVersion.version)
+                .where(TripCollectionVersion.collection == CHANGES, TripCollectionVersion.trip_id.in_(trip_ids))
+            )
+            return {row.trip_id: row.version for row in rows}
+    return poll
+
+def init_change_log(app):
+    app.cli.add_command(changes_cli)
+
+    backend_name = app.config.get('PUBSUB_BACKEND', 'local')
+    if backend_name == 'changelog':
+        backend = PollingBackend(_seq_poller(app), app.config.get('PUBSUB_POLL_INTERVAL', 1.0), app.logger)
+    elif backend_name == 'local':
+        backend = None
+    else:
+        raise ValueError(f"Unknown PUBSUB_BACKEND {backend_name!r}")
+    app.extensions['change_pubsub'] = PubSub(backend)
+    app.extensions['stream_slots'] = threading.BoundedSemaphore(app.config.get('STREAM_MAX_CONNECTIONS', 4))
+
+    if not event.contains(RoutingSession, 'after_commit', _publish_committed):
+        event.listen(RoutingSession, 'after_commit', _publish_committed)
+        event.listen(RoutingSession, 'after_transaction_end', _discard_uncommitted)
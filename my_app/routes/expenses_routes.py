@@ -2,7 +2,12 @@ from datetime import datetime
 from flask import Blueprint, request, jsonify, current_app as app
 from flask_cors import cross_origin
 from models import User, db, Trip, TripGuest, TripExpense, TripExpenseShare
-from .utils import token_required, get_request_data, validate_user_trip
+from settlement import ledger_balances, minimal_transfers, expense_deltas, apply_balance_deltas
+from .utils import token_required, get_request_data, validate_user_trip, load_users
+from .pagination import get_page_request, paginate
+from .versioning import collection_etag, not_modified, with_etag, EXPENSES
+from .changes import record_change, DELETE
+from .serializers import expense_items
 
 expenses_bp = Blueprint('expenses', __name__)
 
@@ -53,6 +58,10 @@ def add_expense(token):
                 trip_id=trip_id
             )
             db.session.add(new_expense_share)
+        apply_balance_deltas(int(trip_id), expense_deltas(
+            user_id, False, [(user['selectedUserId'], user['amount']) for user in users_involved]
+        ))
+        record_change(trip_id, EXPENSES, new_expense.id)
         db.session.commit()
     except Exception as e:
         app.logger.error(f"Error adding expense to trip: {e}")
@@ -90,17 +99,20 @@ def update_expense(token):
     
     # Update the expense
     try:
-        expense = TripExpense.query.filter_by(id=expense_id).first()
+        # lock the expense and its shares so concurrent updates can't both subtract the same old split
+        expense = TripExpense.query.filter_by(id=expense_id).with_for_update().first()
         if not expense:
             return jsonify({"error": "Expense not found."}), 404
+        shares = {share.user_id: share for share in TripExpenseShare.query.filter_by(expense_id=expense_id).with_for_update()}
+        old_deltas = expense_deltas(expense.user_id, expense.settled, [(s.user_id, s.amount) for s in shares.values()])
+
         expense.title = expense_title
         expense.amount = expense_amount
         expense.updated_at = datetime.now()
-        db.session.commit()
         
         # Update the expense shares
         for user in users_involved:
-            expense_share = TripExpenseShare.query.filter_by(expense_id=expense_id, user_id=user['selectedUserId']).first()
+            expense_share = shares.get(user['selectedUserId'])
             if not expense_share:
                 new_expense_share = TripExpenseShare(
                     expense_id=expense_id,
@@ -109,8 +121,16 @@ def update_expense(token):
                     trip_id=trip_id
                 )
                 db.session.add(new_expense_share)
+                shares[new_expense_share.user_id] = new_expense_share
             else:
                 expense_share.amount = user['amount']
+
+        # apply the difference between the old and new split to the ledger in the same transaction
+        deltas = expense_deltas(expense.user_id, expense.settled, [(s.user_id, s.amount) for s in shares.values()])
+        for share_user_id, cents in old_deltas.items():
+            deltas[share_user_id] -= cents
+        apply_balance_deltas(expense.trip_id, deltas)
+        record_change(trip_id, EXPENSES, expense.id)
         db.session.commit()
     except Exception as e:
         app.logger.error(f"Error updating expense: {e}")
@@ -134,36 +154,67 @@ def get_expenses(token):
     valid, error = validate_user_trip(user_id, trip_id)
     if not valid:
         return jsonify({"message": f"Invalid user or trip id: {error}"}), 400
-    
-    # query the expenses table for all expenses associated with a trip
-    expenses = TripExpense.query.filter_by(trip_id=trip_id).all()
-    expense_list = []
-    for expense in expenses:
-        expense_shares = TripExpenseShare.query.filter_by(expense_id=expense.id).all()
-        users_involved = []
-        for share in expense_shares:
-            user = User.query.filter_by(id=share.user_id).first()
-            users_involved.append({
-                "selectedUserId": user.id,
-                "amount": share.amount,
-                "firstName": user.first_name,
-                "lastName": user.last_name
-            })
-        user = User.query.filter_by(id=expense.user_id).first()
-        expense_list.append({
-            "expenseId": expense.id,
-            "settled": expense.settled,
-            "title": expense.title,
-            "amount": expense.amount,
-            "createdDate": expense.created_at.strftime("%b %d"),
-            "updatedDate": expense.created_at.strftime("%b %d"),
-            "userId": expense.user_id,
-            "userFirstName": user.first_name,
-            "userLastName": user.last_name,
-            "usersInvolved": users_involved
+
+    etag = collection_etag(trip_id, EXPENSES)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    sort_columns = [TripExpense.created_at, TripExpense.id]
+    try:
+        page = get_page_request(data, sort_columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # query the expenses table for the trip's expenses, one page at a time when the client asks for pages
+    expenses, next_cursor = paginate(
+        TripExpense.query.filter_by(trip_id=trip_id), sort_columns, page, lambda expense: (expense.created_at, expense.id)
+    )
+    response = {"expenses": expense_items(expenses)}
+    if page:
+        response["next_cursor"] = next_cursor
+    return with_etag(jsonify(response), etag), 200
+
+@expenses_bp.route('/settle-up', methods=['GET'])
+@cross_origin()
+@token_required
+def settle_up(token):
+
+    app.logger.info("expenses/settle-up")
+    data = get_request_data(token)
+    app.logger.debug(data)
+
+    user_id = data['user_id']
+    trip_id = data['trip_id']
+
+    valid, error = validate_user_trip(user_id, trip_id)
+    if not valid:
+        return jsonify({"message": f"Invalid user or trip id: {error}"}), 400
+
+    etag = collection_etag(trip_id, EXPENSES)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    balances = ledger_balances(int(trip_id))
+    users = load_users(balances)
+
+    balance_list = []
+    for balance_user_id, cents in sorted(balances.items(), key=lambda item: item[1]):
+        user = users.get(balance_user_id)
+        balance_list.append({
+            "userId": balance_user_id,
+            "firstName": user.first_name if user else None,
+            "lastName": user.last_name if user else None,
+            "balance": cents / 100
         })
-    
-    return jsonify({"expenses": expense_list}), 200
+
+    transfer_list = [
+        {"fromUserId": from_user_id, "toUserId": to_user_id, "amount": cents / 100}
+        for from_user_id, to_user_id, cents in minimal_transfers(balances)
+    ]
+
+    return with_etag(jsonify({"balances": balance_list, "transfers": transfer_list}), etag), 200
 
 @expenses_bp.route('/delete-expense', methods=['DELETE'])
 @cross_origin()
@@ -182,17 +233,20 @@ def delete_expense(token):
     if not valid:
         return jsonify({"message": f"Invalid user or trip id: {error}"}), 400
     
-    expense = TripExpense.query.filter_by(id=expense_id).first()
-    if not expense:
-        return jsonify({"error": "Expense not found."}), 404
-    
-    expense_shares = TripExpenseShare.query.filter_by(expense_id=expense_id).all()
-    
     # delete the expense
     try:
+        # locked like update_expense, so the ledger loses exactly the split that's being deleted
+        expense = TripExpense.query.filter_by(id=expense_id).with_for_update().first()
+        if not expense:
+            return jsonify({"error": "Expense not found."}), 404
+        expense_shares = TripExpenseShare.query.filter_by(expense_id=expense_id).with_for_update().all()
+
+        deltas = expense_deltas(expense.user_id, expense.settled, [(share.user_id, share.amount) for share in expense_shares])
+        apply_balance_deltas(expense.trip_id, {share_user_id: -cents for share_user_id, cents in deltas.items()})
         db.session.delete(expense)
         for share in expense_shares:
             db.session.delete(share)
+        record_change(trip_id, EXPENSES, expense.id, DELETE)
         db.session.commit()
     except Exception as e:
         app.logger.error(f"Error deleting expense: {e}")
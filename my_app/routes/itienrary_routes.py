@@ -4,6 +4,10 @@ from flask import current_app as app
 from flask_cors import cross_origin
 from models import Trip, db, TripGuest, User, TripLocation, LocationCategory, ItineraryEntry
 from .utils import token_required, get_request_data, validate_user_trip
+from .versioning import collection_etag, not_modified, with_etag, ITINERARY
+from .changes import record_change, DELETE
+from .serializers import itinerary_item
+from .itinerary_days import find_virtual_day, virtual_day_id, with_virtual_days
 
 itineraries_bp = Blueprint('trip_itinerary', __name__)
 
@@ -39,6 +43,7 @@ def add_item(token):
     try:
         new_item = ItineraryEntry(trip_id=trip_id, date=date, description=description, id=id)
         db.session.add(new_item)
+        record_change(trip_id, ITINERARY, id)
         db.session.commit()
     except Exception as e:
         app.logger.error(e)
@@ -76,11 +81,23 @@ def update_item(token):
     
     item = ItineraryEntry.query.filter_by(id=id).first()
     if not item:
-        return jsonify({"message": "Item not found."}), 404
-    
+        # an empty day is only written the first time it's edited
+        trip = db.session.get(Trip, int(trip_id))
+        day = find_virtual_day(trip, id)
+        if day is None:
+            return jsonify({"message": "Item not found."}), 404
+        item = ItineraryEntry(trip_id=trip.id, id=id, date=day)
+
+    # a day's id is derived from its date, so moving it would leave the day it came from synthesized
+    # again under the same id
+    if item.id == virtual_day_id(item.trip_id, item.date.date()) and date.date() != item.date.date():
+        return jsonify({"message": "A day's date can't be changed."}), 400
+
+    db.session.add(item)
     item.date = date
     item.description = description
     try:
+        record_change(trip_id, ITINERARY, item.id)
         db.session.commit()
     except Exception as e:
         app.logger.error(e)
@@ -103,17 +120,17 @@ def get_itinerary(token):
     valid, error = validate_user_trip(user_id, trip_id)
     if not valid:
         return jsonify({"message": f"Invalid user or trip id: {error}"}), 400
-    
-    # get the itinerary items for the trip
+
+    etag = collection_etag(trip_id, ITINERARY)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    # get the itinerary items for the trip, with the days nobody has written to yet filled in
     itinerary = ItineraryEntry.query.filter_by(trip_id=trip_id).all()
-    res = []
-    for item in itinerary:
-        res.append({
-            "id": item.id,
-            "date": item.date,
-            "description": item.description,
-        })
-    return jsonify({"itinerary": res}), 200
+    trip = db.session.get(Trip, int(trip_id))
+    res = [itinerary_item(item) for item in with_virtual_days(trip, itinerary)]
+    return with_etag(jsonify({"itinerary": res}), etag), 200
 
 @itineraries_bp.route('/delete-item', methods=['DELETE'])
 @cross_origin()
@@ -142,8 +159,11 @@ def delete_item(token):
     if not item:
         return jsonify({"message": "Item not found."}), 404
     
+    # deleting one of the trip's days only clears it: get-itinerary synthesizes it again, empty and
+    # with the same id, and feed clients re-derive it from the trip's dates after the tombstone
     try:
         db.session.delete(item)
+        record_change(trip_id, ITINERARY, item.id, DELETE)
         db.session.commit()
     except Exception as e:
         app.logger.error(e)
@@ -0,0 +1,93 @@
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import and_, delete, insert, or_, select
+from models import db, ItineraryEntry
+
+# A trip's empty days aren't stored. get-itinerary synthesizes an entry for each day between the
+# trip's start and end dates that has no row yet, with an id derived from the trip and the date, so
+# the day keeps its id once update-item writes the row on its first edit. The days follow the trip's
+# dates, so changing them only has to clean up rows (see reconcile_days).
+DAY_NAMESPACE = uuid.UUID('3af9713c-4f95-46d7-97a0-de55435d98f6')
+ONE_DAY = timedelta(days=1)
+
+def virtual_day_id(trip_id, day):
+    return uuid.uuid5(DAY_NAMESPACE, f"{trip_id}:{day.isoformat()}").hex
+
+def _midnight(day):
+    return datetime.combine(day, datetime.min.time())
+
+def _days(first, last):
+    for i in range((last - first).days + 1):
+        yield _midnight(first + timedelta(days=i))
+
+def trip_days(trip):
+    return _days(trip.start_date.date(), trip.end_date.date())
+
+def find_virtual_day(trip, item_id):
+    """The day of the trip whose virtual entry has item_id, or None."""
+    for day in trip_days(trip):
+        if virtual_day_id(trip.id, day.date()) == item_id:
+            return day
+    return None
+
+def _day_rows(trip_id, days):
+    return [{'id': virtual_day_id(trip_id, day.date()), 'trip_id': trip_id, 'date': day, 'description': ''} for day in days]
+
+def day_rows(trip):
+    """One itinerary_entries row per day of the trip, for a single executemany insert."""
+    return _day_rows(trip.id, trip_days(trip))
+
+def with_virtual_days(trip, entries):
+    """The trip's entries plus an unsaved empty entry for every day that has none, ordered by date."""
+    taken = {entry.date.date() for entry in entries}
+    virtual = [
+        ItineraryEntry(id=virtual_day_id(trip.id, day.date()), trip_id=trip.id, date=day, description='')
+        for day in trip_days(trip) if day.date() not in taken
+    ]
+    return sorted(entries + virtual, key=lambda entry: entry.date)
+
+def _uncovered(first, last, other_first, other_last):
+    """The parts of the day range [first, last] outside [other_first, other_last], as (first, last) pairs."""
+    spans = []
+    if first < other_first:
+        spans.append((first, min(last, other_first - ONE_DAY)))
+    if last > other_last:
+        spans.append((max(first, other_last + ONE_DAY), last))
+    return [(a, b) for a, b in spans if a <= b]
+
+def reconcile_days(trip, old_start, old_end, store_days):
+    """Brings the trip's stored days in line with its dates after they moved from old_start..old_end.
+
+    Empty entries on days the trip no longer covers are deleted and, when days are stored, the days it
+    newly covers are inserted, a statement or two each, so the work grows with the days that changed
+    rather than with the trip. Returns (inserted ids, deleted ids).
+    """
+    start, end = trip.start_date.date(), trip.end_date.date()
+    old_start, old_end = old_start.date(), old_end.date()
+
+    deleted = []
+    removed = _uncovered(old_start, old_end, start, end)
+    if removed:
+        on_removed_days = or_(*[
+            and_(ItineraryEntry.date >= _midnight(first), ItineraryEntry.date < _midnight(last + ONE_DAY))
+            for first, last in removed
+        ])
+        deleted = db.session.execute(
+            select(ItineraryEntry.id)
+            .where(ItineraryEntry.trip_id == trip.id, ItineraryEntry.description == '', on_removed_days)
+        ).scalars().all()
+        if deleted:
+            db.session.execute(delete(ItineraryEntry).where(ItineraryEntry.id.in_(deleted)))
+
+    rows = []
+    if store_days:
+        rows = [row for first, last in _uncovered(start, end, old_start, old_end) for row in _day_rows(trip.id, _days(first, last))]
+    if rows:
+        # a day edited before the trip was shortened kept its row, and its id
+        existing = set(db.session.execute(
+            select(ItineraryEntry.id).where(ItineraryEntry.id.in_([row['id'] for row in rows]))
+        ).scalars())
+        rows = [row for row in rows if row['id'] not in existing]
+        if rows:
+            db.session.execute(insert(ItineraryEntry), rows)
+    return [row['id'] for row in rows], deleted
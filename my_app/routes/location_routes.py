@@ -1,8 +1,12 @@
 from flask import Blueprint, jsonify, request
 from flask import current_app as app
 from flask_cors import cross_origin
+from sqlalchemy import exists
 from models import Trip, db, TripGuest, User, TripLocation, LocationCategory
 from .utils import token_required, get_request_data, validate_user_trip
+from .pagination import get_page_request, paginate
+from .versioning import collection_etag, not_modified, with_etag, LOCATIONS
+from .changes import record_change, record_changes, CATEGORIES, UPSERT, DELETE
 
 trip_locations_bp = Blueprint('trip_locations', __name__)
 
@@ -35,6 +39,8 @@ def add_location(token):
             try:
                 category = LocationCategory(trip_id=trip_id, name=category_name)
                 db.session.add(category)
+                db.session.flush()
+                record_change(trip_id, CATEGORIES, category.id)
                 db.session.commit()
                 category_id = category.id
             except Exception as e:
@@ -48,6 +54,8 @@ def add_location(token):
         # Add the location to the trip
         trip_location = TripLocation(trip_id=trip_id, user_id=user_id, latitude=lat, longitude=lng, name=place_name, place_id=place_id, category_id=category_id)
         db.session.add(trip_location)
+        db.session.flush()
+        record_change(trip_id, LOCATIONS, trip_location.id)
         db.session.commit()
 
     except Exception as e:
@@ -82,6 +90,8 @@ def add_category(token):
         # Add the category to the trip
         category = LocationCategory(trip_id=trip_id, name=category)
         db.session.add(category)
+        db.session.flush()
+        record_change(trip_id, CATEGORIES, category.id)
         db.session.commit()
     except Exception as e:
         app.logger.error(f"Error adding category to trip: {e}")
@@ -105,9 +115,20 @@ def get_locations(token):
     valid, error = validate_user_trip(user_id, trip_id)
     if not valid:
         return jsonify({"message": f"Invalid user or trip id: {error}"}), 400
-    
-    # Get all locations for the trip
-    locations = TripLocation.query.filter_by(trip_id=trip_id).all()
+
+    etag = collection_etag(trip_id, LOCATIONS)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    sort_columns = [TripLocation.id]
+    try:
+        page = get_page_request(data, sort_columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Get the locations for the trip
+    locations, next_cursor = paginate(TripLocation.query.filter_by(trip_id=trip_id), sort_columns, page, lambda loc: (loc.id,))
     res = []
     for loc in locations:
         if not loc.category_id:
@@ -118,12 +139,23 @@ def get_locations(token):
     print(res)
 
     # get all the categories from the category table for the trip and add them to the response if they are not already in the response
-    categories = LocationCategory.query.filter_by(trip_id=trip_id).all()
-    for cat in categories:
-        if cat.name not in [r['category'] for r in res]:
+    if page is None:
+        categories = LocationCategory.query.filter_by(trip_id=trip_id).all()
+        for cat in categories:
+            if cat.name not in [r['category'] for r in res]:
+                res.append({"name": None, "lat": None, "lng": None, "place_id": None, "category": cat.name, "category_id": cat.id})
+    elif next_cursor is None:
+        # a page only holds some of the locations, so the last page lists the categories that have none at all
+        categories = LocationCategory.query.filter_by(trip_id=trip_id).filter(
+            ~exists().where(TripLocation.trip_id == LocationCategory.trip_id, TripLocation.category_id == LocationCategory.id)
+        ).order_by(LocationCategory.id)
+        for cat in categories:
             res.append({"name": None, "lat": None, "lng": None, "place_id": None, "category": cat.name, "category_id": cat.id})
 
-    return jsonify({"locations": res}), 200
+    response = {"locations": res}
+    if page:
+        response["next_cursor"] = next_cursor
+    return with_etag(jsonify(response), etag), 200
 
 @trip_locations_bp.route('/update-location', methods=['PUT'])
 @cross_origin()
@@ -157,6 +189,7 @@ def update_location(token):
     try:
         location.name = place_name
         location.category_id = category.id
+        record_change(trip_id, LOCATIONS, location.id)
         db.session.commit()
     except Exception as e:
         app.logger.error(f"Error updating location: {e}")
@@ -189,6 +222,7 @@ def delete_location(token):
     
     try:
         db.session.delete(location)
+        record_change(trip_id, LOCATIONS, location.id, DELETE)
         db.session.commit()
     except Exception as e:
         app.logger.error(f"Error deleting location: {e}")
@@ -225,9 +259,13 @@ def delete_category(token):
     category_id = category.id
 
     try:
+        changes = []
         for location in TripLocation.query.filter_by(trip_id=trip_id, category_id=category_id).all():
             db.session.delete(location)
+            changes.append((LOCATIONS, location.id, DELETE))
         db.session.delete(category)
+        changes.append((CATEGORIES, category_id, DELETE))
+        record_changes(trip_id, changes)
         db.session.commit()
     except Exception as e:
         app.logger.error(f"Error deleting category: {e}")
@@ -268,6 +306,7 @@ def update_category(token):
         # update all the locations with the new category name
         for location in TripLocation.query.filter_by(trip_id=trip_id, category_id=category.id).all():
             location.category_id = category.id
+        record_change(trip_id, CATEGORIES, category.id)
         db.session.commit()
     except Exception as e:
         app.logger.error(f"Error updating category: {e}")
@@ -0,0 +1,26 @@
+import hmac
+from flask import Blueprint, jsonify, request, abort, current_app as app
+
+metrics_bp = Blueprint('metrics', __name__)
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    if not app.config.get('METRICS_ENABLED', False):
+        abort(404)
+    expected = app.config.get('METRICS_TOKEN')
+    if expected and not hmac.compare_digest(request.headers.get('X-Metrics-Token', ''), expected):
+        abort(404)
+
+    metrics = {}
+    pool_metrics = app.extensions.get('pool_metrics')
+    if pool_metrics:
+        metrics['db_pool'] = pool_metrics.snapshot()
+    for name in ('token_cache', 'membership_cache', 'download_url_cache'):
+        if name in app.extensions:
+            metrics[name] = app.extensions[name].stats()
+    if 'change_pubsub' in app.extensions:
+        metrics['pubsub'] = app.extensions['change_pubsub'].stats()
+    if 'startup_report' in app.extensions:
+        metrics['startup'] = app.extensions['startup_report'].as_dict()
+
+    return jsonify(metrics), 200
@@ -0,0 +1,88 @@
+import base64
+import json
+from collections import namedtuple
+from datetime import datetime
+from flask import current_app as app
+from sqlalchemy import and_, or_
+from sqlalchemy.sql import Select
+from models import db
+
+# Keyset pagination for list endpoints. Clients opt in by sending `limit` and/or `cursor`; the
+# response then carries an opaque `next_cursor` (null on the last page). Requests without either
+# get the full, unpaginated list exactly as before.
+
+PageRequest = namedtuple('PageRequest', ['limit', 'after'])
+
+def encode_cursor(values):
+    raw = json.dumps([value.isoformat() if isinstance(value, datetime) else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor, sort_columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(sort_columns):
+            raise ValueError(cursor)
+        return [decode_value(column, value) for column, value in zip(sort_columns, values)]
+    except (TypeError, ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor.")
+
+def decode_value(column, value):
+    # anything else (null, a list, an object, a bool) would reach the query as a bound parameter
+    if column.type.python_type is datetime:
+        if not isinstance(value, str):
+            raise ValueError(value)
+        return datetime.fromisoformat(value)
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        raise ValueError(value)
+    return value
+
+def get_page_request(data, sort_columns):
+    """Returns a PageRequest, or None when the client didn't ask for a page. Raises ValueError on bad input."""
+    limit = data.get('limit')
+    cursor = data.get('cursor')
+    if limit is None and cursor is None:
+        return None
+
+    max_size = app.config.get('PAGE_SIZE_MAX', 200)
+    if limit is None:
+        limit = app.config.get('PAGE_SIZE_DEFAULT', 50)
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid limit.")
+    if limit < 1:
+        raise ValueError("Invalid limit.")
+
+    after = decode_cursor(cursor, sort_columns) if cursor else None
+    return PageRequest(min(limit, max_size), after)
+
+def after_condition(sort_columns, values):
+    # (a, b) > (x, y) spelled out as a > x OR (a = x AND b > y), which every backend can range-scan
+    clauses = []
+    for i, column in enumerate(sort_columns):
+        equal = [sort_columns[j] == values[j] for j in range(i)]
+        clauses.append(and_(*equal, column > values[i]))
+    return or_(*clauses)
+
+def paginate(query, sort_columns, page, key):
+    """Runs a Model.query or select() for one page, ordered by sort_columns.
+
+    key maps a result row to its sort column values. Returns (rows, next_cursor); with no
+    page requested every row is returned, in the query's own order, and next_cursor is None.
+    """
+    if page is None:
+        return _all(query), None
+
+    if page.after is not None:
+        query = query.filter(after_condition(sort_columns, page.after))
+    # fetch one extra row to learn whether another page follows without a COUNT
+    rows = _all(query.order_by(*sort_columns).limit(page.limit + 1))
+    if len(rows) <= page.limit:
+        return rows, None
+    rows = rows[:page.limit]
+    return rows, encode_cursor(key(rows[-1]))
+
+def _all(query):
+    if isinstance(query, Select):
+        return db.session.execute(query).all()
+    return query.all()
@@ -0,0 +1,106 @@
+from collections import defaultdict
+from models import TripExpenseShare
+from .utils import load_users
+
+# JSON shapes shared by the list endpoints and the /trips/changes feed, so a delta carries exactly
+# what a full refetch would.
+
+def trip_details(trip):
+    return {
+        "trip_id": trip.id,
+        "trip_name": trip.name,
+        "trip_description": trip.description,
+        "trip_hostname": trip.host_id,
+        "trip_start_date": trip.start_date.strftime("%m/%d/%Y"),
+        "trip_end_date": trip.end_date.strftime("%m/%d/%Y"),
+        "trip_token": trip.token
+    }
+
+def todo_item(todo):
+    return {
+        "id": todo.id,
+        "text": todo.text,
+        "checked": todo.checked
+    }
+
+def itinerary_item(item):
+    return {
+        "id": item.id,
+        "date": item.date,
+        "description": item.description,
+    }
+
+def location_item(location):
+    return {
+        "id": location.id,
+        "name": location.name,
+        "lat": location.latitude,
+        "lng": location.longitude,
+        "place_id": location.place_id,
+        "category_id": location.category_id
+    }
+
+def category_item(category):
+    return {"id": category.id, "name": category.name}
+
+def upload_item(upload):
+    return {
+        "id": upload.id,
+        "file_name": upload.file_name,
+        "s3_url": upload.s3_url,
+        "document_category": upload.document_category.value
+    }
+
+def guest_items(guests):
+    users = load_users(guest.guest_id for guest in guests)
+    items = []
+    for guest in guests:
+        user = users[guest.guest_id]
+        items.append({
+            "guest_username": guest.guest_id,
+            "is_host": guest.is_host,
+            "guest_first_name": user.first_name,
+            "guest_last_name": user.last_name,
+            "rsvp_status": guest.rsvp_status.value
+        })
+    return items
+
+def expense_items(expenses):
+    # load every share and every user the expenses mention up front, so the query count doesn't grow with the trip
+    shares_by_expense = defaultdict(list)
+    if expenses:
+        shares = TripExpenseShare.query.filter(
+            TripExpenseShare.expense_id.in_([expense.id for expense in expenses])
+        ).order_by(TripExpenseShare.id)
+        for share in shares:
+            shares_by_expense[share.expense_id].append(share)
+    users = load_users(
+        [expense.user_id for expense in expenses] +
+        [share.user_id for expense_shares in shares_by_expense.values() for share in expense_shares]
+    )
+
+    items = []
+    for expense in expenses:
+        users_involved = []
+        for share in shares_by_expense[expense.id]:
+            user = users[share.user_id]
+            users_involved.append({
+                "selectedUserId": user.id,
+                "amount": share.amount,
+                "firstName": user.first_name,
+                "lastName": user.last_name
+            })
+        user = users[expense.user_id]
+        items.append({
+            "expenseId": expense.id,
+            "settled": expense.settled,
+            "title": expense.title,
+            "amount": expense.amount,
+            "createdDate": expense.created_at.strftime("%b %d"),
+            "updatedDate": expense.created_at.strftime("%b %d"),
+            "userId": expense.user_id,
+            "userFirstName": user.first_name,
+            "userLastName": user.last_name,
+            "usersInvolved": users_involved
+        })
+    return items
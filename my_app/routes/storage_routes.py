@@ -0,0 +1,83 @@
+import mimetypes
+import os
+from flask import Blueprint, Response, jsonify, request
+from flask_cors import cross_origin
+from storage import StorageError, get_storage
+from storage.local import LocalStorage
+
+# Serves LocalStorage's presigned URLs. The URL's signature stands in for a token, as with S3.
+storage_bp = Blueprint('storage', __name__)
+
+BLOCK_SIZE = 64 * 1024
+
+@storage_bp.route('/<path:key>', methods=['GET', 'HEAD', 'PUT'], endpoint='object')
+@cross_origin()
+def storage_object(key):
+    storage = get_storage()
+    if not isinstance(storage, LocalStorage):
+        return jsonify({"error": "Not found."}), 404
+
+    upload_id = request.args.get('upload_id', '')
+    part_number = request.args.get('part_number', '')
+    method = 'GET' if request.method == 'HEAD' else request.method
+    if not storage.verify(method, key, request.args.get('expires'), request.args.get('signature'), upload_id, part_number):
+        return jsonify({"error": "Invalid or expired signature."}), 403
+
+    try:
+        if request.method == 'PUT':
+            if upload_id:
+                etag = storage.write_part(key, upload_id, int(part_number), request.stream)
+            else:
+                etag = storage.write(key, request.stream)
+            return Response(status=200, headers={'ETag': etag})
+        return send_object(storage.path(key))
+    except (StorageError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+
+def send_object(path):
+    """The file at path, or the single byte range the request asks for.
+
+    Under gunicorn the body is its wsgi.file_wrapper, which sends the file with sendfile(2) from the
+    file's current offset for Content-Length bytes, so a range is sent without copying it through
+    Python. Elsewhere the range is read in blocks.
+    """
+    try:
+        f = open(path, 'rb')
+    except (FileNotFoundError, IsADirectoryError):
+        return jsonify({"error": "Not found."}), 404
+
+    size = os.fstat(f.fileno()).st_size
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Content-Type': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+    }
+    status, start, stop = 200, 0, size
+    # like S3, a request for several ranges gets the whole file
+    if request.range and len(request.range.ranges) == 1:
+        byte_range = request.range.range_for_length(size)
+        if byte_range is None:
+            f.close()
+            return Response(status=416, headers={'Content-Range': f"bytes */{size}"})
+        status, (start, stop) = 206, byte_range
+        headers['Content-Range'] = f"bytes {start}-{stop - 1}/{size}"
+    headers['Content-Length'] = str(stop - start)
+
+    if request.method == 'HEAD':
+        f.close()
+        return Response(status=status, headers=headers)
+
+    f.seek(start)
+    file_wrapper = request.environ.get('wsgi.file_wrapper')
+    body = file_wrapper(f, BLOCK_SIZE) if file_wrapper else read_range(f, stop - start)
+    return Response(body, status=status, headers=headers, direct_passthrough=True)
+
+def read_range(f, length):
+    try:
+        while length > 0:
+            chunk = f.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
@@ -2,7 +2,10 @@ from flask import Blueprint, jsonify
 from flask import current_app as app
 from flask_cors import cross_origin
 from models import Trip, db, TripGuest, User
-from .utils import token_required, get_request_data, validate_user_trip
+from .utils import token_required, get_request_data, validate_user_trip, lookup_membership, invalidate_membership
+from .pagination import get_page_request, paginate
+from .changes import record_change, record_changes, GUESTS, UPSERT, DELETE
+from .serializers import guest_items
 
 trip_guests_bp = Blueprint('trip_guests', __name__)
 
@@ -49,7 +52,9 @@ def add_trip_guest(token):
         # Add the guest to the trip
         trip_guest = TripGuest(trip_id=trip_id, guest_id=user_id, is_host=is_host)
         db.session.add(trip_guest)
+        record_change(trip_id, GUESTS, user_id)
         db.session.commit()
+        invalidate_membership(trip_id, user_id)
 
     except Exception as e:
         app.logger.error(f"Error adding guest to trip: {e}")
@@ -75,20 +80,18 @@ def get_trip_guests(token):
 
     # Get all guests associated with the trip and whose rsvp status is not 'None'
 
-    guests = TripGuest.query.filter_by(trip_id=trip_id).all()
+    sort_columns = [TripGuest.id]
+    try:
+        page = get_page_request(data, sort_columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    guest_list = []
-    for guest in guests:
-        user = User.query.filter_by(id=guest.guest_id).first()
-        guest_list.append({
-            "guest_username": guest.guest_id,
-            "is_host": guest.is_host,
-            "guest_first_name": user.first_name,
-            "guest_last_name": user.last_name,
-            "rsvp_status": guest.rsvp_status.value
-        })
+    guests, next_cursor = paginate(TripGuest.query.filter_by(trip_id=trip_id), sort_columns, page, lambda guest: (guest.id,))
 
-    return jsonify({"guests": guest_list}), 200    
+    response = {"guests": guest_items(guests)}
+    if page:
+        response["next_cursor"] = next_cursor
+    return jsonify(response), 200    
 
 @trip_guests_bp.route("/delete-trip-guest", methods=["DELETE"])
 @cross_origin()
@@ -106,7 +109,7 @@ def delete_trip_guest(token):
         return jsonify({"message": f"Invalid user or trip id: {error}"}), 400
 
     # check if the user is the host of the trip
-    deleter = TripGuest.query.filter_by(trip_id=trip_id, guest_id=user_id).first()
+    _, deleter = lookup_membership(user_id, int(trip_id))
     if not deleter.is_host:
         return jsonify({"error": "Only hosts can delete trip guests."}), 403
     
@@ -117,7 +120,9 @@ def delete_trip_guest(token):
     try:
         # Delete the guest from the trip
         db.session.delete(delete_candidate)
+        record_change(trip_id, GUESTS, delete_candidate.guest_id, DELETE)
         db.session.commit()
+        invalidate_membership(trip_id, delete_candidate.guest_id)
 
     except Exception as e:
         app.logger.error(f"Error deleting guest from trip: {e}")
@@ -147,7 +152,9 @@ def leave_trip(token):
     try:
         # Delete the guest from the trip
         db.session.delete(delete_candidate)
+        record_change(trip_id, GUESTS, delete_candidate.guest_id, DELETE)
         db.session.commit()
+        invalidate_membership(trip_id, delete_candidate.guest_id)
 
     except Exception as e:
         app.logger.error(f"Error deleting guest from trip: {e}")
@@ -195,7 +202,9 @@ def update_rsvp_status(token):
     try:
         # Update the rsvp status
         trip_guest.rsvp_status = rsvp_status
+        record_change(trip_id, GUESTS, user_id)
         db.session.commit()
+        invalidate_membership(trip_id, user_id)
 
     except Exception as e:
         app.logger.error(f"Error updating rsvp status: {e}")
@@ -227,7 +236,9 @@ def accept_invite(token):
     try:
         trip_guest = TripGuest(trip_id=trip.id, guest_id=user_id, is_host=False, rsvp_status="INVITED")
         db.session.add(trip_guest)
+        record_change(trip.id, GUESTS, user_id)
         db.session.commit()
+        invalidate_membership(trip.id, user_id)
 
     except Exception as e:
         app.logger.error(f"Error accepting invite: {e}")
@@ -291,7 +302,9 @@ def set_new_host(token):
     new_host.is_host = True
 
     try:
+        record_changes(trip_id, [(GUESTS, current_host.guest_id, UPSERT), (GUESTS, new_host.guest_id, UPSERT)])
         db.session.commit()
+        invalidate_membership(trip_id)
     except Exception as e:
         app.logger.error(f"Error setting new host: {e}")
         db.session.rollback()
@@ -1,12 +1,18 @@
 import base64
-from datetime import datetime, timedelta
+from datetime import datetime
 import hashlib
 import uuid
-from flask import Blueprint, jsonify, current_app as app
+from flask import Blueprint, Response, jsonify, request, current_app as app
 from flask_cors import cross_origin
-from models import User, Trip, db, TripGuest, RsvpStatus, TripTodo, UserUpload, ItineraryEntry, TripExpense, TripExpenseShare, LocationCategory, TripLocation
-from .utils import get_request_data, token_required
-from .user_upload_routes import delete_trip_uploads
+from sqlalchemy import case, func, insert, select
+from models import User, Trip, db, TripGuest, RsvpStatus, TripTodo, UserUpload, ItineraryEntry, TripExpense, TripExpenseShare, LocationCategory, TripLocation, TripBalance, TripCollectionVersion
+from .utils import get_request_data, token_required, lookup_membership, invalidate_membership
+from .user_upload_routes import delete_trip_objects
+from .pagination import get_page_request, paginate
+from .versioning import collection_etag, not_modified, with_etag, TODOS, ITINERARY
+from .changes import record_change, record_changes, changes_since, current_seq, stream_events, purge_changes, TRIP, GUESTS, UPSERT, DELETE
+from .serializers import trip_details, todo_item
+from .itinerary_days import day_rows, reconcile_days
 
 trips_bp = Blueprint('trips', __name__)
 
@@ -74,13 +80,13 @@ def create_trip(token):
         new_trip_guest = TripGuest(trip_id=new_trip.id, guest_id=user_id, is_host=True, rsvp_status=RsvpStatus.YES)
         db.session.add(new_trip_guest)
 
-        # Add empty itinerary entries for days of the trip
-        delta = trip_end_date - trip_start_date
-        for i in range(delta.days + 1):
-            itinerary_date = trip_start_date + timedelta(days=i)
-            item_id = uuid.uuid4().hex
-            itinerary_entry = ItineraryEntry(trip_id=new_trip.id, date=itinerary_date, description='', id=item_id)
-            db.session.add(itinerary_entry)
+        changes = [(TRIP, new_trip.id, UPSERT), (GUESTS, user_id, UPSERT)]
+        if not app.config.get('ITINERARY_VIRTUAL_DAYS', True):
+            # store the empty itinerary days up front, in one executemany insert
+            rows = day_rows(new_trip)
+            db.session.execute(insert(ItineraryEntry), rows)
+            changes.extend((ITINERARY, row['id'], UPSERT) for row in rows)
+        record_changes(new_trip.id, changes)
 
         db.session.commit()  # Commit the new_trip_guest
         return jsonify({"message": "Trip created successfully."}), 201
@@ -103,16 +109,17 @@ def get_user_trips(token):
     if not user:
         return jsonify({"error": "User not found."}), 404
     
-    # Get all trips associated with the user by querying the trip guests table and getting all the trips where the user is a guest.
-    # This will return a list of trip IDs
-    trip_guests = TripGuest.query.filter_by(guest_id=user_id).all()
-    trip_ids = [trip.trip_id for trip in trip_guests]
+    sort_columns = [TripGuest.trip_id]
+    try:
+        page = get_page_request(data, sort_columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    # Get all trips filtered by the list of trip IDs
-    trips = Trip.query.filter(Trip.id.in_(trip_ids)).all()
+    rows, next_cursor = paginate(user_trip_summaries_query(user_id), sort_columns, page, lambda row: (row.Trip.id,))
 
     trip_list = []
-    for trip in trips:
+    for row in rows:
+        trip = row.Trip
         trip_list.append({
             "trip_id": trip.id,
             "trip_name": trip.name,
@@ -120,11 +127,72 @@ def get_user_trips(token):
             "trip_hostname": trip.host_id,
             "trip_start_date": trip.start_date.strftime("%m/%d/%Y"),
             "trip_end_date": trip.end_date.strftime("%m/%d/%Y"),
-            "rsvp_status": TripGuest.query.filter_by(trip_id=trip.id, guest_id=user_id).first().rsvp_status.value,
-            "trip_token": trip.token
+            "rsvp_status": row.rsvp_status.value,
+            "trip_token": trip.token,
+            "guest_counts": {status.value: row._mapping[status.value] or 0 for status in RsvpStatus},
+            "total_expenses": row.total_expenses,
+            "location_count": row.location_count,
+            "upload_count": row.upload_count
         })
 
-    return jsonify({"trips": trip_list}), 200
+    response = {"trips": trip_list}
+    if page:
+        response["next_cursor"] = next_cursor
+    return jsonify(response), 200
+
+def user_trip_summaries_query(user_id):
+    """Trips the user belongs to with their RSVP, guest counts by RSVP, expense total, and location and upload counts.
+
+    Every per-trip figure comes from a grouped subquery limited to the user's trips, so the whole list is one query.
+    """
+    user_trip_ids = select(TripGuest.trip_id).where(TripGuest.guest_id == user_id).correlate(None)
+
+    guest_counts = (
+        select(TripGuest.trip_id, *[
+            func.sum(case((TripGuest.rsvp_status == status, 1), else_=0)).label(status.value)
+            for status in RsvpStatus
+        ])
+        .where(TripGuest.trip_id.in_(user_trip_ids))
+        .group_by(TripGuest.trip_id)
+        .subquery()
+    )
+    expense_totals = (
+        select(TripExpense.trip_id, func.sum(TripExpense.amount).label('total'))
+        .where(TripExpense.trip_id.in_(user_trip_ids))
+        .group_by(TripExpense.trip_id)
+        .subquery()
+    )
+    location_counts = (
+        select(TripLocation.trip_id, func.count(TripLocation.id).label('total'))
+        .where(TripLocation.trip_id.in_(user_trip_ids))
+        .group_by(TripLocation.trip_id)
+        .subquery()
+    )
+    upload_counts = (
+        select(UserUpload.trip_id, func.count(UserUpload.id).label('total'))
+        .where(UserUpload.trip_id.in_(user_trip_ids))
+        .group_by(UserUpload.trip_id)
+        .subquery()
+    )
+
+    return (
+        select(
+            Trip,
+            TripGuest.rsvp_status,
+            *[guest_counts.c[status.value] for status in RsvpStatus],
+            func.coalesce(expense_totals.c.total, 0).label('total_expenses'),
+            func.coalesce(location_counts.c.total, 0).label('location_count'),
+            func.coalesce(upload_counts.c.total, 0).label('upload_count'),
+        )
+        .select_from(TripGuest)
+        .join(Trip, Trip.id == TripGuest.trip_id)
+        .outerjoin(guest_counts, guest_counts.c.trip_id == Trip.id)
+        .outerjoin(expense_totals, expense_totals.c.trip_id == Trip.id)
+        .outerjoin(location_counts, location_counts.c.trip_id == Trip.id)
+        .outerjoin(upload_counts, upload_counts.c.trip_id == Trip.id)
+        .where(TripGuest.guest_id == user_id)
+        .order_by(TripGuest.trip_id)
+    )
 
 # endpoint to get a trip given a trip id. the input arg is a trip id and the output is the trip details.
 @trips_bp.route('/get-trip', methods=['GET'])
@@ -145,16 +213,7 @@ def get_trip(token):
     if not trip:
         return jsonify({"error": "Trip not found."}), 404
 
-    trip_details = {
-        "trip_id": trip.id,
-        "trip_name": trip.name,
-        "trip_description": trip.description,
-        "trip_hostname": trip.host_id,
-        "trip_start_date": trip.start_date.strftime("%m/%d/%Y"),
-        "trip_end_date": trip.end_date.strftime("%m/%d/%Y"),
-        "trip_token": trip.token
-    }
-    return jsonify({"trip_details": trip_details}), 200
+    return jsonify({"trip_details": trip_details(trip)}), 200
 
 # endpoint to update a trip - all the fields for the trip can be changed except for the trip id. all the fields to update are optional, if a field is not provided i dont want to update it. if the host username is updated, i want to make sure that the new host username exists in the users table and i want to update the is_host field in the trip_guests table accordingly.
 @trips_bp.route('/update-trip', methods=['PUT'])
@@ -206,10 +265,11 @@ def update_trip(token):
             return jsonify({"error": "Invalid end date format. Use MM/DD/YYYY."}), 400
     
     # if the trip end date is before the start date, return an error
-    if trip_start_date and trip_end_date and trip_start_date > trip_end_date:
+    if (trip_start_date or trip.start_date) > (trip_end_date or trip.end_date):
         return jsonify({"error": "Start date cannot be later than end date."}), 400
 
     try:
+        old_start_date, old_end_date = trip.start_date, trip.end_date
         # Update the trip
         if trip_name:
             trip.name = trip_name
@@ -220,6 +280,12 @@ def update_trip(token):
         if trip_end_date:
             trip.end_date = trip_end_date
 
+        changes = [(TRIP, trip_id, UPSERT)]
+        if (trip.start_date, trip.end_date) != (old_start_date, old_end_date):
+            inserted, deleted = reconcile_days(trip, old_start_date, old_end_date, not app.config.get('ITINERARY_VIRTUAL_DAYS', True))
+            changes.extend((ITINERARY, item_id, UPSERT) for item_id in inserted)
+            changes.extend((ITINERARY, item_id, DELETE) for item_id in deleted)
+        record_changes(trip_id, changes)
         db.session.commit()
         return jsonify({"message": "Trip updated successfully."}), 200
 
@@ -265,6 +331,9 @@ def delete_trip(token):
         # delete all expenses associated with the trip
         TripExpense.query.filter_by(trip_id=trip_id).delete()
         TripExpenseShare.query.filter_by(trip_id=trip_id).delete()
+        TripBalance.query.filter_by(trip_id=trip_id).delete()
+        TripCollectionVersion.query.filter_by(trip_id=trip_id).delete()
+        purge_changes(trip_id)
 
         # delete all locations
         TripLocation.query.filter_by(trip_id=trip_id).delete()
@@ -275,14 +344,13 @@ def delete_trip(token):
 
         # delete todos
         TripTodo.query.filter_by(trip_id=trip_id).delete()
-        uploads = UserUpload.query.filter_by(trip_id=trip_id).all()
-        for upload in uploads:
-            delete_trip_uploads(upload.file_name, trip_id)
-            db.session.delete(upload)
-        
+        # the S3 objects are deleted by a background job once this commits
+        delete_trip_objects(trip_id)
+
         Trip.query.filter_by(id=trip_id).delete()
 
         db.session.commit()
+        invalidate_membership(trip_id)
         return jsonify({"message": "Trip deleted successfully."}), 200
     except Exception as e:
         app.logger.error(f"Error deleting trip: {e}")
@@ -306,13 +374,10 @@ def add_todo(token):
         app.logger.error(e)
         return jsonify({"error": "Invalid trip ID."}), 400
     
-    # Check if the trip exists
-    trip = Trip.query.filter_by(id=trip_id).first()
-    if not trip:
+    # Check if the trip exists and the user is a guest of the trip with an rsvp status of YES
+    trip_found, trip_guest = lookup_membership(user_id, trip_id)
+    if not trip_found:
         return jsonify({"error": "Trip not found."}), 404
-    
-    # Check if the user is a guest of the trip and their rsvp status is YES
-    trip_guest = TripGuest.query.filter_by(trip_id=trip_id, guest_id=user_id).first()
     if not trip_guest or trip_guest.rsvp_status != RsvpStatus.YES:
         return jsonify({"error": "User is not a guest of this trip."}), 403
     
@@ -320,6 +385,7 @@ def add_todo(token):
     
     try:
         db.session.add(todo)
+        record_change(trip_id, TODOS, todo_id)
         db.session.commit()
         return jsonify({"message": "Note added successfully."}), 200
     except Exception as e:
@@ -342,18 +408,16 @@ def delete_todo(token):
         app.logger.error(e)
         return jsonify({"error": "Invalid trip ID."}), 400
     
-    # Check if the trip exists
-    trip = Trip.query.filter_by(id=trip_id).first()
-    if not trip:
+    # Check if the trip exists and the user is the host of the trip
+    trip_found, trip_guest = lookup_membership(user_id, trip_id)
+    if not trip_found:
         return jsonify({"error": "Trip not found."}), 404
-    
-    # Check if the user is the host of the trip and their rsvp status is YES
-    trip_guest = TripGuest.query.filter_by(trip_id=trip_id, guest_id=user_id).first()
     if not trip_guest or not trip_guest.is_host:
         return jsonify({"error": "User is not the host of this trip."}), 403
     
     try:
-        TripTodo.query.filter_by(id=todo_id, trip_id=trip_id).delete()
+        if TripTodo.query.filter_by(id=todo_id, trip_id=trip_id).delete():
+            record_change(trip_id, TODOS, todo_id, DELETE)
         db.session.commit()
         return jsonify({"message": "Note deleted successfully."}), 200
     except Exception as e:
@@ -371,28 +435,39 @@ def get_todos(token):
     app.logger.debug(data)
     trip_id = data['trip_id']
     user_id = data['user_id']
+
+    try:
+        trip_id = int(trip_id)
+    except ValueError as e:
+        app.logger.error(e)
+        return jsonify({"error": "Invalid trip ID."}), 400
     
-    # Check if the trip exists
-    trip = Trip.query.filter_by(id=trip_id).first()
-    if not trip:
+    # Check if the trip exists and the user is a guest of the trip
+    trip_found, trip_guest = lookup_membership(user_id, trip_id)
+    if not trip_found:
         return jsonify({"error": "Trip not found."}), 404
-    
-    # Check if the user is a guest of the trip
-    trip_guest = TripGuest.query.filter_by(trip_id=trip_id, guest_id=user_id).first()
     if not trip_guest:
         return jsonify({"error": "User is not a guest of this trip."}), 403
-    
-    # Get all todos associated with the trip
-    todos = TripTodo.query.filter_by(trip_id=trip_id).all()
-    todo_list = []
-    for todo in todos:
-        todo_list.append({
-            "id": todo.id,
-            "text": todo.text,
-            "checked": todo.checked
-        })
 
-    return jsonify({"todos": todo_list}), 200
+    etag = collection_etag(trip_id, TODOS)
+    cached = not_modified(etag)
+    if cached:
+        return cached
+
+    sort_columns = [TripTodo.id]
+    try:
+        page = get_page_request(data, sort_columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Get the todos associated with the trip
+    todos, next_cursor = paginate(TripTodo.query.filter_by(trip_id=trip_id), sort_columns, page, lambda todo: (todo.id,))
+    todo_list = [todo_item(todo) for todo in todos]
+
+    response = {"todos": todo_list}
+    if page:
+        response["next_cursor"] = next_cursor
+    return with_etag(jsonify(response), etag), 200
 
 @trips_bp.route('/update-todo', methods=['PUT'])
 @cross_origin()
@@ -415,13 +490,10 @@ def update_todo(token):
         app.logger.error(e)
         return jsonify({"error": "Invalid trip ID."}), 400
 
-    # Check if the trip exists
-    trip = Trip.query.filter_by(id=trip_id).first()
-    if not trip:
+    # Check if the trip exists and the user is a guest of the trip with an rsvp status of YES
+    trip_found, trip_guest = lookup_membership(user_id, trip_id)
+    if not trip_found:
         return jsonify({"error": "Trip not found."}), 404
-
-    # Check if the user is a guest of the trip and their rsvp status is YES
-    trip_guest = TripGuest.query.filter_by(trip_id=trip_id, guest_id=user_id).first()
     if not trip_guest or trip_guest.rsvp_status != RsvpStatus.YES:
         return jsonify({"error": "User is not a guest of this trip."}), 403
 
@@ -433,8 +505,99 @@ def update_todo(token):
         todo.text = text
         todo.checked = checked
         todo.last_updated_at = datetime.now()
+        record_change(trip_id, TODOS, todo.id)
         db.session.commit()
         return jsonify({"message": "Note updated successfully."}), 200
     except Exception as e:
         app.logger.error(e)
-        return jsonify({"error": "An error occurred while updating the note."}), 500
\ No newline at end of file
+        return jsonify({"error": "An error occurred while updating the note."}), 500
+
+@trips_bp.route('/changes', methods=['GET'])
+@cross_origin()
+@token_required
+def get_changes(token):
+    app.logger.info("trips/changes")
+
+    data = get_request_data(token)
+    app.logger.debug(data)
+    trip_id = data['trip_id']
+    user_id = data['user_id']
+
+    try:
+        trip_id = int(trip_id)
+    except ValueError as e:
+        app.logger.error(e)
+        return jsonify({"error": "Invalid trip ID."}), 400
+
+    try:
+        since = int(data.get('since', 0))
+    except ValueError as e:
+        app.logger.error(e)
+        return jsonify({"error": "Invalid since."}), 400
+    if since < 0:
+        return jsonify({"error": "Invalid since."}), 400
+
+    # Check if the trip exists and the user is a guest of the trip
+    trip_found, trip_guest = lookup_membership(user_id, trip_id)
+    if not trip_found:
+        return jsonify({"error": "Trip not found."}), 404
+    if not trip_guest:
+        return jsonify({"error": "User is not a guest of this trip."}), 403
+
+    return jsonify(changes_since(trip_id, since)), 200
+
+@trips_bp.route('/stream', methods=['GET'])
+@cross_origin()
+@token_required
+def stream_changes(token):
+    app.logger.info("trips/stream")
+
+    data = get_request_data(token)
+    app.logger.debug(data)
+    trip_id = data['trip_id']
+    user_id = data['user_id']
+
+    try:
+        trip_id = int(trip_id)
+    except ValueError as e:
+        app.logger.error(e)
+        return jsonify({"error": "Invalid trip ID."}), 400
+
+    # EventSource resends the last id it saw as Last-Event-ID when it reconnects
+    last_event_id = request.headers.get('Last-Event-ID', data.get('last_event_id'))
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError as e:
+        app.logger.error(e)
+        return jsonify({"error": "Invalid Last-Event-ID."}), 400
+
+    # Check if the trip exists and the user is a guest of the trip
+    trip_found, trip_guest = lookup_membership(user_id, trip_id)
+    if not trip_found:
+        return jsonify({"error": "Trip not found."}), 404
+    if not trip_guest:
+        return jsonify({"error": "User is not a guest of this trip."}), 403
+
+    # every open stream holds a thread (or greenlet) for up to STREAM_MAX_SECONDS, so each worker only
+    # takes as many as it can spare; clients turned away keep polling /trips/changes
+    slots = app.extensions['stream_slots']
+    if not slots.acquire(blocking=False):
+        response = jsonify({"error": "Too many open streams."})
+        response.headers['Retry-After'] = str(app.config.get('STREAM_RETRY_MS', 3000) // 1000 or 1)
+        return response, 503
+
+    # subscribe before reading the seq so a commit in between isn't missed
+    subscription = app.extensions['change_pubsub'].subscribe(trip_id)
+    seq = current_seq(trip_id)
+
+    response = Response(stream_events(
+        trip_id, subscription, seq, last_event_id,
+        heartbeat=app.config.get('STREAM_HEARTBEAT_SECONDS', 15),
+        max_seconds=app.config.get('STREAM_MAX_SECONDS', 300),
+        retry_ms=app.config.get('STREAM_RETRY_MS', 3000)
+    ), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(subscription.close)
+    response.call_on_close(slots.release)
+    return response
@@ -1,14 +1,22 @@
 from flask import Blueprint, jsonify, request, current_app as app
 from flask_cors import cross_origin
 from models import UserUpload, db, DocumentCategory
-import os
-import boto3
-from botocore.exceptions import NoCredentialsError
-from .utils import get_request_data, token_required
+import math
+import time
+from datetime import datetime, timedelta, timezone
+import click
+from sqlalchemy import select
+from jobs import enqueue, handler
+from storage import CredentialsUnavailable, get_storage
+from .utils import get_request_data, token_required, validate_user_trip
+from .pagination import get_page_request, paginate
+from .changes import record_change, UPLOADS, DELETE
 
 user_uploads_bp = Blueprint('uploads', __name__)
 
-bucket_name = os.environ.get('S3_BUCKET_NAME')
+DELETE_OBJECTS = 'delete_s3_objects'
+# S3's limit on the parts in one multipart upload
+MAX_PARTS = 10000
 ALLOWED_EXTENSIONS = {'doc', 'docx', 'xls', 'xlsx', 'txt', 'pdf', 'jpg', 'jpeg', 'png', 'tiff', 'ppt', 'pptx'}
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
@@ -53,21 +61,14 @@ def generate_presigned_url(token):
         return jsonify({"error": "Invalid document category."}), 400
         
     expiration = 300
-    s3_client = boto3.client('s3', region_name='us-east-1')
+    storage = get_storage()
     s3_key = f"user_uploads/{trip_id}/{document_category.value}/{file_name}"
 
     if url_type == "download":
         try:
-            download_url = s3_client.generate_presigned_url(
-                'get_object',
-                Params={
-                    'Bucket': bucket_name,
-                    'Key': s3_key
-                },
-                ExpiresIn=expiration
-            )
+            download_url = storage.presign_get(s3_key, expiration)
             return jsonify({"download_url": download_url}), 200
-        except NoCredentialsError as e:
+        except CredentialsUnavailable as e:
             app.logger.error(e)
             return jsonify({"error": "Credentials not available."}), 403
         except Exception as e:
@@ -76,17 +77,9 @@ def generate_presigned_url(token):
 
     else:
         try:
-            app.logger.debug(f"{bucket_name}, {s3_key}, {file_type}, {expiration}")
-            url = s3_client.generate_presigned_url(
-                'put_object',
-                Params={
-                    'Bucket': bucket_name,
-                    'Key': s3_key,
-                    'ContentType': file_type
-                },
-                ExpiresIn=expiration
-            )
-            app.logger.debug("URL: ", url)
+            app.logger.debug(f"{s3_key}, {file_type}, {expiration}")
+            url = storage.presign_put(s3_key, expiration, file_type)
+            app.logger.debug("URL: %s", url)
             save_upload_metadata(user_id, trip_id, file_name, s3_key, document_category)
             return jsonify({"url": url}), 200
         except Exception as e:
@@ -101,11 +94,193 @@ def save_upload_metadata(user_id, trip_id, file_name, s3_key, document_category)
                 upload_user_id=user_id, trip_id=trip_id, document_category=document_category, file_name=file_name, s3_url=s3_key
             )
             db.session.add(new_upload)
+            db.session.flush()
+            record_change(trip_id, UPLOADS, new_upload.id)
             db.session.commit()
     except Exception as e:
-        app.logger.error(e)
-        print("Error saving upload metadata")
+        # without its row the stored file is never listed or cleaned up, so the caller has to fail
+        app.logger.error(f"Error saving upload metadata for {s3_key}: {e}")
+        db.session.rollback()
+        raise
     
+# Large files are uploaded in parts: multipart/create starts a multipart upload and returns a
+# presigned URL per part, which the client PUTs (in parallel, and retrying just the failed parts).
+# multipart/parts lists what storage already has and re-signs the rest, so an interrupted upload resumes
+# where it stopped. multipart/complete assembles the parts and only then records the UserUpload;
+# multipart/abort discards them. The key always comes from the trip, category and file name.
+
+def multipart_target(data):
+    """(trip_id, document_category, file_name, s3_key) for a multipart call, or an error response."""
+    valid, error = validate_user_trip(data['user_id'], data['trip_id'])
+    if not valid:
+        return None, (jsonify({"message": f"Invalid user or trip id: {error}"}), 400)
+
+    file_name = data.get('file_name')
+    if not file_name:
+        return None, (jsonify({"error": "File name is required."}), 400)
+    if not allowed_file(file_name):
+        return None, (jsonify({"error": "File type not allowed."}), 400)
+
+    if not data.get('document_category'):
+        return None, (jsonify({"error": "Document category is required."}), 400)
+    try:
+        document_category = DocumentCategory(data['document_category'])
+    except ValueError as e:
+        app.logger.error(e)
+        return None, (jsonify({"error": "Invalid document category."}), 400)
+
+    trip_id = int(data['trip_id'])
+    return (trip_id, document_category, file_name, f"user_uploads/{trip_id}/{document_category.value}/{file_name}"), None
+
+def part_count(file_size, part_size):
+    try:
+        file_size = int(file_size)
+    except (TypeError, ValueError):
+        return None
+    if file_size <= 0:
+        return None
+    return math.ceil(file_size / part_size)
+
+def sign_part_urls(storage, s3_key, upload_id, part_numbers):
+    expires_in = app.config.get('MULTIPART_URL_EXPIRES', 3600)
+    return [
+        {"part_number": part_number, "url": storage.presign_part(s3_key, upload_id, part_number, expires_in)}
+        for part_number in part_numbers
+    ]
+
+@user_uploads_bp.route('/multipart/create', methods=['POST'])
+@cross_origin()
+@token_required
+def create_multipart_upload(token):
+    app.logger.info("uploads/multipart/create")
+    data = get_request_data(token)
+    app.logger.debug(data)
+
+    target, error = multipart_target(data)
+    if error:
+        return error
+    _, _, _, s3_key = target
+
+    part_size = app.config.get('MULTIPART_PART_SIZE', 8 * 1024 * 1024)
+    parts = part_count(data.get('file_size'), part_size)
+    if parts is None:
+        return jsonify({"error": "file_size must be a positive number of bytes."}), 400
+    if parts > MAX_PARTS:
+        return jsonify({"error": "File is too large."}), 400
+
+    storage = get_storage()
+    try:
+        upload_id = storage.create_multipart(s3_key, data.get('file_type'))
+        part_urls = sign_part_urls(storage, s3_key, upload_id, range(1, parts + 1))
+    except Exception as e:
+        app.logger.error(e)
+        return jsonify({"error": "Could not start upload."}), 500
+
+    return jsonify({"upload_id": upload_id, "part_size": part_size, "parts": part_urls}), 200
+
+@user_uploads_bp.route('/multipart/parts', methods=['POST'])
+@cross_origin()
+@token_required
+def resume_multipart_upload(token):
+    app.logger.info("uploads/multipart/parts")
+    data = get_request_data(token)
+    app.logger.debug(data)
+
+    target, error = multipart_target(data)
+    if error:
+        return error
+    _, _, _, s3_key = target
+    upload_id = data.get('upload_id')
+    if not upload_id:
+        return jsonify({"error": "Upload ID is required."}), 400
+
+    part_size = app.config.get('MULTIPART_PART_SIZE', 8 * 1024 * 1024)
+    parts = part_count(data.get('file_size'), part_size)
+    if parts is None or parts > MAX_PARTS:
+        return jsonify({"error": "file_size must be a positive number of bytes."}), 400
+
+    storage = get_storage()
+    try:
+        uploaded = [{"part_number": part_number, "etag": etag} for part_number, etag in storage.list_parts(s3_key, upload_id)]
+        done = {part["part_number"] for part in uploaded}
+        part_urls = sign_part_urls(storage, s3_key, upload_id, [n for n in range(1, parts + 1) if n not in done])
+    except Exception as e:
+        app.logger.error(e)
+        return jsonify({"error": "Could not resume upload."}), 500
+
+    return jsonify({"upload_id": upload_id, "part_size": part_size, "uploaded": uploaded, "parts": part_urls}), 200
+
+@user_uploads_bp.route('/multipart/complete', methods=['POST'])
+@cross_origin()
+@token_required
+def complete_multipart_upload(token):
+    app.logger.info("uploads/multipart/complete")
+    data = get_request_data(token)
+    app.logger.debug(data)
+
+    target, error = multipart_target(data)
+    if error:
+        return error
+    trip_id, document_category, file_name, s3_key = target
+    upload_id = data.get('upload_id')
+    if not upload_id:
+        return jsonify({"error": "Upload ID is required."}), 400
+
+    try:
+        parts = sorted((int(part['part_number']), part['etag']) for part in data.get('parts') or [])
+    except (KeyError, TypeError, ValueError):
+        parts = None
+    if not parts:
+        return jsonify({"error": "parts must list every part's part_number and etag."}), 400
+
+    try:
+        get_storage().complete_multipart(s3_key, upload_id, parts)
+    except Exception as e:
+        app.logger.error(e)
+        return jsonify({"error": "Could not complete upload."}), 500
+
+    try:
+        save_upload_metadata(data['user_id'], trip_id, file_name, s3_key, document_category)
+    except Exception:
+        return jsonify({"error": "Could not record upload."}), 500
+    return jsonify({"message": "Upload completed successfully."}), 200
+
+@user_uploads_bp.route('/multipart/abort', methods=['POST'])
+@cross_origin()
+@token_required
+def abort_multipart_upload(token):
+    app.logger.info("uploads/multipart/abort")
+    data = get_request_data(token)
+    app.logger.debug(data)
+
+    target, error = multipart_target(data)
+    if error:
+        return error
+    _, _, _, s3_key = target
+    upload_id = data.get('upload_id')
+    if not upload_id:
+        return jsonify({"error": "Upload ID is required."}), 400
+
+    try:
+        get_storage().abort_multipart(s3_key, upload_id)
+    except Exception as e:
+        app.logger.error(e)
+        return jsonify({"error": "Could not abort upload."}), 500
+    return jsonify({"message": "Upload aborted."}), 200
+
+@user_uploads_bp.cli.command('abort-incomplete')
+@click.option('--older-than-hours', type=int, default=24, show_default=True, help="Only abort uploads started before this.")
+def abort_incomplete_command(older_than_hours):
+    """Aborts multipart uploads that were never completed or aborted, freeing their stored parts."""
+    storage = get_storage()
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=older_than_hours)
+    aborted = 0
+    for key, upload_id, initiated in list(storage.list_multipart_uploads('user_uploads/')):
+        if initiated < cutoff:
+            storage.abort_multipart(key, upload_id)
+            aborted += 1
+    click.echo(f"Aborted {aborted} incomplete upload(s).")
+
 @user_uploads_bp.route('/retrieve-trip-uploads', methods=['GET'])
 @cross_origin()
 @token_required
@@ -132,7 +307,16 @@ def retrieve_uploads(token):
         app.logger.error(e)
         return jsonify({"error": "Invalid document category."}), 400
     
-    uploads = UserUpload.query.filter_by(trip_id=trip_id, document_category=document_category).all()
+    sort_columns = [UserUpload.id]
+    try:
+        page = get_page_request(data, sort_columns)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    uploads, next_cursor = paginate(
+        UserUpload.query.filter_by(trip_id=trip_id, document_category=document_category), sort_columns, page,
+        lambda upload: (upload.id,)
+    )
     upload_list = []
     for upload in uploads:
         upload_list.append({
@@ -140,7 +324,76 @@ def retrieve_uploads(token):
             "s3_url": upload.s3_url
         })
 
-    return jsonify({"uploads": upload_list}), 200
+    response = {"uploads": upload_list}
+    if page:
+        response["next_cursor"] = next_cursor
+    return jsonify(response), 200
+
+@user_uploads_bp.route('/download-urls', methods=['GET'])
+@cross_origin()
+@token_required
+def download_urls(token):
+    app.logger.info("uploads/download-urls")
+    data = get_request_data(token)
+    app.logger.debug(data)
+
+    user_id = data['user_id']
+    trip_id = data['trip_id']
+    document_category = data.get('document_category')
+
+    valid, error = validate_user_trip(user_id, trip_id)
+    if not valid:
+        return jsonify({"message": f"Invalid user or trip id: {error}"}), 400
+
+    if not document_category:
+        return jsonify({"error": "Document category is required."}), 400
+
+    try:
+        document_category = DocumentCategory(document_category)
+    except ValueError as e:
+        app.logger.error(e)
+        return jsonify({"error": "Invalid document category."}), 400
+
+    uploads = UserUpload.query.filter_by(trip_id=int(trip_id), document_category=document_category).order_by(UserUpload.id).all()
+    try:
+        urls = sign_download_urls([upload.s3_url for upload in uploads])
+    except CredentialsUnavailable as e:
+        app.logger.error(e)
+        return jsonify({"error": "Credentials not available."}), 403
+    except Exception as e:
+        app.logger.error(e)
+        return jsonify({"error": "Could not generate URLs."}), 500
+
+    return jsonify({"uploads": [
+        {"id": upload.id, "file_name": upload.file_name, "download_url": urls[upload.s3_url]} for upload in uploads
+    ]}), 200
+
+def sign_download_urls(keys):
+    """{key: presigned GET URL} for the given document keys.
+
+    URLs signed earlier are reused until DOWNLOAD_URL_REFRESH_SECONDS before they expire, so a client
+    always gets at least that long to use one. The rest are signed in one pass; presigning is local,
+    so that costs no requests to storage.
+    """
+    cache = app.extensions['download_url_cache']
+    urls = {}
+    unsigned = []
+    for key in keys:
+        url = cache.get(key)
+        if url is None:
+            unsigned.append(key)
+        else:
+            urls[key] = url
+    if not unsigned:
+        return urls
+
+    expires_in = app.config.get('DOWNLOAD_URL_EXPIRES', 300)
+    reuse_until = time.time() + expires_in - app.config.get('DOWNLOAD_URL_REFRESH_SECONDS', 60)
+    storage = get_storage()
+    for key in unsigned:
+        urls[key] = storage.presign_get(key, expires_in)
+        cache.set(key, urls[key], expires_at=reuse_until)
+    return urls
 
 @user_uploads_bp.route('/delete-upload', methods=['POST'])
 @cross_origin()
@@ -167,15 +420,26 @@ def delete_trip_uploads(file_name, trip_id):
         return jsonify({"error": "Upload not found."}), 404
 
     s3_key = upload.s3_url
-    s3_client = boto3.client('s3', region_name='us-east-1')
 
     try:
-        s3_client.delete_object(Bucket=bucket_name, Key=s3_key)
+        get_storage().delete(s3_key)
+        app.extensions['download_url_cache'].pop(s3_key)
         db.session.delete(upload)
+        record_change(trip_id, UPLOADS, upload.id, DELETE)
         db.session.commit()
         return jsonify({"message": "Upload deleted successfully."}), 200
     except Exception as e:
         app.logger.error(e)
         return jsonify({"error": "Could not delete upload."}), 500
 
-            
\ No newline at end of file
+def delete_trip_objects(trip_id):
+    """Deletes the trip's upload rows and queues one job to delete their stored files, in the caller's transaction."""
+    keys = db.session.execute(select(UserUpload.s3_url).where(UserUpload.trip_id == trip_id)).scalars().all()
+    if keys:
+        enqueue(DELETE_OBJECTS, {"keys": keys})
+    UserUpload.query.filter_by(trip_id=trip_id).delete()
+
+@handler(DELETE_OBJECTS)
+def run_delete_objects(payload):
+    # deleting keys that are already gone succeeds, so a retried job just tries them all again
+    get_storage().delete_many(payload['keys'])
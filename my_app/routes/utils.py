@@ -1,8 +1,55 @@
+import hashlib
+import hmac
+import time
+from collections import namedtuple
 from functools import wraps
-from flask import request, jsonify, current_app as app
-from functools import wraps
-from firebase_admin import auth
-from models import Trip, TripGuest, User
+from flask import request, jsonify, g, current_app as app
+from sqlalchemy import and_, select
+from cache import TTLCache
+from clients import firebase_auth
+from models import db, Trip, TripGuest, User
+
+Membership = namedtuple('Membership', ['user_id', 'trip_id', 'is_host', 'rsvp_status'])
+
+def init_caches(app):
+    app.extensions['token_cache'] = TTLCache(maxsize=app.config.get('TOKEN_CACHE_SIZE', 10000))
+    app.extensions['membership_cache'] = TTLCache(
+        maxsize=app.config.get('MEMBERSHIP_CACHE_SIZE', 10000),
+        ttl=app.config.get('MEMBERSHIP_CACHE_TTL', 30)
+    )
+    # presigned download URLs, each kept until shortly before it expires; see sign_download_urls
+    app.extensions['download_url_cache'] = TTLCache(maxsize=app.config.get('DOWNLOAD_URL_CACHE_SIZE', 10000))
+
+def verify_token(token):
+    # a /batch request verifies its token once and its sub-requests reuse the result
+    batch_token = g.get('_batch_token')
+    if batch_token and hmac.compare_digest(batch_token[0], hashlib.sha256(token.encode()).hexdigest()):
+        return batch_token[1]
+
+    cache = app.extensions.get('token_cache')
+    check_revoked = app.config.get('TOKEN_CHECK_REVOKED', False)
+    if cache is None or not app.config.get('TOKEN_CACHE_ENABLED', True):
+        return firebase_auth().verify_id_token(token, check_revoked=check_revoked)
+
+    # key on a digest so raw bearer tokens never sit in memory as dict keys
+    key = hashlib.sha256(token.encode()).hexdigest()
+    decoded_token = cache.get(key)
+    if decoded_token is not None:
+        return decoded_token
+
+    decoded_token = firebase_auth().verify_id_token(token, check_revoked=check_revoked)
+
+    # only cache tokens that are already valid, and never past their own exp. The TTL bounds how long
+    # a token revoked in Firebase can keep being accepted by this process; when revocation is checked,
+    # the token is checked again every TOKEN_REVOCATION_CHECK_SECONDS (0 to check every request).
+    now = time.time()
+    ttl = app.config.get('TOKEN_CACHE_MAX_TTL', 300)
+    if check_revoked:
+        ttl = min(ttl, app.config.get('TOKEN_REVOCATION_CHECK_SECONDS', 30))
+    expires_at = min(decoded_token.get('exp', now), now + ttl)
+    if decoded_token.get('iat', now) <= now and expires_at > now:
+        cache.set(key, decoded_token, expires_at=expires_at)
+    return decoded_token
 
 def token_required(f):
     @wraps(f)
@@ -13,10 +60,11 @@ def token_required(f):
         if not token:
             return jsonify({"error": "Token is missing."}), 401
         try:
-            decoded_token = auth.verify_id_token(token)
+            decoded_token = verify_token(token)
         except Exception as e:
             app.logger.error(e)
             return jsonify({"message": "Token is invalid!", "error": str(e)}), 401
+        g.user_id = decoded_token.get('user_id')
         return f(decoded_token, *args, **kwargs)
     return decorated
 
@@ -34,19 +82,75 @@ def get_request_data(token=None):
                 return request.get_json()
         return {}
 
+def lookup_membership(user_id, trip_id):
+    """Returns (trip_found, membership) for a user and an integer trip id.
+
+    Memberships are memoized on the request and, when enabled, in a per-process TTL cache.
+    Only positive answers are cached so a guest who just joined never sees a stale rejection.
+    """
+    key = (user_id, trip_id)
+    memo = g.setdefault('_memberships', {})
+    if key in memo:
+        return True, memo[key]
+
+    cache = app.extensions.get('membership_cache')
+    use_cache = cache is not None and app.config.get('MEMBERSHIP_CACHE_ENABLED', True)
+    if use_cache:
+        membership = cache.get(key)
+        if membership is not None:
+            memo[key] = membership
+            return True, membership
+
+    # one indexed lookup: the trip's primary key outer joined to the unique (trip_id, guest_id) row
+    row = db.session.execute(
+        select(Trip.id, TripGuest.is_host, TripGuest.rsvp_status)
+        .outerjoin(TripGuest, and_(TripGuest.trip_id == Trip.id, TripGuest.guest_id == user_id))
+        .where(Trip.id == trip_id)
+    ).first()
+    if row is None:
+        return False, None
+    if row.is_host is None:
+        return True, None
+
+    membership = Membership(user_id, trip_id, row.is_host, row.rsvp_status)
+    memo[key] = membership
+    if use_cache:
+        cache.set(key, membership)
+    return True, membership
+
+def invalidate_membership(trip_id, user_id=None):
+    trip_id = int(trip_id)
+
+    def matches(key, value=None):
+        return key[1] == trip_id and (user_id is None or key[0] == user_id)
+
+    memo = g.get('_memberships')
+    if memo:
+        for key in [key for key in memo if matches(key)]:
+            del memo[key]
+    cache = app.extensions.get('membership_cache')
+    if cache is not None:
+        cache.discard_where(matches)
+
+def load_users(user_ids):
+    """Returns {user_id: User} for every id that exists, loaded with a single IN query."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return {}
+    return {user.id: user for user in User.query.filter(User.id.in_(user_ids))}
+
 def validate_user_trip(user_id, trip_id):
     try:
         trip_id = int(trip_id)
     except ValueError:
         return False, jsonify({"error": "Invalid trip ID."})
 
-    user = User.query.filter_by(id=user_id).first()
-    if not user:
+    trip_found, membership = lookup_membership(user_id, trip_id)
+    if membership:
+        return True, None
+    # a guest row means the user exists, so only a failed lookup needs to look for the user
+    if db.session.get(User, user_id) is None:
         return False, jsonify({"error": "User not found."})
-    trip = Trip.query.filter_by(id=trip_id).first()
-    if not trip:
+    if not trip_found:
         return False, jsonify({"error": "Trip not found."})
-    guest = TripGuest.query.filter_by(trip_id=trip_id, guest_id=user_id).first()
-    if not guest:
-        return False, jsonify({"error": "User is not a guest of this trip."})
-    return True, None
\ No newline at end of file
+    return False, jsonify({"error": "User is not a guest of this trip."})
@@ -0,0 +1,32 @@
+from flask import make_response, request
+from sqlalchemy import select
+from models import db, TripCollectionVersion
+
+# Clients poll the trip list endpoints constantly. Each (trip, collection) pair carries a version
+# number that every write to the collection bumps in its own transaction (see record_changes in
+# changes.py), so a read endpoint can answer If-None-Match with a 304 after one primary key lookup
+# instead of running its list query.
+
+ITINERARY = 'itinerary'
+TODOS = 'todos'
+LOCATIONS = 'locations'
+EXPENSES = 'expenses'
+
+def collection_etag(trip_id, collection):
+    version = db.session.execute(
+        select(TripCollectionVersion.version)
+        .where(TripCollectionVersion.trip_id == int(trip_id), TripCollectionVersion.collection == collection)
+    ).scalar()
+    return f"{int(trip_id)}-{collection}-{version or 0}"
+
+def not_modified(etag):
+    """Returns a 304 response if the client already holds this ETag, otherwise None."""
+    if not request.if_none_match.contains_weak(etag):
+        return None
+    response = make_response('', 304)
+    response.set_etag(etag, weak=True)
+    return response
+
+def with_etag(response, etag):
+    response.set_etag(etag, weak=True)
+    return response
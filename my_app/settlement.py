@@ -0,0 +1,142 @@
+import heapq
+from collections import defaultdict
+import click
+from flask.cli import AppGroup
+from sqlalchemy import Integer, case, cast, func, insert, select, union_all
+from models import db, TripExpense, TripExpenseShare, TripBalance, upsert_add
+
+balances_cli = AppGroup('balances', help="Maintain the trip_balances ledger.")
+
+def to_cents(amount):
+    # round half away from zero; share_cents does the same in SQL, so the ledger and balances_query agree
+    cents = abs(float(amount)) * 100
+    return int(cents + 0.5) * (1 if float(amount) >= 0 else -1)
+
+def share_cents(amount, dialect_name):
+    """to_cents as a SQL expression.
+
+    ROUND on a float column rounds exact half cents differently on MySQL and SQLite, so this adds half a
+    cent and truncates instead: FLOOR on MySQL, whose CAST to an integer rounds, and CAST on SQLite.
+    """
+    shifted = func.abs(amount) * 100 + 0.5
+    cents = func.floor(shifted) if dialect_name == 'mysql' else cast(shifted, Integer)
+    return case((amount < 0, -cents), else_=cents)
+
+def balances_query(trip_id=None):
+    """(trip_id, user_id, balance_cents) for unsettled expenses, aggregated from the raw expense rows.
+
+    Each payer is credited with every share of their expense and each share holder is debited
+    their share, so a trip's balances always sum to zero.
+    """
+    conditions = [TripExpense.settled.is_(False)]
+    if trip_id is not None:
+        conditions.append(TripExpense.trip_id == trip_id)
+    cents = share_cents(TripExpenseShare.amount, db.session.get_bind().dialect.name)
+    credits = (
+        select(TripExpense.trip_id.label('trip_id'), TripExpense.user_id.label('user_id'), cents.label('cents'))
+        .join(TripExpenseShare, TripExpenseShare.expense_id == TripExpense.id)
+        .where(*conditions)
+    )
+    debits = (
+        select(TripExpense.trip_id.label('trip_id'), TripExpenseShare.user_id.label('user_id'), (-cents).label('cents'))
+        .join(TripExpense, TripExpense.id == TripExpenseShare.expense_id)
+        .where(*conditions)
+    )
+    movements = union_all(credits, debits).subquery()
+    return (
+        select(movements.c.trip_id, movements.c.user_id, func.sum(movements.c.cents).label('balance_cents'))
+        .group_by(movements.c.trip_id, movements.c.user_id)
+    )
+
+def net_balances(trip_id):
+    """Returns {user_id: balance in cents} computed from the trip's expense rows."""
+    return {row.user_id: int(row.balance_cents) for row in db.session.execute(balances_query(trip_id))}
+
+def ledger_balances(trip_id):
+    """Returns {user_id: balance in cents} from trip_balances, a primary key range lookup."""
+    rows = db.session.execute(
+        select(TripBalance.user_id, TripBalance.balance_cents).where(TripBalance.trip_id == trip_id)
+    )
+    return {row.user_id: row.balance_cents for row in rows if row.balance_cents}
+
+def expense_deltas(payer_id, settled, shares):
+    """Balance changes an expense contributes, as {user_id: cents}. shares is [(user_id, amount)]."""
+    deltas = defaultdict(int)
+    if settled:
+        return deltas
+    for user_id, amount in shares:
+        cents = to_cents(amount)
+        deltas[payer_id] += cents
+        deltas[user_id] -= cents
+    return deltas
+
+def apply_balance_deltas(trip_id, deltas):
+    """Adds signed deltas to the trip's ledger rows in the caller's transaction, with a single upsert."""
+    rows = [{'trip_id': trip_id, 'user_id': user_id, 'balance_cents': cents} for user_id, cents in deltas.items() if cents]
+    upsert_add(db.session, TripBalance, rows, 'balance_cents')
+
+def find_drift(trip_id=None):
+    """Returns [(trip_id, user_id, ledger_cents, expected_cents)] wherever the ledger disagrees with the expense rows."""
+    expected = {(row.trip_id, row.user_id): int(row.balance_cents) for row in db.session.execute(balances_query(trip_id))}
+    ledger_query = select(TripBalance.trip_id, TripBalance.user_id, TripBalance.balance_cents)
+    if trip_id is not None:
+        ledger_query = ledger_query.where(TripBalance.trip_id == trip_id)
+    ledger = {(row.trip_id, row.user_id): row.balance_cents for row in db.session.execute(ledger_query)}
+
+    drift = []
+    for key in sorted(set(expected) | set(ledger), key=str):
+        if ledger.get(key, 0) != expected.get(key, 0):
+            drift.append((*key, ledger.get(key, 0), expected.get(key, 0)))
+    return drift
+
+def rebuild_balances(trip_id=None):
+    """Recomputes the ledger from the expense rows for one trip, or every trip, and commits."""
+    delete = TripBalance.__table__.delete()
+    if trip_id is not None:
+        delete = delete.where(TripBalance.trip_id == trip_id)
+    db.session.execute(delete)
+    db.session.execute(insert(TripBalance).from_select(['trip_id', 'user_id', 'balance_cents'], balances_query(trip_id)))
+    db.session.commit()
+
+def minimal_transfers(balances):
+    """Greedy debt simplification over {user_id: balance in cents}.
+
+    Repeatedly settles the largest debt against the largest credit, which needs at most n - 1
+    transfers for n people with a non-zero balance. Returns (from_user_id, to_user_id, cents).
+    """
+    # heapq is a min-heap, so both sides are stored negated to pop the largest amount first
+    creditors = [(-cents, user_id) for user_id, cents in balances.items() if cents > 0]
+    debtors = [(cents, user_id) for user_id, cents in balances.items() if cents < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+
+    transfers = []
+    while creditors and debtors:
+        credit, creditor = heapq.heappop(creditors)
+        debt, debtor = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((debtor, creditor, amount))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+    return transfers
+
+@balances_cli.command('verify')
+@click.option('--trip-id', type=int, help="Only check this trip.")
+def verify_command(trip_id):
+    drift = find_drift(trip_id)
+    for drift_trip_id, user_id, ledger_cents, expected_cents in drift:
+        click.echo(f"trip {drift_trip_id} user {user_id}: ledger {ledger_cents}, expenses {expected_cents}")
+    if drift:
+        raise click.ClickException(f"{len(drift)} balance(s) drifted. Run `flask balances rebuild`.")
+    click.echo("Balances match the expense rows.")
+
+@balances_cli.command('rebuild')
+@click.option('--trip-id', type=int, help="Only rebuild this trip.")
+def rebuild_command(trip_id):
+    rebuild_balances(trip_id)
+    click.echo("Balances rebuilt from the expense rows.")
+
+def init_app(app):
+    app.cli.add_command(balances_cli)
@@ -0,0 +1,33 @@
+import time
+from contextlib import contextmanager
+
+class StartupReport:
+    """Wall-clock time spent in each phase of create_app."""
+
+    def __init__(self):
+        self.phases = []
+
+    def record(self, name, seconds):
+        self.phases.append((name, seconds))
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    @property
+    def total(self):
+        return sum(seconds for _, seconds in self.phases)
+
+    def as_dict(self):
+        return {
+            "phases_ms": {name: round(seconds * 1000, 2) for name, seconds in self.phases},
+            "total_ms": round(self.total * 1000, 2),
+        }
+
+    def log(self, logger):
+        breakdown = ", ".join(f"{name}={seconds * 1000:.1f}ms" for name, seconds in self.phases)
+        logger.info("Startup took %.1f ms (%s)", self.total * 1000, breakdown)
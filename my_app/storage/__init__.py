@@ -0,0 +1,48 @@
+from flask import current_app
+
+# Uploaded documents live in a storage backend, chosen by STORAGE_BACKEND. Every backend provides:
+#
+#   presign_put(key, expires_in, content_type=None) -> URL the client PUTs the file to
+#   presign_get(key, expires_in) -> URL the client GETs the file from
+#   delete(key)
+#   delete_many(keys), which raises StorageError if any key couldn't be deleted
+#   list(prefix) -> the keys under prefix
+#
+# and, for uploads sent in parts:
+#
+#   create_multipart(key, content_type=None) -> upload_id
+#   presign_part(key, upload_id, part_number, expires_in) -> URL the client PUTs one part to
+#   list_parts(key, upload_id) -> [(part_number, etag)]
+#   complete_multipart(key, upload_id, parts), with parts as [(part_number, etag)] in order
+#   abort_multipart(key, upload_id)
+#   list_multipart_uploads(prefix) -> (key, upload_id, initiated) for unfinished uploads
+#
+# S3Storage keeps documents in an S3 bucket. LocalStorage keeps them in a directory and serves its
+# presigned URLs itself (routes/storage_routes.py), so the whole document flow runs without AWS.
+
+class StorageError(Exception):
+    pass
+
+class CredentialsUnavailable(StorageError):
+    pass
+
+def create_storage(config):
+    backend = config.get('STORAGE_BACKEND', 's3')
+    if backend == 's3':
+        from .s3 import S3Storage
+        return S3Storage(
+            config.get('STORAGE_BUCKET'), config.get('AWS_REGION', 'us-east-1'),
+            delete_retries=config.get('S3_DELETE_RETRIES', 3), delete_backoff=config.get('S3_DELETE_BACKOFF', 0.5)
+        )
+    if backend == 'local':
+        from .local import LocalStorage
+        if not config.get('STORAGE_SIGNING_KEY'):
+            raise ValueError("STORAGE_SIGNING_KEY is required with STORAGE_BACKEND=local")
+        return LocalStorage(config['STORAGE_LOCAL_ROOT'], config['STORAGE_SIGNING_KEY'])
+    raise ValueError(f"Unknown STORAGE_BACKEND {backend!r}")
+
+def init_storage(app):
+    app.extensions['storage'] = create_storage(app.config)
+
+def get_storage():
+    return current_app.extensions['storage']
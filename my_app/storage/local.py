@@ -0,0 +1,182 @@
+import hashlib
+import hmac
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from flask import url_for
+from . import StorageError
+
+COPY_BUFFER_SIZE = 1024 * 1024
+UPLOAD_ID = re.compile(r'[0-9a-f]{32}')
+
+class LocalStorage:
+    """Documents as files under root, for development, tests and benchmarks.
+
+    Presigned URLs point at the storage blueprint and carry an expiry plus an HMAC of the method, key
+    and expiry (and for parts, the upload id and part number) under signing_key. Like S3's, they work
+    without a token and stop working when they expire. Every worker must share the signing key.
+    """
+
+    def __init__(self, root, signing_key, clock=time.time):
+        self.objects_dir = os.path.abspath(os.path.join(root, 'objects'))
+        self.uploads_dir = os.path.abspath(os.path.join(root, 'multipart'))
+        self.signing_key = signing_key.encode()
+        self.clock = clock
+
+    def path(self, key):
+        path = os.path.abspath(os.path.join(self.objects_dir, key))
+        if not path.startswith(self.objects_dir + os.sep):
+            raise ValueError(f"Invalid key {key!r}")
+        return path
+
+    def _upload_dir(self, upload_id):
+        if not UPLOAD_ID.fullmatch(upload_id or ''):
+            raise ValueError(f"Invalid upload id {upload_id!r}")
+        return os.path.join(self.uploads_dir, upload_id)
+
+    def sign(self, method, key, expires, upload_id='', part_number=''):
+        message = '\n'.join([method, key, str(expires), upload_id, str(part_number)])
+        return hmac.new(self.signing_key, message.encode(), hashlib.sha256).hexdigest()
+
+    def verify(self, method, key, expires, signature, upload_id='', part_number=''):
+        try:
+            expires = int(expires)
+        except (TypeError, ValueError):
+            return False
+        return expires > self.clock() and hmac.compare_digest(self.sign(method, key, expires, upload_id, part_number), signature or '')
+
+    def _url(self, method, key, expires_in, **params):
+        expires = int(self.clock() + expires_in)
+        signature = self.sign(method, key, expires, params.get('upload_id', ''), params.get('part_number', ''))
+        return url_for('storage.object', key=key, expires=expires, signature=signature, _external=True, **params)
+
+    def presign_put(self, key, expires_in, content_type=None):
+        self.path(key)
+        return self._url('PUT', key, expires_in)
+
+    def presign_get(self, key, expires_in):
+        self.path(key)
+        return self._url('GET', key, expires_in)
+
+    def _write(self, path, fill):
+        # write beside the target and rename, so readers never see a partial file
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                result = fill(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return result
+
+    def _write_stream(self, path, stream):
+        def fill(f):
+            digest = hashlib.md5()
+            while chunk := stream.read(COPY_BUFFER_SIZE):
+                digest.update(chunk)
+                f.write(chunk)
+            return f'"{digest.hexdigest()}"'
+        return self._write(path, fill)
+
+    def write(self, key, stream):
+        """Stores the object read from stream and returns its ETag."""
+        return self._write_stream(self.path(key), stream)
+
+    def delete(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete_many(self, keys):
+        for key in keys:
+            self.delete(key)
+
+    def list(self, prefix):
+        keys = []
+        for directory, _, files in os.walk(self.objects_dir):
+            for name in files:
+                if not name.startswith('.tmp-'):
+                    key = os.path.relpath(os.path.join(directory, name), self.objects_dir).replace(os.sep, '/')
+                    if key.startswith(prefix):
+                        keys.append(key)
+        return sorted(keys)
+
+    def create_multipart(self, key, content_type=None):
+        self.path(key)
+        upload_id = uuid.uuid4().hex
+        upload_dir = self._upload_dir(upload_id)
+        os.makedirs(upload_dir)
+        with open(os.path.join(upload_dir, 'upload.json'), 'w') as f:
+            json.dump({'key': key, 'initiated': self.clock()}, f)
+        return upload_id
+
+    def _upload(self, key, upload_id):
+        upload_dir = self._upload_dir(upload_id)
+        try:
+            with open(os.path.join(upload_dir, 'upload.json')) as f:
+                upload = json.load(f)
+        except FileNotFoundError:
+            raise StorageError(f"No such upload {upload_id}")
+        if upload['key'] != key:
+            raise StorageError(f"Upload {upload_id} is not for {key}")
+        return upload_dir
+
+    def presign_part(self, key, upload_id, part_number, expires_in):
+        self._upload(key, upload_id)
+        return self._url('PUT', key, expires_in, upload_id=upload_id, part_number=part_number)
+
+    def write_part(self, key, upload_id, part_number, stream):
+        """Stores one part of a multipart upload and returns its ETag."""
+        upload_dir = self._upload(key, upload_id)
+        etag = self._write_stream(os.path.join(upload_dir, f"{part_number}.part"), stream)
+        with open(os.path.join(upload_dir, f"{part_number}.etag"), 'w') as f:
+            f.write(etag)
+        return etag
+
+    def list_parts(self, key, upload_id):
+        upload_dir = self._upload(key, upload_id)
+        parts = []
+        for name in os.listdir(upload_dir):
+            if name.endswith('.etag'):
+                with open(os.path.join(upload_dir, name)) as f:
+                    parts.append((int(name[:-len('.etag')]), f.read()))
+        return sorted(parts)
+
+    def complete_multipart(self, key, upload_id, parts):
+        upload_dir = self._upload(key, upload_id)
+        stored = dict(self.list_parts(key, upload_id))
+        for part_number, etag in parts:
+            if stored.get(part_number) != etag:
+                raise StorageError(f"Part {part_number} of upload {upload_id} is missing or its ETag doesn't match")
+
+        def fill(f):
+            for part_number, _ in parts:
+                with open(os.path.join(upload_dir, f"{part_number}.part"), 'rb') as part:
+                    shutil.copyfileobj(part, f, COPY_BUFFER_SIZE)
+        self._write(self.path(key), fill)
+        shutil.rmtree(upload_dir, ignore_errors=True)
+
+    def abort_multipart(self, key, upload_id):
+        shutil.rmtree(self._upload(key, upload_id), ignore_errors=True)
+
+    def list_multipart_uploads(self, prefix):
+        if not os.path.isdir(self.uploads_dir):
+            return []
+        uploads = []
+        for upload_id in os.listdir(self.uploads_dir):
+            try:
+                with open(os.path.join(self.uploads_dir, upload_id, 'upload.json')) as f:
+                    upload = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if upload['key'].startswith(prefix):
+                uploads.append((upload['key'], upload_id, datetime.fromtimestamp(upload['initiated'], timezone.utc)))
+        return uploads
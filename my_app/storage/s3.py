@@ -0,0 +1,104 @@
+import logging
+import time
+from clients import get_boto3_client
+from . import CredentialsUnavailable, StorageError
+
+logger = logging.getLogger(__name__)
+
+# the most keys one DeleteObjects call accepts
+DELETE_BATCH_SIZE = 1000
+
+class S3Storage:
+    """Documents in an S3 bucket, through the process's shared boto3 client."""
+
+    def __init__(self, bucket, region_name='us-east-1', delete_retries=3, delete_backoff=0.5, client=None, sleep=time.sleep):
+        self.bucket = bucket
+        self.region_name = region_name
+        self.delete_retries = delete_retries
+        self.delete_backoff = delete_backoff
+        self._client = client
+        self._sleep = sleep
+
+    @property
+    def client(self):
+        return self._client or get_boto3_client('s3', self.region_name)
+
+    def _presign(self, method, params, expires_in):
+        # botocore is already loaded once a client exists
+        from botocore.exceptions import NoCredentialsError
+        try:
+            return self.client.generate_presigned_url(method, Params={'Bucket': self.bucket, **params}, ExpiresIn=expires_in)
+        except NoCredentialsError as e:
+            raise CredentialsUnavailable(str(e)) from e
+
+    def presign_put(self, key, expires_in, content_type=None):
+        params = {'Key': key}
+        if content_type:
+            params['ContentType'] = content_type
+        return self._presign('put_object', params, expires_in)
+
+    def presign_get(self, key, expires_in):
+        return self._presign('get_object', {'Key': key}, expires_in)
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def delete_many(self, keys):
+        """Deletes keys with DeleteObjects, DELETE_BATCH_SIZE at a time.
+
+        Keys S3 reports as failed, and batches whose call raises, are retried with exponential backoff.
+        Raises once a batch still fails after delete_retries retries. Deleting a key that's already gone
+        succeeds, so the caller can simply try again later.
+        """
+        for start in range(0, len(keys), DELETE_BATCH_SIZE):
+            batch = keys[start:start + DELETE_BATCH_SIZE]
+            for attempt in range(self.delete_retries + 1):
+                try:
+                    response = self.client.delete_objects(
+                        Bucket=self.bucket, Delete={'Objects': [{'Key': key} for key in batch], 'Quiet': True}
+                    )
+                    batch = [error['Key'] for error in response.get('Errors', [])]
+                except Exception as e:
+                    if attempt == self.delete_retries:
+                        raise
+                    logger.warning("delete_objects failed: %s", e)
+                if not batch:
+                    break
+                if attempt < self.delete_retries:
+                    self._sleep(self.delete_backoff * 2 ** attempt)
+            if batch:
+                raise StorageError(f"Could not delete {len(batch)} object(s) from {self.bucket}, e.g. {batch[0]}")
+
+    def list(self, prefix):
+        for page in self.client.get_paginator('list_objects_v2').paginate(Bucket=self.bucket, Prefix=prefix):
+            for obj in page.get('Contents', []):
+                yield obj['Key']
+
+    def create_multipart(self, key, content_type=None):
+        params = {'Bucket': self.bucket, 'Key': key}
+        if content_type:
+            params['ContentType'] = content_type
+        return self.client.create_multipart_upload(**params)['UploadId']
+
+    def presign_part(self, key, upload_id, part_number, expires_in):
+        return self._presign('upload_part', {'Key': key, 'UploadId': upload_id, 'PartNumber': part_number}, expires_in)
+
+    def list_parts(self, key, upload_id):
+        parts = []
+        for page in self.client.get_paginator('list_parts').paginate(Bucket=self.bucket, Key=key, UploadId=upload_id):
+            parts.extend((part['PartNumber'], part['ETag']) for part in page.get('Parts', []))
+        return parts
+
+    def complete_multipart(self, key, upload_id, parts):
+        self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id,
+            MultipartUpload={'Parts': [{'PartNumber': part_number, 'ETag': etag} for part_number, etag in parts]}
+        )
+
+    def abort_multipart(self, key, upload_id):
+        self.client.abort_multipart_upload(Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    def list_multipart_uploads(self, prefix):
+        for page in self.client.get_paginator('list_multipart_uploads').paginate(Bucket=self.bucket, Prefix=prefix):
+            for upload in page.get('Uploads', []):
+                yield upload['Key'], upload['UploadId'], upload['Initiated']
@@ -1,6 +1,7 @@
 import pytest
 from app import create_app
 from models import db
+from storage.local import LocalStorage
 import os
 
 @pytest.fixture
@@ -30,3 +31,9 @@ def app_context(app):
     """Automatically pushes an app context for tests."""
     with app.app_context():
         yield
+
+@pytest.fixture
+def storage(app, tmp_path):
+    """Points the app at a LocalStorage backend in a fresh directory."""
+    app.extensions['storage'] = LocalStorage(str(tmp_path / 'storage'), app.config['STORAGE_SIGNING_KEY'])
+    return app.extensions['storage']
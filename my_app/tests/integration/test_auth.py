@@ -0,0 +1,99 @@
+import time
+from datetime import datetime
+from unittest.mock import patch
+from models import User, Trip, db
+from routes.utils import validate_user_trip
+
+def create_user():
+    user = User(
+        id="test_user",
+        phone_number="+11234567890",
+        first_name="Test",
+        last_name="User"
+    )
+    db.session.add(user)
+    db.session.commit()
+
+def valid_claims():
+    now = int(time.time())
+    return {'user_id': 'test_user', 'phone_number': '+11234567890', 'iat': now - 10, 'exp': now + 3600}
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_token_cache_skips_verification_on_repeat(mock_verify_id_token, client, app, app_context):
+    create_user()
+    mock_verify_id_token.return_value = valid_claims()
+
+    for _ in range(3):
+        response = client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+        assert response.status_code == 200
+
+    assert mock_verify_id_token.call_count == 1
+    assert app.extensions['token_cache'].stats()['hits'] == 2
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_token_cache_does_not_cache_expired_tokens(mock_verify_id_token, client, app_context):
+    create_user()
+    claims = valid_claims()
+    claims['exp'] = int(time.time()) - 1
+    mock_verify_id_token.return_value = claims
+
+    client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+    client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+
+    assert mock_verify_id_token.call_count == 2
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_token_cache_kill_switch(mock_verify_id_token, client, app, app_context):
+    create_user()
+    app.config['TOKEN_CACHE_ENABLED'] = False
+    mock_verify_id_token.return_value = valid_claims()
+
+    client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+    client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+
+    assert mock_verify_id_token.call_count == 2
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_invalid_token_is_not_cached(mock_verify_id_token, client, app_context):
+    mock_verify_id_token.side_effect = ValueError("bad token")
+
+    response = client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+    assert response.status_code == 401
+    client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+
+    assert mock_verify_id_token.call_count == 2
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_revocation_checks_shorten_the_cache_ttl(mock_verify_id_token, client, app, app_context):
+    create_user()
+    app.config['TOKEN_CHECK_REVOKED'] = True
+    app.config['TOKEN_REVOCATION_CHECK_SECONDS'] = 0
+    mock_verify_id_token.return_value = valid_claims()
+
+    client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+    client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+
+    assert mock_verify_id_token.call_count == 2
+    assert all(call.kwargs == {'check_revoked': True} for call in mock_verify_id_token.call_args_list)
+
+    app.config['TOKEN_REVOCATION_CHECK_SECONDS'] = 30
+    client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+    client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+    assert mock_verify_id_token.call_count == 3
+
+def test_validate_user_trip_errors(app, app_context):
+    create_user()
+    db.session.add(Trip(name="Test Trip", token="123", host_id="test_user",
+                        start_date=datetime(2022, 1, 1), end_date=datetime(2022, 1, 3)))
+    db.session.commit()
+
+    with app.test_request_context():
+        for user_id, trip_id, error in [
+            ("missing_user", 1, "User not found."),
+            ("missing_user", 2, "User not found."),
+            ("test_user", 2, "Trip not found."),
+            ("test_user", 1, "User is not a guest of this trip."),
+        ]:
+            valid, response = validate_user_trip(user_id, trip_id)
+            assert not valid
+            assert response.json == {"error": error}
@@ -0,0 +1,131 @@
+from datetime import datetime
+from unittest.mock import patch
+from flask import jsonify
+from models import User, Trip, db, TripGuest, TripTodo
+
+HEADERS = {"Authorization": "Bearer test_token"}
+
+def create_trip_with_host():
+    db.session.add(User(id="test_user", phone_number="+11234567890", first_name="Test", last_name="User"))
+    db.session.add(Trip(name="Test Trip", description="Test Description", token="123", host_id="test_user",
+                        start_date=datetime(2022, 1, 1), end_date=datetime(2022, 1, 30)))
+    db.session.add(TripGuest(trip_id=1, guest_id="test_user", is_host=True, rsvp_status="YES"))
+    db.session.commit()
+
+TRIP_SCREEN = [
+    {"id": "trip", "path": "/trips/get-trip", "query": {"trip_id": 1}},
+    {"id": "guest", "path": "/trip_guests/get-guest-info", "query": {"trip_id": 1}},
+    {"id": "guests", "path": "/trip_guests/get-trip-guests", "query": {"trip_id": 1}},
+    {"id": "todos", "path": "/trips/get-todos", "query": {"trip_id": 1}},
+    {"id": "itinerary", "path": "/trip_itinerary/get-itinerary", "query": {"trip_id": 1}},
+]
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_batch_runs_sub_requests_with_one_token_check(mock_verify_id_token, app, client, app_context):
+    create_trip_with_host()
+    app.config['TOKEN_CACHE_ENABLED'] = False
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    response = client.post("/batch", json={"requests": TRIP_SCREEN}, headers=HEADERS)
+    assert response.status_code == 200
+    responses = response.json["responses"]
+    assert [r["id"] for r in responses] == ["trip", "guest", "guests", "todos", "itinerary"]
+    assert [r["status"] for r in responses] == [200] * 5
+    assert responses[0]["body"]["trip_details"]["trip_name"] == "Test Trip"
+    assert responses[2]["body"]["guests"][0]["guest_username"] == "test_user"
+    assert mock_verify_id_token.call_count == 1
+
+    # the sub-requests got the same answers as calling the endpoints directly
+    for sub, result in zip(TRIP_SCREEN, responses):
+        direct = client.get(sub["path"], query_string=sub["query"], headers=HEADERS)
+        assert direct.json == result["body"]
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_parallel_batch_orders_reads_after_writes(mock_verify_id_token, client, app_context):
+    create_trip_with_host()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    response = client.post("/batch", json={"parallel": True, "requests": TRIP_SCREEN + [
+        {"id": "add", "method": "POST", "path": "/trips/add-todo", "body": {"trip_id": 1, "id": "a", "text": "Pack"}},
+        {"id": "todos-after", "path": "/trips/get-todos", "query": {"trip_id": 1}},
+        {"id": "trip-after", "path": "/trips/get-trip", "query": {"trip_id": 1}},
+    ]}, headers=HEADERS)
+    assert response.status_code == 200
+    responses = {r["id"]: r for r in response.json["responses"]}
+    assert [r["status"] for r in response.json["responses"]] == [200] * 8
+    assert responses["todos"]["body"] == {"todos": []}
+    assert responses["todos-after"]["body"] == {"todos": [{"id": "a", "text": "Pack", "checked": False}]}
+    assert responses["trip-after"]["body"] == responses["trip"]["body"]
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_batch_sub_request_errors(mock_verify_id_token, client, app_context):
+    create_trip_with_host()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    etag = client.get("/trips/get-todos?trip_id=1", headers=HEADERS).headers["ETag"]
+    response = client.post("/batch", json={"requests": [
+        {"path": "/trips/get-todos", "query": {"trip_id": 1}, "headers": {"If-None-Match": etag}},
+        {"path": "/trips/no-such-endpoint"},
+        {"path": "/trips/stream", "query": {"trip_id": 1}},
+        {"method": "POST", "path": "/batch", "body": {"requests": []}},
+        {"path": "/trips/get-todos", "query": {"trip_id": 2}},
+    ]}, headers=HEADERS)
+    assert response.status_code == 200
+    responses = response.json["responses"]
+    assert responses[0] == {"id": None, "status": 304, "body": None, "headers": {"ETag": etag}}
+    assert [r["status"] for r in responses[1:]] == [404, 400, 400, 404]
+    assert responses[4]["body"] == {"error": "Trip not found."}
+
+    response = client.post("/batch", json={"requests": [{"path": "no-slash"}]}, headers=HEADERS)
+    assert response.status_code == 400
+    assert response.json == {"error": "Invalid request at index 0."}
+    response = client.post("/batch", json={"requests": [{"path": "/trips/get-user-trips"}] * 21}, headers=HEADERS)
+    assert response.status_code == 400
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_batch_failed_write_does_not_break_later_requests(mock_verify_id_token, client, app_context):
+    create_trip_with_host()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    add = {"method": "POST", "path": "/trips/add-todo", "body": {"trip_id": 1, "id": "a", "text": "Pack"}}
+    response = client.post("/batch", json={"requests": [
+        add, add, {"path": "/trips/get-todos", "query": {"trip_id": 1}},
+    ]}, headers=HEADERS)
+    assert response.status_code == 200
+    responses = response.json["responses"]
+    assert [r["status"] for r in responses] == [200, 500, 200]
+    assert responses[2]["body"] == {"todos": [{"id": "a", "text": "Pack", "checked": False}]}
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_batch_rejected_request_does_not_leak_into_later_writes(mock_verify_id_token, app, client, app_context):
+    create_trip_with_host()
+
+    # a handler that adds to the session and then turns the request down
+    @app.route('/test/add-then-reject', methods=['POST'])
+    def add_then_reject():
+        db.session.add(TripTodo(id="leaked", trip_id=1, text="Leaked", checked=False, last_updated_at=datetime.now()))
+        return jsonify({"error": "Rejected."}), 400
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    response = client.post("/batch", json={"requests": [
+        {"method": "POST", "path": "/test/add-then-reject", "body": {}},
+        {"method": "POST", "path": "/trips/add-todo", "body": {"trip_id": 1, "id": "a", "text": "Pack"}},
+    ]}, headers=HEADERS)
+    assert response.status_code == 200
+    assert [r["status"] for r in response.json["responses"]] == [400, 200]
+    assert [todo.id for todo in TripTodo.query.all()] == ["a"]
@@ -0,0 +1,84 @@
+from datetime import datetime
+from unittest.mock import patch
+from models import User, Trip, db, TripGuest, TripChange
+
+HEADERS = {"Authorization": "Bearer test_token"}
+
+def create_trip_with_host():
+    db.session.add(User(id="test_user", phone_number="+11234567890", first_name="Test", last_name="User"))
+    db.session.add(Trip(name="Test Trip", description="Test Description", token="123", host_id="test_user",
+                        start_date=datetime(2022, 1, 1), end_date=datetime(2022, 1, 30)))
+    db.session.add(TripGuest(trip_id=1, guest_id="test_user", is_host=True, rsvp_status="YES"))
+    db.session.commit()
+
+def get_changes(client, since):
+    response = client.get(f"/trips/changes?trip_id=1&since={since}", headers=HEADERS)
+    assert response.status_code == 200
+    return response.json
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_changes_since(mock_verify_id_token, client, app_context):
+    create_trip_with_host()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    client.post("/trips/add-todo", json={"trip_id": 1, "id": "a", "text": "Pack"}, headers=HEADERS)
+    client.post("/trips/add-todo", json={"trip_id": 1, "id": "b", "text": "Book"}, headers=HEADERS)
+    client.post("/expenses/add-expense", json={
+        "trip_id": 1, "title": "Dinner", "amount": 10, "usersInvolved": [{"selectedUserId": "test_user", "amount": 10}]
+    }, headers=HEADERS)
+
+    changes = get_changes(client, 0)
+    assert changes["seq"] == 3
+    assert [(c["seq"], c["collection"], c["id"], c["op"]) for c in changes["changes"]] == [
+        (1, "todos", "a", "upsert"), (2, "todos", "b", "upsert"), (3, "expenses", 1, "upsert")
+    ]
+    assert changes["changes"][0]["data"] == {"id": "a", "text": "Pack", "checked": False}
+    assert changes["changes"][2]["data"]["usersInvolved"][0]["selectedUserId"] == "test_user"
+
+    client.put("/trips/update-todo", json={"trip_id": 1, "id": "a", "text": "Pack bags", "checked": True}, headers=HEADERS)
+    client.delete("/trips/delete-todo", json={"trip_id": 1, "id": "b"}, headers=HEADERS)
+
+    # only what changed after seq 3, one entry per entity
+    changes = get_changes(client, 3)
+    assert changes["seq"] == 5
+    assert changes["changes"] == [
+        {"seq": 4, "collection": "todos", "id": "a", "op": "upsert", "data": {"id": "a", "text": "Pack bags", "checked": True}},
+        {"seq": 5, "collection": "todos", "id": "b", "op": "delete"},
+    ]
+    assert get_changes(client, 5) == {"seq": 5, "changes": []}
+
+    response = client.get("/trips/changes?trip_id=1&since=soon", headers=HEADERS)
+    assert response.status_code == 400
+    assert response.json == {"error": "Invalid since."}
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_compaction_serves_snapshot(mock_verify_id_token, client, runner, app_context):
+    create_trip_with_host()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    for todo_id in ("a", "b", "c"):
+        client.post("/trips/add-todo", json={"trip_id": 1, "id": todo_id, "text": todo_id}, headers=HEADERS)
+    client.delete("/trips/delete-todo", json={"trip_id": 1, "id": "a"}, headers=HEADERS)
+
+    result = runner.invoke(args=['changes', 'compact', '--retain', '1'])
+    assert result.exit_code == 0, result.output
+    assert "deleted 3 change(s)" in result.output
+    assert [change.seq for change in TripChange.query.filter_by(trip_id=1)] == [4]
+
+    # a client older than the compacted log gets the snapshot, then the changes after it
+    changes = get_changes(client, 1)
+    assert changes["snapshot"]["seq"] == 4
+    assert [todo["id"] for todo in changes["snapshot"]["collections"]["todos"]] == ["b", "c"]
+    assert changes["snapshot"]["collections"]["trip"][0]["trip_name"] == "Test Trip"
+    assert changes["changes"] == []
+
+    # a client that is still within the retained log just gets the delta
+    changes = get_changes(client, 3)
+    assert "snapshot" not in changes
+    assert changes["changes"] == [{"seq": 4, "collection": "todos", "id": "a", "op": "delete"}]
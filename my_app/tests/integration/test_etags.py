@@ -0,0 +1,73 @@
+from datetime import datetime
+from unittest.mock import patch
+from sqlalchemy import event
+from models import User, Trip, db, TripGuest
+
+HEADERS = {"Authorization": "Bearer test_token"}
+
+def create_trip_with_host():
+    db.session.add(User(id="test_user", phone_number="+11234567890", first_name="Test", last_name="User"))
+    db.session.add(Trip(name="Test Trip", description="Test Description", token="123", host_id="test_user",
+                        start_date=datetime(2022, 1, 1), end_date=datetime(2022, 1, 30)))
+    db.session.add(TripGuest(trip_id=1, guest_id="test_user", is_host=True, rsvp_status="YES"))
+    db.session.commit()
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_get_todos_not_modified(mock_verify_id_token, client, app_context):
+    create_trip_with_host()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    response = client.get("/trips/get-todos?trip_id=1", headers=HEADERS)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        response = client.get("/trips/get-todos?trip_id=1", headers={**HEADERS, "If-None-Match": etag})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert response.data == b''
+    assert not [statement for statement in statements if "trip_todos" in statement]
+
+    response = client.post("/trips/add-todo", json={"trip_id": 1, "id": "todo-1", "text": "Pack"}, headers=HEADERS)
+    assert response.status_code == 200
+
+    response = client.get("/trips/get-todos?trip_id=1", headers={**HEADERS, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert [todo["id"] for todo in response.json["todos"]] == ["todo-1"]
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_writes_only_change_their_collection_etag(mock_verify_id_token, client, app_context):
+    create_trip_with_host()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    itinerary_etag = client.get("/trip_itinerary/get-itinerary?trip_id=1", headers=HEADERS).headers["ETag"]
+    expenses_etag = client.get("/expenses/get-expenses?trip_id=1", headers=HEADERS).headers["ETag"]
+
+    response = client.post("/expenses/add-expense", json={
+        "trip_id": 1, "title": "Dinner", "amount": 10, "usersInvolved": [{"selectedUserId": "test_user", "amount": 10}]
+    }, headers=HEADERS)
+    assert response.status_code == 201
+
+    response = client.get("/trip_itinerary/get-itinerary?trip_id=1", headers={**HEADERS, "If-None-Match": itinerary_etag})
+    assert response.status_code == 304
+
+    response = client.get("/expenses/get-expenses?trip_id=1", headers={**HEADERS, "If-None-Match": expenses_etag})
+    assert response.status_code == 200
+    # settle-up is derived from expenses, so it shares their version
+    response = client.get("/expenses/settle-up?trip_id=1", headers={**HEADERS, "If-None-Match": response.headers["ETag"]})
+    assert response.status_code == 304
@@ -1,6 +1,8 @@
 from datetime import datetime
 from unittest.mock import patch
-from models import User, Trip, db, TripGuest, LocationCategory, TripLocation, TripExpense, TripExpenseShare
+from sqlalchemy import event
+from models import User, Trip, db, TripGuest, LocationCategory, TripLocation, TripExpense, TripExpenseShare, TripBalance
+from settlement import find_drift, ledger_balances, rebuild_balances
 
 def create_user():
     user = User(
@@ -165,4 +167,159 @@ def test_delete_expense(mock_verify_id_token, client, app_context):
     assert expense is None
 
     expense_share = TripExpenseShare.query.filter_by(expense_id=1).first()
-    assert expense_share is None
\ No newline at end of file
+    assert expense_share is None
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_get_expenses_query_count_is_constant(mock_verify_id_token, client, app_context):
+    create_user()
+    create_trip()
+    add_user_to_trip()
+    for i in range(2, 6):
+        db.session.add(User(id=f"user_{i}", phone_number=f"+1000000000{i}", first_name=f"User{i}", last_name="Guest"))
+        db.session.add(TripGuest(trip_id=1, guest_id=f"user_{i}", is_host=False, rsvp_status="YES"))
+        db.session.add(TripExpense(id=i, trip_id=1, user_id=f"user_{i}", title=f"Expense {i}", amount=10 * i, settled=False,
+                                   created_at=datetime(2024, 11, 8), updated_at=datetime(2024, 11, 8)))
+        db.session.add(TripExpenseShare(expense_id=i, user_id=f"user_{i}", amount=5 * i, trip_id=1))
+        db.session.add(TripExpenseShare(expense_id=i, user_id="test_user", amount=5 * i, trip_id=1))
+    db.session.commit()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        response = client.get("/expenses/get-expenses?trip_id=1", headers={"Authorization": "Bearer test_token"})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+    assert response.status_code == 200
+    expenses = response.json["expenses"]
+    assert [expense["expenseId"] for expense in expenses] == [2, 3, 4, 5]
+    assert expenses[0]["userFirstName"] == "User2"
+    assert expenses[0]["usersInvolved"] == [
+        {'amount': 10.0, 'firstName': 'User2', 'lastName': 'Guest', 'selectedUserId': 'user_2'},
+        {'amount': 10.0, 'firstName': 'Test', 'lastName': 'User', 'selectedUserId': 'test_user'}
+    ]
+    # membership check, collection version, expenses, shares and users
+    assert len(statements) == 5
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_settle_up(mock_verify_id_token, client, app_context):
+    create_user()
+    create_trip()
+    add_user_to_trip()
+    for user_id, first_name in (("user_2", "Second"), ("user_3", "Third")):
+        db.session.add(User(id=user_id, phone_number=f"+1000000000{user_id[-1]}", first_name=first_name, last_name="Guest"))
+        db.session.add(TripGuest(trip_id=1, guest_id=user_id, is_host=False, rsvp_status="YES"))
+    # test_user pays 90 split three ways, user_2 pays 30 split with user_3
+    for expense_id, payer, shares, settled in (
+        (1, "test_user", {"test_user": 30, "user_2": 30, "user_3": 30}, False),
+        (2, "user_2", {"user_2": 15, "user_3": 15}, False),
+        (3, "user_3", {"test_user": 500}, True),
+    ):
+        db.session.add(TripExpense(id=expense_id, trip_id=1, user_id=payer, title="Expense", amount=sum(shares.values()),
+                                   settled=settled, created_at=datetime(2024, 11, 8), updated_at=datetime(2024, 11, 8)))
+        for user_id, amount in shares.items():
+            db.session.add(TripExpenseShare(expense_id=expense_id, user_id=user_id, amount=amount, trip_id=1))
+    db.session.commit()
+    # rows inserted directly bypass the ledger, as they would for data from before it existed
+    rebuild_balances(1)
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    response = client.get("/expenses/settle-up?trip_id=1", headers={"Authorization": "Bearer test_token"})
+
+    assert response.status_code == 200
+    assert response.json["balances"] == [
+        {"userId": "user_3", "firstName": "Third", "lastName": "Guest", "balance": -45.0},
+        {"userId": "user_2", "firstName": "Second", "lastName": "Guest", "balance": -15.0},
+        {"userId": "test_user", "firstName": "Test", "lastName": "User", "balance": 60.0},
+    ]
+    assert response.json["transfers"] == [
+        {"fromUserId": "user_3", "toUserId": "test_user", "amount": 45.0},
+        {"fromUserId": "user_2", "toUserId": "test_user", "amount": 15.0},
+    ]
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_expense_routes_keep_ledger_in_step(mock_verify_id_token, client, app_context):
+    create_user()
+    create_trip()
+    add_user_to_trip()
+    db.session.add(User(id="user_2", phone_number="+10000000002", first_name="Second", last_name="Guest"))
+    db.session.add(TripGuest(trip_id=1, guest_id="user_2", is_host=False, rsvp_status="YES"))
+    db.session.commit()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    headers = {"Authorization": "Bearer test_token"}
+
+    response = client.post("/expenses/add-expense", json={"trip_id": 1, "title": "Dinner", "amount": 30, "usersInvolved": [
+        {"selectedUserId": "test_user", "amount": 10.005}, {"selectedUserId": "user_2", "amount": 19.995}
+    ]}, headers=headers)
+    assert response.status_code == 201
+    assert ledger_balances(1) == {"test_user": 2000, "user_2": -2000}
+    assert find_drift() == []
+
+    response = client.put("/expenses/update-expense", json={"trip_id": 1, "expense_id": 1, "title": "Dinner", "amount": 40, "usersInvolved": [
+        {"selectedUserId": "user_2", "amount": 30}
+    ]}, headers=headers)
+    assert response.status_code == 200
+    assert ledger_balances(1) == {"test_user": 3000, "user_2": -3000}
+    assert find_drift() == []
+
+    response = client.delete("/expenses/delete-expense", json={"trip_id": 1, "expense_id": 1}, headers=headers)
+    assert response.status_code == 200
+    assert ledger_balances(1) == {}
+    assert find_drift() == []
+
+def test_balances_verify_and_rebuild_commands(runner, app_context):
+    create_user()
+    create_trip()
+    add_user_to_trip()
+    add_expense_to_trip()
+    db.session.add(TripBalance(trip_id=1, user_id="test_user", balance_cents=999))
+    db.session.commit()
+
+    result = runner.invoke(args=['balances', 'verify'])
+    assert result.exit_code != 0
+    assert "trip 1 user test_user: ledger 999, expenses 0" in result.output
+
+    result = runner.invoke(args=['balances', 'rebuild', '--trip-id', '1'])
+    assert result.exit_code == 0
+
+    result = runner.invoke(args=['balances', 'verify'])
+    assert result.exit_code == 0
+    assert "Balances match" in result.output
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_expense_writes_lock_the_old_split(mock_verify_id_token, client, app_context):
+    create_user()
+    create_trip()
+    add_user_to_trip()
+    add_expense_to_trip()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    locked = []
+
+    def capture(orm_execute_state):
+        if orm_execute_state.is_select and orm_execute_state.statement._for_update_arg is not None:
+            locked.append({desc['name'] for desc in orm_execute_state.statement.column_descriptions})
+
+    # SQLite drops FOR UPDATE, so check the statements ask for it
+    event.listen(db.session, 'do_orm_execute', capture)
+    try:
+        client.put("/expenses/update-expense", json={"trip_id": 1, "expense_id": 1, "title": "Dinner", "amount": 100, "usersInvolved": [
+            {"selectedUserId": "test_user", "amount": 100}
+        ]}, headers={"Authorization": "Bearer test_token"})
+        client.delete("/expenses/delete-expense", json={"trip_id": 1, "expense_id": 1}, headers={"Authorization": "Bearer test_token"})
+    finally:
+        event.remove(db.session, 'do_orm_execute', capture)
+    assert locked == [{"TripExpense"}, {"TripExpenseShare"}] * 2
@@ -1,6 +1,7 @@
-from datetime import datetime
+from datetime import date, datetime
 from unittest.mock import patch
 from models import User, Trip, db, TripGuest, LocationCategory, TripLocation, ItineraryEntry
+from routes.itinerary_days import virtual_day_id
 
 def create_user():
     user = User(
@@ -107,6 +108,64 @@ def test_get_itinerary(mock_verify_id_token, client, app_context):
     response = client.get("/trip_itinerary/get-itinerary?trip_id=1", headers={"Authorization": "Bearer test_token"})
 
     assert response.status_code == 200
-    assert response.json == {
-        'itinerary': [{'date': 'Fri, 08 Nov 2024 00:00:00 GMT', 'description': 'Test Description', 'id': '123'}]
-        }
\ No newline at end of file
+    itinerary = response.json['itinerary']
+    # the trip's 30 empty days are synthesized and sort before the stored item
+    assert len(itinerary) == 31
+    assert itinerary[0] == {'date': 'Sat, 01 Jan 2022 00:00:00 GMT', 'description': '', 'id': virtual_day_id(1, date(2022, 1, 1))}
+    assert itinerary[-1] == {'date': 'Fri, 08 Nov 2024 00:00:00 GMT', 'description': 'Test Description', 'id': '123'}
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_update_virtual_day(mock_verify_id_token, client, app_context):
+    create_user()
+    create_trip()
+    add_user_to_trip()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    headers = {"Authorization": "Bearer test_token"}
+
+    response = client.get("/trip_itinerary/get-itinerary?trip_id=1", headers=headers)
+    day = response.json['itinerary'][1]
+    assert day['id'] == virtual_day_id(1, date(2022, 1, 2))
+    assert ItineraryEntry.query.count() == 0
+
+    response = client.put("/trip_itinerary/update-item", json={
+        "trip_id": 1,
+        "date": day['date'],
+        "description": "Museum",
+        "item_id": day['id']
+    }, headers=headers)
+    assert response.status_code == 200
+
+    entry = ItineraryEntry.query.one()
+    assert (entry.id, entry.trip_id, entry.date, entry.description) == (day['id'], 1, datetime(2022, 1, 2), "Museum")
+
+    response = client.get("/trip_itinerary/get-itinerary?trip_id=1", headers=headers)
+    itinerary = response.json['itinerary']
+    assert len(itinerary) == 30
+    assert itinerary[1] == {**day, 'description': "Museum"}
+
+    # an id that isn't one of this trip's days is still unknown
+    response = client.put("/trip_itinerary/update-item", json={
+        "trip_id": 1,
+        "date": day['date'],
+        "description": "Museum",
+        "item_id": virtual_day_id(2, date(2022, 1, 2))
+    }, headers=headers)
+    assert response.status_code == 404
+
+    # a day keeps its date; moving it would leave the original day synthesized under the same id
+    for item_id in (day['id'], virtual_day_id(1, date(2022, 1, 3))):
+        response = client.put("/trip_itinerary/update-item", json={
+            "trip_id": 1,
+            "date": "Wed, 05 Jan 2022 00:00:00 GMT",
+            "description": "Museum",
+            "item_id": item_id
+        }, headers=headers)
+        assert response.status_code == 400
+        assert response.json == {"message": "A day's date can't be changed."}
+    assert ItineraryEntry.query.count() == 1
+    response = client.get("/trip_itinerary/get-itinerary?trip_id=1", headers=headers)
+    ids = [item['id'] for item in response.json['itinerary']]
+    assert len(ids) == len(set(ids)) == 30
@@ -0,0 +1,72 @@
+import io
+from datetime import datetime
+from unittest.mock import patch
+from models import User, Trip, db, TripGuest, UserUpload, DocumentCategory, Job
+from jobs import enqueue, handler, run_next
+
+HEADERS = {"Authorization": "Bearer test_token"}
+
+def create_trip_with_uploads(count):
+    db.session.add(User(id="test_user", phone_number="+11234567890", first_name="Test", last_name="User"))
+    db.session.add(Trip(name="Test Trip", description="Test Description", token="123", host_id="test_user",
+                        start_date=datetime(2022, 1, 1), end_date=datetime(2022, 1, 30)))
+    db.session.add(TripGuest(trip_id=1, guest_id="test_user", is_host=True, rsvp_status="YES"))
+    for i in range(count):
+        db.session.add(UserUpload(upload_user_id="test_user", trip_id=1, document_category=DocumentCategory.TRAVEL,
+                                  file_name=f"{i}.pdf", s3_url=f"user_uploads/1/travel/{i}.pdf"))
+    db.session.commit()
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_delete_trip_queues_object_cleanup(mock_verify_id_token, client, runner, app_context, storage):
+    create_trip_with_uploads(3)
+    for i in range(3):
+        storage.write(f"user_uploads/1/travel/{i}.pdf", io.BytesIO(b'data'))
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    response = client.delete("/trips/delete-trip", json={"trip_id": 1}, headers=HEADERS)
+    assert response.status_code == 200
+
+    # the request only queues the cleanup
+    assert UserUpload.query.count() == 0
+    job = Job.query.one()
+    assert job.kind == 'delete_s3_objects'
+    assert len(storage.list('user_uploads/1/')) == 3
+
+    result = runner.invoke(args=['jobs', 'work', '--once'])
+    assert "Ran 1 job(s)." in result.output
+    assert Job.query.count() == 0
+    assert storage.list('user_uploads/1/') == []
+
+def test_failed_job_backs_off_then_gives_up(app, runner, app_context):
+    app.config['JOB_MAX_ATTEMPTS'] = 2
+    calls = []
+
+    @handler('test_failing')
+    def failing(payload):
+        calls.append(payload)
+        raise RuntimeError("S3 is down")
+
+    enqueue('test_failing', {"n": 1})
+    db.session.commit()
+
+    assert run_next()
+    job = Job.query.one()
+    assert (job.attempts, job.last_error, job.failed_at) == (1, "S3 is down", None)
+    assert job.run_at > datetime.now()
+    # not due again until the backoff passes
+    assert not run_next()
+
+    job.run_at = datetime.now()
+    db.session.commit()
+    assert run_next()
+    job = Job.query.one()
+    assert job.attempts == 2
+    assert job.failed_at is not None
+    assert not run_next()
+    assert calls == [{"n": 1}, {"n": 1}]
+
+    result = runner.invoke(args=['jobs', 'retry'])
+    assert "Requeued 1 job(s)." in result.output
+    assert Job.query.one().failed_at is None
@@ -0,0 +1,13 @@
+def test_metrics(client):
+    response = client.get("/internal/metrics")
+    assert response.status_code == 200
+    assert {'db_pool', 'token_cache', 'membership_cache', 'startup'} <= set(response.json)
+
+def test_metrics_requires_token_when_configured(client, app):
+    app.config['METRICS_TOKEN'] = "secret"
+    assert client.get("/internal/metrics").status_code == 404
+    assert client.get("/internal/metrics", headers={"X-Metrics-Token": "secret"}).status_code == 200
+
+def test_metrics_disabled(client, app):
+    app.config['METRICS_ENABLED'] = False
+    assert client.get("/internal/metrics").status_code == 404
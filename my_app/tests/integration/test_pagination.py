@@ -0,0 +1,118 @@
+import base64
+import json
+from datetime import datetime
+from unittest.mock import patch
+from models import User, Trip, db, TripGuest, TripExpense, TripTodo, TripLocation, LocationCategory
+
+HEADERS = {"Authorization": "Bearer test_token"}
+
+def create_trip_with_host():
+    db.session.add(User(id="test_user", phone_number="+11234567890", first_name="Test", last_name="User"))
+    db.session.add(Trip(name="Test Trip", description="Test Description", token="123", host_id="test_user",
+                        start_date=datetime(2022, 1, 1), end_date=datetime(2022, 1, 30)))
+    db.session.add(TripGuest(trip_id=1, guest_id="test_user", is_host=True, rsvp_status="YES"))
+    db.session.commit()
+
+def walk(client, path, key, limit):
+    items, cursor, pages = [], None, 0
+    while True:
+        query = {"trip_id": 1, "limit": limit}
+        if cursor:
+            query["cursor"] = cursor
+        response = client.get(path, query_string=query, headers=HEADERS)
+        assert response.status_code == 200
+        items.extend(response.json[key])
+        pages += 1
+        cursor = response.json["next_cursor"]
+        if cursor is None:
+            return items, pages
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_get_expenses_pages_by_created_at_and_id(mock_verify_id_token, client, app_context):
+    create_trip_with_host()
+    # several expenses share a created_at, so id has to break the tie
+    for i in range(1, 8):
+        created_at = datetime(2024, 11, 1 + i // 3)
+        db.session.add(TripExpense(id=i, trip_id=1, user_id="test_user", title=f"Expense {i}", amount=i,
+                                   settled=False, created_at=created_at, updated_at=created_at))
+    db.session.commit()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    expenses, pages = walk(client, "/expenses/get-expenses", "expenses", 3)
+    assert [expense["expenseId"] for expense in expenses] == [1, 2, 3, 4, 5, 6, 7]
+    assert pages == 3
+
+    # without limit or cursor the response is the full, unpaginated list
+    response = client.get("/expenses/get-expenses?trip_id=1", headers=HEADERS)
+    assert len(response.json["expenses"]) == 7
+    assert "next_cursor" not in response.json
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_get_todos_pages(mock_verify_id_token, client, app_context):
+    create_trip_with_host()
+    for todo_id in ("c", "a", "e", "b", "d"):
+        db.session.add(TripTodo(id=todo_id, trip_id=1, text=todo_id, checked=False, last_updated_at=datetime(2022, 1, 1)))
+    db.session.commit()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    todos, pages = walk(client, "/trips/get-todos", "todos", 2)
+    assert [todo["id"] for todo in todos] == ["a", "b", "c", "d", "e"]
+    assert pages == 3
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_get_locations_lists_empty_categories_on_last_page(mock_verify_id_token, client, app_context):
+    create_trip_with_host()
+    db.session.add(LocationCategory(id=1, trip_id=1, name="Food"))
+    db.session.add(LocationCategory(id=2, trip_id=1, name="Empty"))
+    for i in range(3):
+        db.session.add(TripLocation(trip_id=1, user_id="test_user", latitude=1.0, longitude=2.0, name=f"Place {i}",
+                                    place_id=f"p{i}", category_id=1))
+    db.session.commit()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    locations, pages = walk(client, "/trip_locations/get-locations", "locations", 2)
+    assert pages == 2
+    assert [location["name"] for location in locations] == ["Place 0", "Place 1", "Place 2", None]
+    assert locations[-1]["category"] == "Empty"
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_invalid_page_requests(mock_verify_id_token, client, app_context):
+    create_trip_with_host()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    response = client.get("/trip_guests/get-trip-guests?trip_id=1&cursor=not-a-cursor", headers=HEADERS)
+    assert response.status_code == 400
+    assert response.json == {"error": "Invalid cursor."}
+
+    # cursors that decode but hold values no sort column could have
+    for values in ([None], [[1]], [{"id": 1}], [True], [1, 2]):
+        cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        response = client.get(f"/trip_guests/get-trip-guests?trip_id=1&cursor={cursor}", headers=HEADERS)
+        assert response.status_code == 400
+        assert response.json == {"error": "Invalid cursor."}
+    for values in ([1, 1], [None, 1], [["2022-01-01"], 1]):
+        cursor = base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+        response = client.get(f"/expenses/get-expenses?trip_id=1&cursor={cursor}", headers=HEADERS)
+        assert response.status_code == 400
+        assert response.json == {"error": "Invalid cursor."}
+
+    response = client.get("/trip_guests/get-trip-guests?trip_id=1&limit=0", headers=HEADERS)
+    assert response.status_code == 400
+    assert response.json == {"error": "Invalid limit."}
+
+    response = client.get("/trips/get-user-trips?limit=1", headers=HEADERS)
+    assert response.status_code == 200
+    assert len(response.json["trips"]) == 1
+    assert response.json["next_cursor"] is None
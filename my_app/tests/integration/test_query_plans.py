@@ -0,0 +1,174 @@
+import os
+import re
+from unittest.mock import patch
+import pytest
+from sqlalchemy import event
+from app import create_app
+from models import db, User
+
+# Runs a request against every endpoint of every blueprint, captures the SQL each one issues and
+# EXPLAINs it, failing on any full table scan. Runs against SQLite by default; point
+# QUERY_PLAN_DATABASE_URL at an empty MySQL schema (mysql+pymysql://...) to check MySQL's plans.
+DATABASE_URL = os.environ.get('QUERY_PLAN_DATABASE_URL')
+
+# statements that are expected to scan, as (pattern, reason)
+ALLOWED_SCANS = []
+
+USERS = {
+    'host_user': '+11111111111',
+    'guest_user': '+12222222222',
+}
+
+def sqlite_scans(conn, statement, parameters):
+    rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    # "SCAN trips" is a full table scan; "SEARCH ..." and scans of subquery results are fine
+    scans = [re.match(r'SCAN (\w+)$', row[3]) for row in rows]
+    return [scan.group(0) for scan in scans if scan and scan.group(1) in db.metadata.tables]
+
+def mysql_scans(conn, statement, parameters):
+    result = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    rows = [dict(zip(result.keys(), row)) for row in result]
+    # tiny tables are often scanned on purpose, so only flag scans with no usable index at all
+    return [f"{row['table']} (type ALL)" for row in rows if row['type'] == 'ALL' and not row['possible_keys']]
+
+def find_scans(engine, statements):
+    explain = mysql_scans if engine.dialect.name == 'mysql' else sqlite_scans
+    problems = []
+    with engine.connect() as conn:
+        for endpoint, statement, parameters in statements:
+            if any(re.search(pattern, statement) for pattern, _ in ALLOWED_SCANS):
+                continue
+            for scan in explain(conn, statement, parameters):
+                problems.append(f"{endpoint}: {scan}\n    {statement}")
+    return problems
+
+@pytest.fixture
+def plan_app(tmp_path):
+    os.environ["FLASK_ENV"] = "testing"
+    overrides = {'SQLALCHEMY_DATABASE_URI': DATABASE_URL or f"sqlite:///{tmp_path / 'plans.db'}", 'STREAM_MAX_SECONDS': 0,
+                 'STORAGE_LOCAL_ROOT': str(tmp_path / 'storage')}
+    app = create_app(overrides)
+    with app.app_context():
+        db.create_all()
+    yield app
+    with app.app_context():
+        db.drop_all()
+        db.engine.dispose()
+
+@pytest.fixture
+def captured(plan_app):
+    statements = []
+    current = {'endpoint': None}
+    with plan_app.app_context():
+        engine = db.engine
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if re.match(r'\s*(SELECT|UPDATE|DELETE)\b', statement, re.IGNORECASE):
+            params = parameters[0] if executemany else parameters
+            statements.append((current['endpoint'], statement, params))
+
+    event.listen(engine, 'before_cursor_execute', capture)
+    yield engine, statements, current
+    event.remove(engine, 'before_cursor_execute', capture)
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_blueprint_queries_do_not_scan(mock_verify_id_token, plan_app, captured):
+    mock_verify_id_token.side_effect = lambda token, **kwargs: {'user_id': token, 'phone_number': USERS[token]}
+    engine, statements, current = captured
+
+    with plan_app.app_context():
+        for user_id, phone_number in USERS.items():
+            db.session.add(User(id=user_id, phone_number=phone_number, first_name="Test", last_name="User"))
+        db.session.commit()
+
+    client = plan_app.test_client()
+
+    def call(method, path, user='host_user', **kwargs):
+        current['endpoint'] = f"{method} {path}"
+        response = client.open(path, method=method, headers={"Authorization": f"Bearer {user}"}, **kwargs)
+        assert response.status_code < 500, (path, response.json)
+        return response
+
+    call('POST', '/users/validate-user', json={"phone_number": USERS['host_user']})
+    call('POST', '/trips/create-trip', json={
+        "trip_name": "Plans", "trip_start_date": "01/01/2025", "trip_end_date": "01/03/2025"
+    })
+    call('GET', '/trips/get-user-trips')
+    call('GET', '/trips/get-user-trips', query_string={"limit": 1})
+    trip = call('GET', '/trips/get-trip', query_string={"trip_id": 1}).json['trip_details']
+    call('PUT', '/trips/update-trip', json={"trip_id": 1, "trip_name": "Plans 2"})
+
+    call('POST', '/trip_guests/add-trip-guest', user='guest_user', json={"trip_id": 1})
+    call('POST', '/trip_guests/accept-invite', user='guest_user', json={"trip_token": trip['trip_token']})
+    call('PUT', '/trip_guests/update-rsvp-status', user='guest_user', json={"trip_id": 1, "rsvp_status": "YES"})
+    call('GET', '/trip_guests/get-trip-guests', query_string={"trip_id": 1})
+    call('GET', '/trip_guests/get-trip-guests', query_string={"trip_id": 1, "limit": 1})
+    call('GET', '/trip_guests/get-guest-info', query_string={"trip_id": 1})
+
+    call('POST', '/trips/add-todo', json={"trip_id": 1, "id": "todo-1", "text": "Pack"})
+    call('PUT', '/trips/update-todo', json={"trip_id": 1, "id": "todo-1", "text": "Pack bags", "checked": True})
+    call('GET', '/trips/get-todos', query_string={"trip_id": 1})
+    call('GET', '/trips/get-todos', query_string={"trip_id": 1, "limit": 1})
+    call('DELETE', '/trips/delete-todo', json={"trip_id": 1, "id": "todo-1"})
+
+    shares = [{"selectedUserId": "host_user", "amount": 5}, {"selectedUserId": "guest_user", "amount": 5}]
+    call('POST', '/expenses/add-expense', json={"trip_id": 1, "title": "Dinner", "amount": 10, "usersInvolved": shares})
+    call('PUT', '/expenses/update-expense', json={
+        "trip_id": 1, "expense_id": 1, "title": "Dinner", "amount": 12, "usersInvolved": shares
+    })
+    call('GET', '/expenses/get-expenses', query_string={"trip_id": 1})
+    page = call('GET', '/expenses/get-expenses', query_string={"trip_id": 1, "limit": 1}).json
+    call('GET', '/expenses/get-expenses', query_string={"trip_id": 1, "limit": 1, "cursor": page['next_cursor']})
+    call('GET', '/expenses/settle-up', query_string={"trip_id": 1})
+    call('DELETE', '/expenses/delete-expense', json={"trip_id": 1, "expense_id": 1})
+
+    call('POST', '/trip_locations/add-category', json={"trip_id": 1, "category": "Food"})
+    call('POST', '/trip_locations/add-location', json={
+        "trip_id": 1, "lat": 1.0, "lng": 2.0, "place_name": "Cafe", "place_id": "p1", "category_name": "Food"
+    })
+    call('PUT', '/trip_locations/update-location', json={
+        "trip_id": 1, "place_name": "Cafe 2", "place_id": "p1", "category_name": "Food"
+    })
+    call('GET', '/trip_locations/get-locations', query_string={"trip_id": 1})
+    call('GET', '/trip_locations/get-locations', query_string={"trip_id": 1, "limit": 1})
+    call('PUT', '/trip_locations/update-category', json={
+        "trip_id": 1, "old_category_name": "Food", "new_category_name": "Eat"
+    })
+    call('DELETE', '/trip_locations/delete-location', json={"trip_id": 1, "place_id": "p1"})
+    call('DELETE', '/trip_locations/delete-category', json={"trip_id": 1, "category_name": "Eat"})
+
+    call('POST', '/trip_itinerary/add-item', json={
+        "trip_id": 1, "item_id": "1", "date": "Thu, 02 Jan 2025 00:00:00 GMT", "description": "Hike"
+    })
+    call('PUT', '/trip_itinerary/update-item', json={
+        "trip_id": 1, "item_id": "1", "date": "Thu, 02 Jan 2025 00:00:00 GMT", "description": "Swim"
+    })
+    call('GET', '/trip_itinerary/get-itinerary', query_string={"trip_id": 1})
+    call('DELETE', '/trip_itinerary/delete-item', json={"trip_id": 1, "item_id": "1"})
+    call('GET', '/trips/changes', query_string={"trip_id": 1})
+    call('GET', '/trips/changes', query_string={"trip_id": 1, "since": 5})
+    call('GET', '/trips/stream', query_string={"trip_id": 1}).get_data()
+    call('POST', '/batch', json={"parallel": True, "requests": [
+        {"path": "/trips/get-trip", "query": {"trip_id": 1}},
+        {"path": "/trip_guests/get-trip-guests", "query": {"trip_id": 1}},
+    ]})
+
+    call('POST', '/user_uploads/generate-presigned-url', json={
+        "trip_id": 1, "document_category": "travel", "file_name": "ticket.pdf",
+        "file_type": "application/pdf", "url_type": "upload"
+    })
+    call('GET', '/user_uploads/retrieve-trip-uploads', query_string={"trip_id": 1, "document_category": "travel"})
+    call('GET', '/user_uploads/retrieve-trip-uploads', query_string={"trip_id": 1, "document_category": "travel", "limit": 1})
+    call('GET', '/user_uploads/download-urls', query_string={"trip_id": 1, "document_category": "travel"})
+    call('POST', '/user_uploads/delete-upload', json={"trip_id": 1, "file_name": "ticket.pdf"})
+
+    call('PUT', '/trip_guests/set-new-host', json={"trip_id": 1, "new_host_id": "guest_user"})
+    call('DELETE', '/trip_guests/leave-trip', json={"trip_id": 1})
+    call('DELETE', '/trips/delete-trip', user='guest_user', json={"trip_id": 1})
+
+    current['endpoint'] = None
+    assert {endpoint.split(' ')[1].split('/')[1] for endpoint, _, _ in statements} >= {
+        'users', 'trips', 'trip_guests', 'expenses', 'trip_locations', 'trip_itinerary', 'user_uploads'
+    }
+    problems = find_scans(engine, statements)
+    assert not problems, "Full table scans:\n" + "\n".join(problems)
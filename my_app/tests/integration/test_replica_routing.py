@@ -0,0 +1,88 @@
+import os
+from datetime import datetime
+from unittest.mock import patch
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from app import create_app
+from models import db, User, Trip, TripGuest, TripTodo
+
+def seed(session, todo_text):
+    session.add(User(id="test_user", phone_number="+11234567890", first_name="Test", last_name="User"))
+    session.add(Trip(id=1, name="Test Trip", token="123", host_id="test_user",
+                     start_date=datetime(2022, 1, 1), end_date=datetime(2022, 1, 3)))
+    session.add(TripGuest(trip_id=1, guest_id="test_user", is_host=True, rsvp_status="YES"))
+    session.add(TripTodo(id=todo_text, trip_id=1, text=todo_text, checked=False, last_updated_at=datetime(2022, 1, 1)))
+    session.commit()
+
+@pytest.fixture
+def routed_app(tmp_path):
+    os.environ["FLASK_ENV"] = "testing"
+    replicas = {}
+    for name in ("replica_0", "replica_1"):
+        url = f"sqlite:///{tmp_path / (name + '.db')}"
+        engine = create_engine(url)
+        db.metadata.create_all(engine)
+        with Session(engine) as session:
+            seed(session, name)
+        engine.dispose()
+        replicas[name] = url
+
+    app = create_app({
+        "SQLALCHEMY_DATABASE_URI": f"sqlite:///{tmp_path / 'primary.db'}",
+        "SQLALCHEMY_READ_REPLICA_URLS": [replicas["replica_0"], replicas["replica_1"]],
+        "REPLICA_STICKY_SECONDS": 60,
+        # membership answers would otherwise be served from the first replica that was asked
+        "MEMBERSHIP_CACHE_ENABLED": False,
+    })
+    with app.app_context():
+        seed(db.session, "primary")
+    return app
+
+def get_todo_texts(client):
+    response = client.get("/trips/get-todos?trip_id=1", headers={"Authorization": "Bearer test_token"})
+    assert response.status_code == 200
+    return [todo["text"] for todo in response.json["todos"]]
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_get_requests_round_robin_across_replicas(mock_verify_id_token, routed_app):
+    mock_verify_id_token.return_value = {'user_id': 'test_user', 'phone_number': '+11234567890'}
+    client = routed_app.test_client()
+
+    seen = {tuple(get_todo_texts(client)) for _ in range(4)}
+    assert seen == {("replica_0",), ("replica_1",)}
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_writer_reads_own_writes_from_primary(mock_verify_id_token, routed_app):
+    mock_verify_id_token.return_value = {'user_id': 'test_user', 'phone_number': '+11234567890'}
+    client = routed_app.test_client()
+
+    response = client.post("/trips/add-todo", json={"trip_id": 1, "text": "new", "id": "new"},
+                           headers={"Authorization": "Bearer test_token"})
+    assert response.status_code == 200
+
+    assert sorted(get_todo_texts(client)) == ["new", "primary"]
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_bulk_delete_pins_writer_to_primary(mock_verify_id_token, routed_app):
+    mock_verify_id_token.return_value = {'user_id': 'test_user', 'phone_number': '+11234567890'}
+    client = routed_app.test_client()
+
+    # delete-todo writes only through a bulk delete and the change log's upsert, which never flush
+    response = client.delete("/trips/delete-todo", json={"trip_id": 1, "id": "primary"},
+                             headers={"Authorization": "Bearer test_token"})
+    assert response.status_code == 200
+    assert client.get_cookie("read_primary_until") is not None
+    assert routed_app.extensions["replica_router"].sticky_users.get("test_user")
+
+    assert get_todo_texts(client) == []
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_unhealthy_replica_is_skipped(mock_verify_id_token, routed_app, tmp_path):
+    mock_verify_id_token.return_value = {'user_id': 'test_user', 'phone_number': '+11234567890'}
+    client = routed_app.test_client()
+    (tmp_path / "replica_1.db").unlink()
+    os.mkdir(tmp_path / "replica_1.db")  # connecting to a directory fails
+
+    routed_app.extensions["replica_router"].engines["replica_1"].dispose()
+    assert {tuple(get_todo_texts(client)) for _ in range(4)} == {("replica_0",)}
@@ -0,0 +1,82 @@
+import io
+from datetime import datetime
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlsplit
+from models import User, Trip, db, TripGuest
+
+def create_trip_with_host():
+    db.session.add(User(id="test_user", phone_number="+11234567890", first_name="Test", last_name="User"))
+    db.session.add(Trip(name="Test Trip", description="Test Description", token="123", host_id="test_user",
+                        start_date=datetime(2022, 1, 1), end_date=datetime(2022, 1, 30)))
+    db.session.commit()
+    db.session.add(TripGuest(trip_id=1, guest_id="test_user", is_host=True, rsvp_status="YES"))
+    db.session.commit()
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_document_round_trip(mock_verify_id_token, client, app_context, storage):
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    create_trip_with_host()
+    headers = {"Authorization": "Bearer test_token"}
+    content = b"%PDF-" + bytes(range(256)) * 4
+
+    response = client.post("/user_uploads/generate-presigned-url", json={
+        "trip_id": 1, "document_category": "travel", "file_name": "ticket.pdf", "file_type": "application/pdf", "url_type": "upload"
+    }, headers=headers)
+    assert response.status_code == 200
+    upload_url = response.json["url"]
+    # the signature is for a PUT; it can't be used to read the file
+    assert client.get(upload_url).status_code == 403
+
+    response = client.put(upload_url, data=content)
+    assert response.status_code == 200
+    assert response.headers["ETag"].startswith('"')
+    assert storage.list("user_uploads/1/") == ["user_uploads/1/travel/ticket.pdf"]
+
+    response = client.get("/user_uploads/download-urls?trip_id=1&document_category=travel", headers=headers)
+    download_url = response.json["uploads"][0]["download_url"]
+
+    response = client.get(download_url)
+    assert response.status_code == 200
+    assert response.data == content
+    assert response.headers["Content-Type"] == "application/pdf"
+    assert response.headers["Accept-Ranges"] == "bytes"
+
+    response = client.get(download_url, headers={"Range": "bytes=5-9"})
+    assert response.status_code == 206
+    assert response.data == content[5:10]
+    assert response.headers["Content-Range"] == f"bytes 5-9/{len(content)}"
+    assert response.headers["Content-Length"] == "5"
+
+    response = client.get(download_url, headers={"Range": "bytes=-4"})
+    assert response.status_code == 206
+    assert response.data == content[-4:]
+
+    response = client.head(download_url, headers={"Range": "bytes=0-99"})
+    assert response.status_code == 206
+    assert response.headers["Content-Length"] == "100"
+    assert response.data == b""
+
+    response = client.get(download_url, headers={"Range": f"bytes={len(content)}-"})
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(content)}"
+
+def test_signature_is_checked(client, app_context, storage):
+    storage.write("user_uploads/1/travel/a.pdf", io.BytesIO(b"data"))
+    with client.application.test_request_context():
+        url = storage.presign_get("user_uploads/1/travel/a.pdf", 300)
+    path, query = urlsplit(url).path, parse_qs(urlsplit(url).query)
+
+    assert client.get(url).data == b"data"
+    assert client.get(path, query_string={**query, "signature": "0" * 64}).status_code == 403
+    assert client.get(path, query_string={**query, "expires": int(query["expires"][0]) + 60}).status_code == 403
+    assert client.get(path.replace("a.pdf", "b.pdf"), query_string=query).status_code == 403
+    assert client.get(path).json == {"error": "Invalid or expired signature."}
+
+    storage.clock = lambda: int(query["expires"][0])
+    assert client.get(url).status_code == 403
+
+    with client.application.test_request_context():
+        missing = storage.presign_get("user_uploads/1/travel/missing.pdf", 300)
+    assert client.get(missing).status_code == 404
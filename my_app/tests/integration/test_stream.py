@@ -0,0 +1,97 @@
+import threading
+from datetime import datetime
+from unittest.mock import patch
+from models import User, Trip, db, TripGuest
+
+HEADERS = {"Authorization": "Bearer test_token"}
+
+def create_trip_with_host():
+    db.session.add(User(id="test_user", phone_number="+11234567890", first_name="Test", last_name="User"))
+    db.session.add(Trip(name="Test Trip", description="Test Description", token="123", host_id="test_user",
+                        start_date=datetime(2022, 1, 1), end_date=datetime(2022, 1, 30)))
+    db.session.add(TripGuest(trip_id=1, guest_id="test_user", is_host=True, rsvp_status="YES"))
+    db.session.commit()
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_commits_publish_the_new_seq(mock_verify_id_token, app, client, app_context):
+    create_trip_with_host()
+    subscription = app.extensions['change_pubsub'].subscribe(1)
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    client.post("/trips/add-todo", json={"trip_id": 1, "id": "a", "text": "Pack"}, headers=HEADERS)
+    client.post("/trips/add-todo", json={"trip_id": 1, "id": "b", "text": "Book"}, headers=HEADERS)
+    assert subscription.get(timeout=0) == 1
+    assert subscription.get(timeout=0) == 2
+
+    # a write that fails and rolls back publishes nothing
+    client.post("/trips/add-todo", json={"trip_id": 1, "id": "a", "text": "Duplicate"}, headers=HEADERS)
+    assert subscription.get(timeout=0) is None
+    subscription.close()
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_stream_resumes_from_last_event_id(mock_verify_id_token, app, client, app_context):
+    create_trip_with_host()
+    app.config.update(STREAM_HEARTBEAT_SECONDS=0.05, STREAM_MAX_SECONDS=0.2)
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    client.post("/trips/add-todo", json={"trip_id": 1, "id": "a", "text": "Pack"}, headers=HEADERS)
+
+    # behind: the current seq is sent straight away, then heartbeats until the stream ends
+    response = client.get("/trips/stream?trip_id=1", headers={**HEADERS, "Last-Event-ID": "0"})
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    body = response.get_data(as_text=True)
+    assert body.startswith("retry: 3000\n\n")
+    assert 'id: 1\nevent: change\ndata: {"trip_id": 1, "seq": 1}\n\n' in body
+    assert ": heartbeat\n\n" in body
+
+    # already current: nothing but heartbeats
+    body = client.get("/trips/stream?trip_id=1", headers={**HEADERS, "Last-Event-ID": "1"}).get_data(as_text=True)
+    assert "event: change" not in body
+    assert ": heartbeat\n\n" in body
+
+    response = client.get("/trips/stream?trip_id=1", headers={**HEADERS, "Last-Event-ID": "later"})
+    assert response.status_code == 400
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_stream_pushes_published_changes(mock_verify_id_token, app, client, app_context):
+    create_trip_with_host()
+    app.config.update(STREAM_HEARTBEAT_SECONDS=5, STREAM_MAX_SECONDS=5)
+    pubsub = app.extensions['change_pubsub']
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    response = client.get("/trips/stream?trip_id=1", headers=HEADERS, buffered=False)
+    frames = response.iter_encoded()
+    assert next(frames) == b"retry: 3000\n\n"
+    # a fresh connection is told the current seq so the client has an id to resume from
+    assert next(frames) == b'id: 0\nevent: change\ndata: {"trip_id": 1, "seq": 0}\n\n'
+
+    threading.Timer(0.05, pubsub.publish, args=(1, 4)).start()
+    assert next(frames) == b'id: 4\nevent: change\ndata: {"trip_id": 1, "seq": 4}\n\n'
+
+    assert pubsub.stats()['subscriptions'] == 1
+    response.close()
+    assert pubsub.stats()['subscriptions'] == 0
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_stream_refused_when_worker_is_full(mock_verify_id_token, app, client, app_context):
+    create_trip_with_host()
+    app.extensions['stream_slots'] = threading.BoundedSemaphore(0)
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    response = client.get("/trips/stream?trip_id=1", headers=HEADERS)
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+    assert app.extensions['change_pubsub'].stats()['subscriptions'] == 0
@@ -1,5 +1,6 @@
 from datetime import datetime
 from unittest.mock import patch
+from sqlalchemy import event
 from models import User, Trip, db, TripGuest
 
 def create_user():
@@ -63,3 +64,84 @@ def test_delete_trip_guest(mock_verify_id_token, client, app_context):
 
     trip_guest = TripGuest.query.filter_by(trip_id=1, guest_id="test_user").first()
     assert trip_guest is None
+
+def create_other_user():
+    user = User(
+        id="other_user",
+        phone_number="+10987654321",
+        first_name="Other",
+        last_name="User"
+    )
+    db.session.add(user)
+    db.session.commit()
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_membership_cache_serves_repeat_checks(mock_verify_id_token, client, app):
+
+    # requests run outside of a shared app context so each one gets a fresh per-request memo
+    with app.app_context():
+        create_user()
+        create_trip()
+        add_user_to_trip()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    client.get("/trip_guests/get-trip-guests?trip_id=1", headers={"Authorization": "Bearer test_token"})
+    client.get("/trip_guests/get-trip-guests?trip_id=1", headers={"Authorization": "Bearer test_token"})
+
+    stats = app.extensions['membership_cache'].stats()
+    assert stats['hits'] == 1
+    assert stats['size'] == 1
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_leave_trip_invalidates_membership(mock_verify_id_token, client, app_context):
+
+    create_user()
+    create_other_user()
+    create_trip()
+    add_user_to_trip()
+    db.session.add(TripGuest(trip_id=1, guest_id="other_user", is_host=False, rsvp_status="YES"))
+    db.session.commit()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'other_user', 'phone_number': '+10987654321'
+    }
+    response = client.get("/trip_guests/get-trip-guests?trip_id=1", headers={"Authorization": "Bearer test_token"})
+    assert response.status_code == 200
+
+    response = client.delete("/trip_guests/leave-trip", json={"trip_id": 1}, headers={"Authorization": "Bearer test_token"})
+    assert response.status_code == 200
+
+    response = client.get("/trip_guests/get-trip-guests?trip_id=1", headers={"Authorization": "Bearer test_token"})
+    assert response.status_code == 400
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_get_trip_guests_loads_users_in_one_query(mock_verify_id_token, client, app_context):
+
+    create_user()
+    create_trip()
+    add_user_to_trip()
+    for i in range(2, 6):
+        db.session.add(User(id=f"user_{i}", phone_number=f"+1000000000{i}", first_name=f"User{i}", last_name="Guest"))
+        db.session.add(TripGuest(trip_id=1, guest_id=f"user_{i}", is_host=False, rsvp_status="INVITED"))
+    db.session.commit()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        response = client.get("/trip_guests/get-trip-guests?trip_id=1", headers={"Authorization": "Bearer test_token"})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+    assert response.status_code == 200
+    guests = response.json["guests"]
+    assert [guest["guest_username"] for guest in guests] == ["test_user", "user_2", "user_3", "user_4", "user_5"]
+    assert guests[4]["guest_first_name"] == "User5"
+    # membership check, guests and users
+    assert len(statements) == 3
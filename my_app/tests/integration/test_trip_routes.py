@@ -1,6 +1,7 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from unittest.mock import patch
-from models import User, Trip, db, TripGuest
+from sqlalchemy import event
+from models import User, Trip, db, TripGuest, TripExpense, TripLocation, UserUpload, DocumentCategory, ItineraryEntry
 
 def create_user():
     user = User(
@@ -184,4 +185,129 @@ def test_get_user_trips(mock_verify_id_token, client, app_context):
     response = client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
 
     assert response.status_code == 200
-    assert response.json == {"trips": [{'rsvp_status': 'YES', 'trip_description': 'Test Description', 'trip_end_date': '01/30/2022', 'trip_hostname': 'test_user', 'trip_id': 1, 'trip_name': 'Test Trip', 'trip_start_date': '01/01/2022', 'trip_token': '123'}]}
\ No newline at end of file
+    assert response.json == {"trips": [{'rsvp_status': 'YES', 'trip_description': 'Test Description', 'trip_end_date': '01/30/2022', 'trip_hostname': 'test_user', 'trip_id': 1, 'trip_name': 'Test Trip', 'trip_start_date': '01/01/2022', 'trip_token': '123', 'guest_counts': {'INVITED': 0, 'YES': 1, 'NO': 0, 'MAYBE': 0}, 'total_expenses': 0, 'location_count': 0, 'upload_count': 0}]}
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_get_user_trips_summaries_in_one_query(mock_verify_id_token, client, app_context):
+
+    create_user()
+    create_trip()
+    add_user_to_trip()
+    db.session.add(User(id="other_user", phone_number="+10987654321", first_name="Other", last_name="User"))
+    db.session.add(Trip(name="Other Trip", token="456", host_id="other_user",
+                        start_date=datetime(2022, 2, 1), end_date=datetime(2022, 2, 2)))
+    db.session.add(TripGuest(trip_id=1, guest_id="other_user", is_host=False, rsvp_status="MAYBE"))
+    db.session.add(TripGuest(trip_id=2, guest_id="other_user", is_host=True, rsvp_status="YES"))
+    for amount in (10, 15.5):
+        db.session.add(TripExpense(trip_id=1, user_id="test_user", title="Dinner", amount=amount, settled=False,
+                                   created_at=datetime(2022, 1, 2), updated_at=datetime(2022, 1, 2)))
+    db.session.add(TripExpense(trip_id=2, user_id="other_user", title="Taxi", amount=99, settled=False,
+                               created_at=datetime(2022, 2, 1), updated_at=datetime(2022, 2, 1)))
+    db.session.add(TripLocation(trip_id=1, user_id="test_user", latitude=1.0, longitude=2.0, name="Cafe", place_id="p1"))
+    db.session.add(UserUpload(upload_user_id="test_user", trip_id=1, document_category=DocumentCategory.TRAVEL,
+                              file_name="ticket.pdf", s3_url="user_uploads/1/travel/ticket.pdf"))
+    db.session.commit()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    statements = []
+    def count(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        response = client.get("/trips/get-user-trips", headers={"Authorization": "Bearer test_token"})
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+
+    assert response.status_code == 200
+    [trip] = response.json["trips"]
+    assert trip["trip_id"] == 1
+    assert trip["guest_counts"] == {'INVITED': 0, 'YES': 1, 'NO': 0, 'MAYBE': 1}
+    assert trip["total_expenses"] == 25.5
+    assert trip["location_count"] == 1
+    assert trip["upload_count"] == 1
+    # one query for the user, one for the trip list
+    assert len(statements) == 2
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_create_trip_cost_does_not_grow_with_length(mock_verify_id_token, client, app_context):
+    create_user()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+
+    def create(end_date):
+        statements = []
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            response = client.post("/trips/create-trip", json={
+                "trip_name": "Test Trip", "trip_start_date": "01/01/2022", "trip_end_date": end_date,
+            }, headers={"Authorization": "Bearer test_token"})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        assert response.status_code == 201
+        return len(statements)
+
+    assert create("01/02/2022") == create("12/31/2022")
+    # empty days aren't stored until they're edited
+    assert ItineraryEntry.query.count() == 0
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_create_trip_stored_days(mock_verify_id_token, app, client, app_context):
+    app.config['ITINERARY_VIRTUAL_DAYS'] = False
+    create_user()
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    response = client.post("/trips/create-trip", json={
+        "trip_name": "Test Trip", "trip_start_date": "01/01/2022", "trip_end_date": "01/30/2022",
+    }, headers={"Authorization": "Bearer test_token"})
+    assert response.status_code == 201
+    assert ItineraryEntry.query.filter_by(trip_id=1).count() == 30
+
+    # the stored days replace the virtual ones rather than doubling them
+    response = client.get("/trip_itinerary/get-itinerary?trip_id=1", headers={"Authorization": "Bearer test_token"})
+    assert len(response.json["itinerary"]) == 30
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_update_trip_reconciles_stored_days(mock_verify_id_token, app, client, app_context):
+    app.config['ITINERARY_VIRTUAL_DAYS'] = False
+    create_user()
+    headers = {"Authorization": "Bearer test_token"}
+
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    client.post("/trips/create-trip", json={
+        "trip_name": "Test Trip", "trip_start_date": "01/01/2022", "trip_end_date": "01/30/2022",
+    }, headers=headers)
+    edited = ItineraryEntry.query.filter_by(date=datetime(2022, 1, 2)).one()
+    edited.description = "Museum"
+    db.session.commit()
+    seq = client.get("/trips/changes?trip_id=1&since=0", headers=headers).json["seq"]
+
+    response = client.put("/trips/update-trip", json={
+        "trip_id": 1, "trip_start_date": "01/10/2022", "trip_end_date": "02/05/2022",
+    }, headers=headers)
+    assert response.status_code == 200
+
+    dates = sorted(entry.date for entry in ItineraryEntry.query.filter_by(trip_id=1))
+    # the empty days before the 10th are gone, the edited one stays, and only the new days were added
+    assert dates[0] == datetime(2022, 1, 2)
+    assert dates[1:] == [datetime(2022, 1, 10) + timedelta(days=i) for i in range(27)]
+
+    changes = client.get(f"/trips/changes?trip_id=1&since={seq}", headers=headers).json["changes"]
+    ops = [(change["collection"], change["op"]) for change in changes]
+    assert ops.count(("itinerary", "delete")) == 8
+    assert ops.count(("itinerary", "upsert")) == 6
+    assert ops.count(("trip", "upsert")) == 1
+
+    response = client.put("/trips/update-trip", json={"trip_id": 1, "trip_start_date": "02/06/2022"}, headers=headers)
+    assert response.status_code == 400
+    assert response.json == {"error": "Start date cannot be later than end date."}
@@ -1,6 +1,7 @@
+import time
 from datetime import datetime
 from unittest.mock import patch
-from models import User, Trip, db, TripGuest, LocationCategory, TripLocation, TripExpense, TripExpenseShare
+from models import User, Trip, db, TripGuest, LocationCategory, TripLocation, TripExpense, TripExpenseShare, UserUpload, DocumentCategory
 
 def create_user():
     user = User(
@@ -50,3 +51,120 @@ def test_generate_presigned_url(mock_verify_id_token, client, app_context):
     )
     assert response.status_code == 200
     assert "url" in response.json """
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_download_urls(mock_verify_id_token, client, app_context, storage):
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    create_user()
+    create_trip()
+    add_user_to_trip()
+    for name in ("a.pdf", "b.pdf"):
+        db.session.add(UserUpload(upload_user_id="test_user", trip_id=1, document_category=DocumentCategory.TRAVEL,
+                                  file_name=name, s3_url=f"user_uploads/1/travel/{name}"))
+    db.session.commit()
+
+    response = client.get("/user_uploads/download-urls?trip_id=1&document_category=travel",
+                          headers={"Authorization": "Bearer test_token"})
+    assert response.status_code == 200
+    uploads = response.json["uploads"]
+    assert [(upload["id"], upload["file_name"]) for upload in uploads] == [(1, "a.pdf"), (2, "b.pdf")]
+    assert uploads[0]["download_url"].startswith("http://localhost/storage/user_uploads/1/travel/a.pdf?")
+
+    # signed URLs are reused while they have long enough left, so only the new upload is signed
+    db.session.add(UserUpload(upload_user_id="test_user", trip_id=1, document_category=DocumentCategory.TRAVEL,
+                              file_name="c.pdf", s3_url="user_uploads/1/travel/c.pdf"))
+    db.session.commit()
+    with patch.object(storage, 'presign_get', wraps=storage.presign_get) as presign_get:
+        response = client.get("/user_uploads/download-urls?trip_id=1&document_category=travel",
+                              headers={"Authorization": "Bearer test_token"})
+    assert [upload["file_name"] for upload in response.json["uploads"]] == ["a.pdf", "b.pdf", "c.pdf"]
+    assert response.json["uploads"][:2] == uploads
+    presign_get.assert_called_once_with("user_uploads/1/travel/c.pdf", 300)
+
+    response = client.get("/user_uploads/download-urls?trip_id=1&document_category=other",
+                          headers={"Authorization": "Bearer test_token"})
+    assert response.status_code == 400
+    assert response.json == {"error": "Invalid document category."}
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_multipart_upload(mock_verify_id_token, app, client, app_context, storage):
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    app.config['MULTIPART_PART_SIZE'] = 4
+    create_user()
+    create_trip()
+    add_user_to_trip()
+    headers = {"Authorization": "Bearer test_token"}
+    target = {"trip_id": 1, "document_category": "travel", "file_name": "scan.pdf"}
+    content = b"0123456789"
+
+    response = client.post("/user_uploads/multipart/create", json={**target, "file_type": "application/pdf", "file_size": len(content)}, headers=headers)
+    assert response.status_code == 200
+    upload_id = response.json["upload_id"]
+    part_urls = {part["part_number"]: part["url"] for part in response.json["parts"]}
+    assert list(part_urls) == [1, 2, 3]
+    # nothing is recorded until the upload completes
+    assert UserUpload.query.count() == 0
+
+    etags = {1: client.put(part_urls[1], data=content[:4]).headers["ETag"]}
+    response = client.post("/user_uploads/multipart/parts", json={**target, "upload_id": upload_id, "file_size": len(content)}, headers=headers)
+    assert response.json["uploaded"] == [{"part_number": 1, "etag": etags[1]}]
+    assert [part["part_number"] for part in response.json["parts"]] == [2, 3]
+    for part in response.json["parts"]:
+        start = (part["part_number"] - 1) * 4
+        etags[part["part_number"]] = client.put(part["url"], data=content[start:start + 4]).headers["ETag"]
+
+    parts = [{"part_number": n, "etag": etags[n]} for n in (2, 1, 3)]
+    response = client.post("/user_uploads/multipart/complete", json={**target, "upload_id": upload_id, "parts": parts}, headers=headers)
+    assert response.status_code == 200
+    with open(storage.path("user_uploads/1/travel/scan.pdf"), 'rb') as f:
+        assert f.read() == content
+    upload = UserUpload.query.one()
+    assert (upload.file_name, upload.s3_url, upload.document_category) == ("scan.pdf", "user_uploads/1/travel/scan.pdf", DocumentCategory.TRAVEL)
+
+    response = client.post("/user_uploads/multipart/create", json={**target, "file_size": len(content)}, headers=headers)
+    upload_id = response.json["upload_id"]
+    response = client.post("/user_uploads/multipart/abort", json={**target, "upload_id": upload_id}, headers=headers)
+    assert response.status_code == 200
+    assert storage.list_multipart_uploads("user_uploads/") == []
+
+    response = client.post("/user_uploads/multipart/create", json={**target, "file_size": 0}, headers=headers)
+    assert response.status_code == 400
+    assert response.json == {"error": "file_size must be a positive number of bytes."}
+
+@patch("firebase_admin.auth.verify_id_token")
+def test_multipart_complete_fails_when_upload_is_not_recorded(mock_verify_id_token, client, app_context, storage):
+    mock_verify_id_token.return_value = {
+        'user_id': 'test_user', 'phone_number': '+11234567890'
+    }
+    create_user()
+    create_trip()
+    add_user_to_trip()
+    headers = {"Authorization": "Bearer test_token"}
+    target = {"trip_id": 1, "document_category": "travel", "file_name": "scan.pdf"}
+
+    response = client.post("/user_uploads/multipart/create", json={**target, "file_size": 4}, headers=headers)
+    upload_id = response.json["upload_id"]
+    etag = client.put(response.json["parts"][0]["url"], data=b"data").headers["ETag"]
+
+    with patch("routes.user_upload_routes.record_change", side_effect=RuntimeError("change log unavailable")):
+        response = client.post("/user_uploads/multipart/complete", json={
+            **target, "upload_id": upload_id, "parts": [{"part_number": 1, "etag": etag}]
+        }, headers=headers)
+    assert response.status_code == 500
+    assert response.json == {"error": "Could not record upload."}
+    assert UserUpload.query.count() == 0
+
+def test_abort_incomplete_uploads(runner, app_context, storage):
+    now = [time.time() - 2 * 24 * 3600]
+    storage.clock = lambda: now[0]
+    old = storage.create_multipart("user_uploads/1/travel/old.pdf")
+    now[0] = time.time() - 3600
+    new = storage.create_multipart("user_uploads/1/travel/new.pdf")
+
+    result = runner.invoke(args=['uploads', 'abort-incomplete'])
+    assert "Aborted 1 incomplete upload(s)." in result.output
+    assert [upload[:2] for upload in storage.list_multipart_uploads("user_uploads/")] == [("user_uploads/1/travel/new.pdf", new)]
@@ -0,0 +1,26 @@
+from concurrent.futures import ThreadPoolExecutor
+import clients
+from clients import configure_boto3, get_boto3_client
+
+def test_clients_are_shared_and_tuned():
+    configure_boto3(max_pool_connections=25, retry_mode='adaptive', max_attempts=4)
+    try:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            s3_clients = list(pool.map(lambda _: get_boto3_client('s3', 'us-east-1'), range(16)))
+        assert all(client is s3_clients[0] for client in s3_clients)
+
+        config = s3_clients[0].meta.config
+        assert config.max_pool_connections == 25
+        assert config.retries == {'total_max_attempts': 4, 'mode': 'adaptive'}
+
+        # overrides get a client of their own
+        ssm = get_boto3_client('ssm', 'us-east-1', max_attempts=3, retry_mode='standard')
+        assert ssm.meta.config.retries == {'total_max_attempts': 3, 'mode': 'standard'}
+        assert ssm.meta.config.max_pool_connections == 25
+        assert get_boto3_client('ssm', 'us-east-1') is not ssm
+
+        # a forked child starts over rather than reusing the parent's connections
+        clients._reset_after_fork()
+        assert get_boto3_client('s3', 'us-east-1') is not s3_clients[0]
+    finally:
+        configure_boto3(max_pool_connections=10, max_attempts=5)
@@ -0,0 +1,29 @@
+import importlib
+import pytest
+import config.prod
+
+@pytest.fixture
+def load_prod_config(monkeypatch):
+    """Re-evaluates ProdConfig with the given environment variables on top of the defaults."""
+    for name in ('STREAM_MAX_CONNECTIONS', 'GUNICORN_WORKER_CLASS', 'GUNICORN_THREADS', 'GUNICORN_WORKER_CONNECTIONS'):
+        monkeypatch.delenv(name, raising=False)
+
+    def load(**env):
+        for name, value in env.items():
+            monkeypatch.setenv(name, value)
+        return importlib.reload(config.prod).ProdConfig
+
+    yield load
+    monkeypatch.undo()
+    importlib.reload(config.prod)
+
+def test_stream_limit_follows_gthread_capacity(load_prod_config):
+    # one thread is left for other requests, and a worker with one thread can still take a stream
+    assert load_prod_config().STREAM_MAX_CONNECTIONS == 7
+    assert load_prod_config(GUNICORN_THREADS='1').STREAM_MAX_CONNECTIONS == 1
+    assert load_prod_config(GUNICORN_THREADS='32').STREAM_MAX_CONNECTIONS == 31
+
+def test_stream_limit_by_worker_class(load_prod_config):
+    assert load_prod_config(GUNICORN_WORKER_CLASS='gevent').STREAM_MAX_CONNECTIONS == 500
+    assert load_prod_config(GUNICORN_WORKER_CLASS='sync').STREAM_MAX_CONNECTIONS == 0
+    assert load_prod_config(STREAM_MAX_CONNECTIONS='3').STREAM_MAX_CONNECTIONS == 3
@@ -0,0 +1,78 @@
+import logging
+import pytest
+from sqlalchemy import create_engine, inspect, text
+import migrations
+from app import create_app
+from models import db
+
+logger = logging.getLogger(__name__)
+
+def test_upgrade_fresh_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fresh.db'}")
+    assert migrations.upgrade(engine, logger) == migrations.HEAD
+
+    inspector = inspect(engine)
+    assert 'trips' in inspector.get_table_names()
+    assert 'ix_user_uploads_trip_file_name' in {i['name'] for i in inspector.get_indexes('user_uploads')}
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == migrations.HEAD
+
+    # running again is a no-op
+    assert migrations.upgrade(engine, logger) == migrations.HEAD
+
+def test_upgrade_database_created_before_migrations(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    legacy_tables = [t for name, t in db.metadata.tables.items() if name != 'schema_version']
+    db.metadata.create_all(engine, tables=legacy_tables)
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == 0
+
+    assert migrations.upgrade(engine, logger) == migrations.HEAD
+
+def test_migrate_current_command(runner):
+    result = runner.invoke(args=['migrate', 'current'])
+    assert f"version {migrations.HEAD}" in result.output
+
+def describe(engine):
+    inspector = inspect(engine)
+    return {
+        name: (
+            {column['name']: (str(column['type']), column['nullable']) for column in inspector.get_columns(name)},
+            sorted((i['name'], tuple(i['column_names']), bool(i['unique'])) for i in inspector.get_indexes(name)),
+            sorted(tuple(c['column_names']) for c in inspector.get_unique_constraints(name)),
+            sorted((tuple(fk['constrained_columns']), fk['referred_table']) for fk in inspector.get_foreign_keys(name)),
+        )
+        for name in inspector.get_table_names()
+    }
+
+def test_migrations_build_the_models_schema(tmp_path):
+    # the migrations declare their own tables, so they have to be kept in step with the models by hand
+    migrated = create_engine(f"sqlite:///{tmp_path / 'migrated.db'}")
+    migrations.upgrade(migrated, logger)
+    created = create_engine(f"sqlite:///{tmp_path / 'created.db'}")
+    db.metadata.create_all(created)
+
+    assert describe(migrated) == describe(created)
+
+def test_app_refuses_to_start_behind_head(tmp_path, monkeypatch):
+    monkeypatch.setenv("FLASK_ENV", "testing")
+    overrides = {'SQLALCHEMY_DATABASE_URI': f"sqlite:///{tmp_path / 'behind.db'}", 'SCHEMA_AUTO_MIGRATE': False}
+    with pytest.raises(migrations.MigrationError, match=f"expected {migrations.HEAD}"):
+        create_app(overrides)
+
+def test_upgrade_stops_on_duplicate_unique_values(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'duplicates.db'}")
+    assert migrations.upgrade(engine, logger, target=2) == 2
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, phone_number, first_name, last_name) VALUES ('u', '+1', 'A', 'B')"))
+        for _ in range(2):
+            conn.execute(text(
+                "INSERT INTO trips (name, token, host_id, start_date, end_date) "
+                "VALUES ('Trip', 'dup-token', 'u', '2022-01-01', '2022-01-02')"
+            ))
+
+    with pytest.raises(migrations.MigrationError, match=r"trips\.token .*'dup-token' \(2 rows\)"):
+        migrations.upgrade(engine, logger)
+    with engine.connect() as conn:
+        assert migrations.current_version(conn) == 2
+    assert 'ix_trips_token' not in {i['name'] for i in inspect(engine).get_indexes('trips')}
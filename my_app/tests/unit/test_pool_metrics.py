@@ -0,0 +1,58 @@
+import logging
+import pytest
+from flask import Flask
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from pool_metrics import init_pool_metrics, Histogram
+
+def make_engine(tmp_path, **options):
+    app = Flask(__name__)
+    app.config.update(
+        SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'pool.db'}",
+        SQLALCHEMY_ENGINE_OPTIONS=options,
+        DB_POOL_METRICS_ENABLED=True,
+        DB_POOL_WAIT_WARN_MS=0,
+    )
+    metrics = init_pool_metrics(app)
+    engine = create_engine(app.config['SQLALCHEMY_DATABASE_URI'], **app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+    return engine, metrics
+
+def test_histogram_buckets():
+    histogram = Histogram()
+    histogram.observe(0.5)
+    histogram.observe(30)
+    histogram.observe(10000)
+    data = histogram.as_dict()
+    assert data['count'] == 3
+    assert data['buckets']['le_1'] == 1
+    assert data['buckets']['le_50'] == 1
+    assert data['buckets']['inf'] == 1
+
+def test_pool_metrics_track_checkouts_and_connects(tmp_path):
+    engine, metrics = make_engine(tmp_path, pool_size=2, max_overflow=0)
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert metrics.snapshot()['checked_out'] == 1
+    snapshot = metrics.snapshot()
+    assert snapshot['checked_out'] == 0
+    assert snapshot['checkouts'] == 1
+    assert snapshot['connect']['count'] == 1
+    assert snapshot['wait']['count'] == 1
+
+def test_pool_metrics_warn_on_timeout(tmp_path, caplog):
+    engine, metrics = make_engine(tmp_path, pool_size=1, max_overflow=0, pool_timeout=0.05)
+    with engine.connect():
+        with caplog.at_level(logging.WARNING):
+            with pytest.raises(PoolTimeoutError):
+                engine.connect()
+    assert metrics.snapshot()['timeouts'] == 1
+    assert "Timed out" in caplog.text
+
+def test_metrics_survive_dispose(tmp_path):
+    engine, metrics = make_engine(tmp_path, pool_size=2, max_overflow=0)
+    with engine.connect():
+        pass
+    engine.dispose(close=False)
+    with engine.connect():
+        pass
+    assert metrics.snapshot()['checkouts'] == 2
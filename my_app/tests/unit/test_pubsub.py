@@ -0,0 +1,50 @@
+from pubsub import PubSub, PollingBackend
+
+def test_publish_fans_out_to_channel_subscribers():
+    pubsub = PubSub()
+    first = pubsub.subscribe(1)
+    second = pubsub.subscribe(1)
+    other = pubsub.subscribe(2)
+
+    pubsub.publish(1, 7)
+    assert first.get(timeout=0) == 7
+    assert second.get(timeout=0) == 7
+    assert other.get(timeout=0) is None
+
+    second.close()
+    pubsub.publish(1, 8)
+    assert first.get(timeout=0) == 8
+    assert second.get(timeout=0) is None
+    assert pubsub.stats() == {'channels': 2, 'subscriptions': 2}
+
+    first.close()
+    other.close()
+    assert pubsub.channels() == []
+
+def test_polling_backend_delivers_only_new_values():
+    polled = []
+    values = {1: 3, 2: 9}
+
+    def poll(channels):
+        polled.append(sorted(channels))
+        return {channel: values[channel] for channel in channels}
+
+    backend = PollingBackend(poll, interval=3600)
+    pubsub = PubSub(backend)
+    subscription = pubsub.subscribe(1)
+
+    # what this process published itself isn't delivered a second time
+    pubsub.publish(1, 3)
+    assert subscription.get(timeout=0) == 3
+    backend.poll_once(pubsub)
+    assert subscription.get(timeout=0) is None
+
+    values[1] = 4
+    backend.poll_once(pubsub)
+    assert subscription.get(timeout=0) == 4
+    # only channels with subscribers in this process are polled
+    assert polled == [[1], [1]]
+
+    subscription.close()
+    backend.poll_once(pubsub)
+    assert len(polled) == 2
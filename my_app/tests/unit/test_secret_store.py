@@ -0,0 +1,64 @@
+import os
+import stat
+import pytest
+from config.secret_store import SecretStore, EnvSecretSource, FileSecretSource, DiskSecretCache, SecretNotFoundError, env_var_name
+
+class FakeRemoteSource:
+    name = 'fake'
+    remote = True
+
+    def __init__(self, value=None, error=None):
+        self.value = value
+        self.error = error
+        self.calls = 0
+
+    def get(self, secret_name):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.value
+
+def test_env_var_name():
+    assert env_var_name('firebaseKey') == 'FIREBASE_KEY'
+
+def test_env_source_wins_over_remote(monkeypatch):
+    monkeypatch.setenv('FIREBASE_KEY', 'from-env')
+    remote = FakeRemoteSource('from-remote')
+    store = SecretStore([EnvSecretSource(), remote])
+    assert store.get('firebaseKey') == 'from-env'
+    assert remote.calls == 0
+    assert store.timings['firebaseKey']['source'] == 'env'
+
+def test_file_source(tmp_path):
+    (tmp_path / 'firebaseKey').write_text('from-file\n')
+    store = SecretStore([FileSecretSource(str(tmp_path))])
+    assert store.get('firebaseKey') == 'from-file'
+
+def test_remote_value_is_memoized_and_cached_on_disk(tmp_path):
+    cache_path = str(tmp_path / 'secrets.json')
+    remote = FakeRemoteSource('from-remote')
+    store = SecretStore([remote], DiskSecretCache(cache_path, ttl=60))
+    assert store.get('firebaseKey') == 'from-remote'
+    assert store.get('firebaseKey') == 'from-remote'
+    assert remote.calls == 1
+    assert stat.S_IMODE(os.stat(cache_path).st_mode) == 0o600
+
+    # a fresh process reuses the disk cache instead of calling the remote source
+    second_remote = FakeRemoteSource('from-remote')
+    second_store = SecretStore([second_remote], DiskSecretCache(cache_path, ttl=60))
+    assert second_store.get('firebaseKey') == 'from-remote'
+    assert second_remote.calls == 0
+    assert second_store.timings['firebaseKey']['source'] == 'fake-cache'
+
+def test_stale_cache_used_when_remote_fails(tmp_path):
+    cache_path = str(tmp_path / 'secrets.json')
+    DiskSecretCache(cache_path, ttl=60).put('firebaseKey', 'old-value')
+    store = SecretStore([FakeRemoteSource(error=TimeoutError())], DiskSecretCache(cache_path, ttl=-1))
+    assert store.get('firebaseKey') == 'old-value'
+
+def test_missing_secret(monkeypatch):
+    monkeypatch.delenv('FIREBASE_KEY', raising=False)
+    store = SecretStore([EnvSecretSource()])
+    assert store.get('firebaseKey', required=False) is None
+    with pytest.raises(SecretNotFoundError):
+        store.get('firebaseKey')
@@ -0,0 +1,49 @@
+import random
+from sqlalchemy import create_engine, literal, select
+from sqlalchemy.dialects import mysql
+from settlement import minimal_transfers, share_cents, to_cents
+
+def apply(balances, transfers):
+    result = dict(balances)
+    for from_user_id, to_user_id, cents in transfers:
+        result[from_user_id] += cents
+        result[to_user_id] -= cents
+    return result
+
+def test_no_transfers_when_everyone_is_even():
+    assert minimal_transfers({"a": 0, "b": 0}) == []
+    assert minimal_transfers({}) == []
+
+def test_single_debt():
+    assert minimal_transfers({"a": 500, "b": -500}) == [("b", "a", 500)]
+
+def test_largest_debt_is_settled_against_largest_credit():
+    balances = {"a": 700, "b": 300, "c": -600, "d": -400}
+    transfers = minimal_transfers(balances)
+    assert transfers[0] == ("c", "a", 600)
+    assert all(cents == 0 for cents in apply(balances, transfers).values())
+
+def test_random_balances_settle_in_at_most_n_minus_one_transfers():
+    rng = random.Random(42)
+    for _ in range(50):
+        users = [f"user_{i}" for i in range(rng.randint(2, 30))]
+        balances = {user: rng.randint(-10000, 10000) for user in users[:-1]}
+        balances[users[-1]] = -sum(balances.values())
+        transfers = minimal_transfers(balances)
+        assert all(cents > 0 for _, _, cents in transfers)
+        assert all(cents == 0 for cents in apply(balances, transfers).values())
+        assert len(transfers) <= len([cents for cents in balances.values() if cents]) - 1
+
+def test_to_cents_rounds_half_away_from_zero():
+    assert [to_cents(amount) for amount in (0.125, -0.125, 12.345, 10, 0)] == [13, -13, 1235, 1000, 0]
+
+def test_share_cents_matches_to_cents():
+    amounts = [0.125, -0.125, 10.005, 19.995, 12.345, 0.015, -2.675, 1.005, 100, 0, -33.33]
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        in_sql = [conn.execute(select(share_cents(literal(amount), 'sqlite'))).scalar() for amount in amounts]
+    assert in_sql == [to_cents(amount) for amount in amounts]
+
+    # MySQL's CAST to an integer rounds, so it truncates with FLOOR instead
+    compiled = str(share_cents(literal(0.125), 'mysql').compile(dialect=mysql.dialect()))
+    assert "floor(" in compiled.lower() and "CAST" not in compiled
@@ -0,0 +1,64 @@
+import io
+from datetime import datetime, timezone
+import pytest
+from storage import StorageError
+from storage.local import LocalStorage
+from storage.s3 import S3Storage
+
+class FakeS3Client:
+    def __init__(self, failures):
+        # failures[i] is the number of keys the i-th delete_objects call reports as failed
+        self.failures = list(failures)
+        self.calls = []
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [obj['Key'] for obj in Delete['Objects']]
+        self.calls.append(len(keys))
+        failed = self.failures.pop(0) if self.failures else 0
+        return {'Errors': [{'Key': key, 'Code': 'SlowDown'} for key in keys[:failed]]}
+
+def test_s3_delete_many_batches_and_retries():
+    sleeps = []
+    client = FakeS3Client([1])
+    storage = S3Storage('bucket', delete_retries=3, delete_backoff=0.5, client=client, sleep=sleeps.append)
+
+    storage.delete_many([f"k/{i}" for i in range(2500)])
+    assert client.calls == [1000, 1, 1000, 500]
+    assert sleeps == [0.5]
+
+    client = FakeS3Client([2, 2, 2])
+    storage = S3Storage('bucket', delete_retries=2, delete_backoff=0.5, client=client, sleep=sleeps.append)
+    with pytest.raises(StorageError):
+        storage.delete_many(["a", "b"])
+    assert client.calls == [2, 2, 2]
+
+def test_local_multipart_upload(tmp_path):
+    storage = LocalStorage(str(tmp_path), 'key')
+    upload_id = storage.create_multipart("docs/big.pdf")
+    etags = [storage.write_part("docs/big.pdf", upload_id, n, io.BytesIO(data)) for n, data in ((2, b"world"), (1, b"hello "))]
+
+    assert storage.list_parts("docs/big.pdf", upload_id) == [(1, etags[1]), (2, etags[0])]
+    assert [upload[:2] for upload in storage.list_multipart_uploads("docs/")] == [("docs/big.pdf", upload_id)]
+    assert storage.list_multipart_uploads("docs/")[0][2] <= datetime.now(timezone.utc)
+    with pytest.raises(StorageError):
+        storage.complete_multipart("docs/big.pdf", upload_id, [(1, '"wrong"'), (2, etags[0])])
+
+    storage.complete_multipart("docs/big.pdf", upload_id, storage.list_parts("docs/big.pdf", upload_id))
+    with open(storage.path("docs/big.pdf"), 'rb') as f:
+        assert f.read() == b"hello world"
+    assert storage.list("docs/") == ["docs/big.pdf"]
+    assert storage.list_multipart_uploads("docs/") == []
+
+def test_local_signatures(tmp_path):
+    now = [1000.0]
+    storage = LocalStorage(str(tmp_path), 'key', clock=lambda: now[0])
+    signature = storage.sign('GET', "docs/a.pdf", 1300)
+
+    assert storage.verify('GET', "docs/a.pdf", 1300, signature)
+    assert not storage.verify('PUT', "docs/a.pdf", 1300, signature)
+    assert not storage.verify('GET', "docs/b.pdf", 1300, signature)
+    assert not storage.verify('GET', "docs/a.pdf", 1400, signature)
+    now[0] = 1300.0
+    assert not storage.verify('GET', "docs/a.pdf", 1300, signature)
+    with pytest.raises(ValueError):
+        storage.path("../outside.pdf")